@@ -1,6 +1,43 @@
-from fastapi import FastAPI,HTTPException
+import time
+import uuid
+from fastapi import FastAPI,HTTPException,Request
 from controllers.controller import router as processor_router
+from controllers.job_controller import router as job_router
+from controllers.admin_controller import router as admin_router
+from controllers.pipeline_controller import router as pipeline_router
+from controllers.metrics_controller import router as metrics_router
+from utils.logger import request_id_var
+from utils.metrics import metrics
 
 app = FastAPI(title="File Processing API")
 
-app.include_router(processor_router)
\ No newline at end of file
+app.include_router(processor_router)
+app.include_router(job_router)
+app.include_router(admin_router)
+app.include_router(pipeline_router)
+app.include_router(metrics_router)
+
+HTTP_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Latency of API requests", ["method", "route", "status"]
+)
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start_time = time.time()
+    # Log lines written while handling the request carry its id (see utils.logger)
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    # The route template keeps job and pipeline ids out of the label values
+    route = request.scope.get("route")
+    HTTP_DURATION.observe(
+        time.time() - start_time,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code),
+    )
+    return response
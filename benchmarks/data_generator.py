@@ -0,0 +1,163 @@
+"""
+Synthetic inputs for the benchmarks, built column-wise with NumPy/Polars so that
+generating millions of rows takes seconds.
+
+    python -m benchmarks.data_generator --rows 1000000 --formats csv parquet --out data/bench
+"""
+import argparse
+import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+# Extensions the pipeline reads, per generated format
+FORMAT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "json": ".json", "excel": ".xlsx"}
+# Excel sheets cannot hold more rows than this (header included)
+EXCEL_MAX_ROWS = 1_048_575
+
+PRIMARY_STEM = "bench_primary"
+LOOKUP_STEM = "bench_lookup"
+CATEGORIES = [f"c{i}" for i in range(10)]
+START_DATE = datetime.date(2020, 1, 1)
+
+
+def skewed_keys(rows: int, cardinality: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    `rows` keys in 1..cardinality. skew=0 draws them uniformly; larger values follow a
+    Zipf-like distribution where key k has weight 1 / k**skew, so a few keys dominate.
+    """
+    if skew <= 0:
+        return rng.integers(1, cardinality + 1, size=rows)
+    weights = np.arange(1, cardinality + 1, dtype=np.float64) ** -skew
+    weights /= weights.sum()
+    return rng.choice(cardinality, size=rows, p=weights) + 1
+
+
+def _dates(rows: int, rng: np.random.Generator, date_format: str) -> pl.Series:
+    days = rng.integers(0, 5 * 365, size=rows)
+    return (pl.lit(START_DATE) + pl.duration(days=pl.Series(days))).dt.strftime(date_format)
+
+
+def generate_frame(
+    rows: int,
+    key_cardinality: Optional[int] = None,
+    skew: float = 0.0,
+    seed: int = 0,
+    date_format: str = "%d/%m/%Y",
+) -> pl.DataFrame:
+    """
+    The primary input: id (the join key, see skewed_keys), value1, amount, category and
+    created_at as text in `date_format`. key_cardinality defaults to one key per row.
+    """
+    rng = np.random.default_rng(seed)
+    cardinality = key_cardinality or rows
+    return pl.select(
+        pl.Series("id", skewed_keys(rows, cardinality, skew, rng)),
+        pl.Series("value1", rng.integers(0, 1000, size=rows)),
+        pl.Series("amount", rng.random(rows) * 10_000).round(2),
+        pl.Series("category", np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), size=rows)]),
+        _dates(rows, rng, date_format).alias("created_at"),
+    )
+
+
+def generate_lookup_frame(key_cardinality: int, seed: int = 1, date_format: str = "%Y/%m/%d") -> pl.DataFrame:
+    """
+    The secondary input: one row per key (roll), so joins onto it are many-to-one.
+    """
+    rng = np.random.default_rng(seed)
+    return pl.select(
+        pl.Series("roll", np.arange(1, key_cardinality + 1)),
+        pl.Series("value1", rng.integers(0, 1000, size=key_cardinality)),
+        _dates(key_cardinality, rng, date_format).alias("created_at"),
+    )
+
+
+def generate_db_frame(rows: int, seed: int = 0) -> pl.DataFrame:
+    """
+    A joined result shaped like the table written by db_lib (see db_lib/database/models.py).
+    """
+    rng = np.random.default_rng(seed)
+    index = pl.int_range(0, rows, eager=True)
+    timestamps = (
+        pl.lit(datetime.datetime(2023, 1, 1)) + pl.duration(minutes=index)
+    ).dt.strftime("%Y-%m-%d %H:%M:%S")
+    return pl.select(
+        index.alias("data1__id"),
+        (index * 10).alias("data1__value1"),
+        timestamps.alias("data1__created_at"),
+        pl.format("DC1_Region_{}", index % 5 + 1).alias("data1__dc1"),
+        pl.format("DC2_Zone_{}", index % 3 + 1).alias("data1__dc2"),
+        (index + 1000).alias("data2__roll"),
+        (index * 5).alias("data2__value1"),
+        timestamps.alias("data2__created_at"),
+        pl.Series("data_in_json__un", rng.integers(0, 100, size=rows)),
+        pl.format("JSON_Val_{}", index % 20).alias("data_in_json__unval"),
+        timestamps.alias("data_in_json__created_at"),
+        pl.format("This is a sample message for row {}. It can be quite long, demonstrating the TEXT type.", index)
+        .alias("Message"),
+    )
+
+
+def write_input(df: pl.DataFrame, directory: Path, stem: str, fmt: str) -> Path:
+    path = Path(directory) / f"{stem}{FORMAT_EXTENSIONS[fmt]}"
+    if fmt == "csv":
+        df.write_csv(path)
+    elif fmt == "parquet":
+        df.write_parquet(path)
+    elif fmt == "json":
+        # An array of records, as JSON inputs usually come
+        df.write_json(path, row_oriented=True)
+    elif fmt == "excel":
+        if df.height > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel holds at most {EXCEL_MAX_ROWS} rows, got {df.height}")
+        # openpyxl is already a dependency; Polars' own writer needs xlsxwriter
+        df.to_pandas().to_excel(path, index=False)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return path
+
+
+def generate_inputs(
+    directory: Path,
+    rows: int,
+    formats: List[str],
+    key_cardinality: Optional[int] = None,
+    skew: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Dict[str, Path]]:
+    """
+    Writes the primary and lookup inputs in every format to `directory`.
+    Returns {format: {"primary": path, "lookup": path}}.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    cardinality = key_cardinality or rows
+    primary = generate_frame(rows, cardinality, skew, seed)
+    lookup = generate_lookup_frame(cardinality, seed + 1)
+    return {
+        fmt: {
+            "primary": write_input(primary, directory, PRIMARY_STEM, fmt),
+            "lookup": write_input(lookup, directory, LOOKUP_STEM, fmt),
+        }
+        for fmt in formats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark inputs")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cardinality", type=int, default=None, help="distinct join keys (default: one per row)")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent of the key distribution")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet"], choices=sorted(FORMAT_EXTENSIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("data/bench"))
+    args = parser.parse_args()
+
+    for fmt, paths in generate_inputs(args.out, args.rows, args.formats, args.cardinality, args.skew, args.seed).items():
+        print(f"{fmt}: {paths['primary']} ({args.rows} rows), {paths['lookup']}")
+
+
+if __name__ == "__main__":
+    main()
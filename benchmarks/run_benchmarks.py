@@ -0,0 +1,289 @@
+"""
+Benchmarks of the pipeline's hot paths over generated inputs (see benchmarks.data_generator).
+
+    python -m benchmarks.run_benchmarks --rows 1000000 --formats csv parquet --out bench.json
+    python -m benchmarks.run_benchmarks --rows 1000000 --baseline bench.json
+
+Every case runs --repeat times after one warm-up run; the JSON written to --out holds
+the timings of each case plus the commit and library versions, so results of two commits
+can be compared with --baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.data_generator import (
+    FORMAT_EXTENSIONS,
+    LOOKUP_STEM,
+    PRIMARY_STEM,
+    generate_db_frame,
+    generate_inputs,
+)
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+class Case:
+    """
+    One benchmark: `setup` runs untimed before every run and its result is passed to `run`,
+    which returns the number of rows it processed.
+    """
+    def __init__(self, name: str, run: Callable, setup: Optional[Callable] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda: None)
+
+
+def _time_case(case: Case, repeat: int) -> dict:
+    seconds = []
+    rows = 0
+    for iteration in range(repeat + 1):
+        state = case.setup()
+        start = time.perf_counter()
+        rows = case.run(state)
+        elapsed = time.perf_counter() - start
+        # The first run warms up caches that live for the whole process (imports, thread pools)
+        if iteration > 0:
+            seconds.append(elapsed)
+    median = statistics.median(seconds)
+    return {
+        "name": case.name,
+        "rows": rows,
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": median,
+        "mean": statistics.mean(seconds),
+        "rows_per_second": rows / median if median else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _pipeline_cases(formats: List[str], rows: int) -> List[Case]:
+    # Imported here: the repo's modules read INPUT_DIR and friends at import time
+    import polars as pl
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from models.pydantic_models import ConvertCondition, FilterConditions, JoinFile, PrimaryFile
+    from services.file_joiner import join_files
+    from services.filter_process import apply_filters, convertDatetimeColumn
+    from utils.column_adder import add_case_columns, add_column_on_given_condition
+    from utils.dataframe_cache import dataframe_cache
+    from utils.file_reader import createDataframe
+    from utils.ingest_cache import INGEST_CACHE_DIR
+
+    def cold():
+        # Every read parses the source again
+        dataframe_cache.clear()
+        shutil.rmtree(INGEST_CACHE_DIR, ignore_errors=True)
+
+    cases = []
+    for fmt in formats:
+        file_name = PRIMARY_STEM + FORMAT_EXTENSIONS[fmt]
+        cases.append(Case(f"createDataframe[{fmt}]", lambda _, f=file_name: createDataframe(f).height, cold))
+
+    # The in-memory cases share one parsed copy of the first format's inputs
+    ext = FORMAT_EXTENSIONS[formats[0]]
+    cold()
+    primary = createDataframe(PRIMARY_STEM + ext)
+    lookup = createDataframe(LOOKUP_STEM + ext)
+    p, l = f"{PRIMARY_STEM}__", f"{LOOKUP_STEM}__"
+
+    conditions = FilterConditions(
+        Expressions=[f"{p}value1 > 500", f"{p}category == 'c3'"], operator="And"
+    )
+    cases.append(Case("apply_filters", lambda _: apply_filters(primary, conditions).height))
+
+    convert_condition = ConvertCondition(column_name=f"{p}created_at", format="yyyy-mm-dd")
+    cases.append(Case("convertDatetimeColumn", lambda _: convertDatetimeColumn(primary, convert_condition).height))
+
+    cases.append(Case(
+        "add_column_on_given_condition",
+        lambda _: add_column_on_given_condition(primary, "flag", f"{p}value1", ">", 500, "H", "L").height,
+    ))
+    case_statement = (
+        f"CASE WHEN [{p}category] = 'c1' THEN 'one' WHEN [{p}category] = 'c2' THEN 'two' "
+        f"ELSE 'other' END FROM {PRIMARY_STEM}"
+    )
+    cases.append(Case("add_case_columns", lambda _: add_case_columns(primary, ["dc1"], [case_statement]).height))
+
+    primary_info = PrimaryFile(Filename=PRIMARY_STEM + ext, Join_columns=[f"{p}id"])
+    for join_type in ["inner", "left", "full outer"]:
+        secondary = [JoinFile(Filename=LOOKUP_STEM + ext, Join_columns=[f"{l}roll"], join_type=join_type)]
+        cases.append(Case(
+            f"join_files[{join_type}]",
+            lambda _, s=secondary: join_files(
+                {primary_info.file_name: primary, s[0].file_name: lookup}, primary_info, s
+            ).collect().height,
+        ))
+
+    client = TestClient(app)
+    for fmt in formats:
+        for mode in ["eager", "lazy"]:
+            request = {
+                "files_and_join_info": {
+                    "primary_file": {
+                        "Filename": PRIMARY_STEM + FORMAT_EXTENSIONS[fmt],
+                        "Join_columns": ["id"],
+                        "derived_columns": [{"sql_statement": f"CASE WHEN [value1] > 500 THEN 'H' ELSE 'L' END FROM {PRIMARY_STEM}"}],
+                    },
+                    "secondary_files": [
+                        {"Filename": LOOKUP_STEM + FORMAT_EXTENSIONS[fmt], "Join_columns": ["roll"], "join_type": "inner"}
+                    ],
+                },
+                "filter": [{
+                    "fileName": PRIMARY_STEM + FORMAT_EXTENSIONS[fmt],
+                    "conditions": {"Expressions": ["value1 > 100"]},
+                    "convert_condition": {"column_name": "created_at", "format": "yyyy-mm-dd"},
+                }],
+                "execution_mode": mode,
+                "use_cache": False,
+            }
+
+            def process(_, request=request):
+                response = client.post("/process", json=request)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/process returned {response.status_code}: {response.text}")
+                return rows
+
+            cases.append(Case(f"process[{fmt},{mode}]", process, cold))
+    return cases
+
+
+def _db_writer_cases(rows: int, database_url: str) -> List[Case]:
+    os.environ.setdefault("MAIN_TABLE_NAME", "benchmark_data")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+
+    from db_lib.config import AppConfig
+    from db_lib.database.models import YourDataTable, create_tables
+    from db_lib.database.parallel_writer import ParallelDataWriter
+    from db_lib.database.writer import WRITE_METHODS, MySQLDataWriter
+
+    engine = create_engine(database_url)
+    create_tables(engine)
+    writer = MySQLDataWriter(engine, sessionmaker(bind=engine), AppConfig())
+    df = generate_db_frame(rows)
+
+    def truncate():
+        with engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {YourDataTable.__tablename__}"))
+
+    def write(_, method):
+        writer.write_data(df, YourDataTable.__tablename__, method=method)
+        return df.height
+
+    cases = [
+        Case(f"db_writer.write_data[{method}]", lambda state, m=method: write(state, m), truncate)
+        for method in WRITE_METHODS
+    ]
+
+    parallel_writer = ParallelDataWriter(engine, sessionmaker(bind=engine), AppConfig())
+
+    def write_parallel(_):
+        parallel_writer.write_data(df, YourDataTable.__tablename__, method="executemany")
+        return df.height
+
+    cases.append(Case("db_writer.parallel[executemany]", write_parallel, truncate))
+    return cases
+
+
+def compare(results: dict, baseline: dict) -> str:
+    """
+    Median time of every case against the baseline run; below 1.0 is faster.
+    """
+    before = {case["name"]: case for case in baseline["results"] if "median" in case}
+    lines = [f"{'case':<40} {'baseline s':>12} {'current s':>12} {'ratio':>8}"]
+    for case in results["results"]:
+        if "median" not in case or case["name"] not in before:
+            continue
+        old = before[case["name"]]["median"]
+        lines.append(f"{case['name']:<40} {old:>12.4f} {case['median']:>12.4f} {case['median'] / old:>8.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline's hot paths")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cardinality", type=int, default=None, help="distinct join keys (default: one per row)")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent of the key distribution")
+    parser.add_argument("--formats", nargs="+", default=["csv", "parquet"], choices=sorted(FORMAT_EXTENSIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", default=None, help="run the cases whose name contains one of these")
+    parser.add_argument("--db-url", default=None, help="SQLAlchemy URL for the DB writer case (default: a SQLite file)")
+    parser.add_argument("--db-rows", type=int, default=100_000)
+    parser.add_argument("--workdir", type=Path, default=None, help="where inputs are generated (default: a temp dir)")
+    parser.add_argument("--out", type=Path, default=None, help="write the results as JSON here")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="task_meta_bench_"))
+    # Must be set before the repo's modules are imported
+    os.environ["INPUT_DIR"] = str(workdir / "input")
+    os.environ["OUTPUT_DIR"] = str(workdir / "output")
+    os.environ["INGEST_CACHE_DIR"] = str(workdir / "ingest_cache")
+    os.environ.setdefault("OUTPUT_FILENAME", "output.csv")
+    os.environ.setdefault("FILENAME_CONNECTOR", "__")
+    sys.path.insert(0, str(REPO_DIR))
+
+    print(f"Generating {args.rows} rows in {args.formats} under {workdir}")
+    generate_inputs(workdir / "input", args.rows, args.formats, args.cardinality, args.skew)
+
+    cases = _pipeline_cases(args.formats, args.rows)
+    cases += _db_writer_cases(args.db_rows, args.db_url or f"sqlite:///{workdir / 'bench.db'}")
+    if args.only:
+        cases = [case for case in cases if any(pattern in case.name for pattern in args.only)]
+
+    import polars as pl
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "parameters": {
+            "rows": args.rows, "cardinality": args.cardinality, "skew": args.skew,
+            "formats": args.formats, "repeat": args.repeat, "db_rows": args.db_rows,
+        },
+        "results": [],
+    }
+    for case in cases:
+        try:
+            result = _time_case(case, args.repeat)
+            print(f"{case.name:<40} median {result['median']:.4f}s  ({result['rows']} rows)")
+        except Exception as e:
+            # A broken case is reported, the others still run
+            result = {"name": case.name, "error": f"{type(e).__name__}: {e}"}
+            print(f"{case.name:<40} FAILED {result['error']}")
+            traceback.print_exc(limit=1)
+        results["results"].append(result)
+
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+        print(f"Results written to {args.out}")
+    if args.baseline:
+        print(compare(results, json.loads(args.baseline.read_text())))
+    if args.workdir is None:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from utils.dataframe_cache import dataframe_cache
+from utils.file_reader import createDataframe
+from utils.path_util import getFullInputPath
+from utils.logger import logger
+
+router = APIRouter(prefix="/admin")
+
+@router.get("/dataframe-cache")
+def get_dataframe_cache():
+    return dataframe_cache.stats()
+
+@router.post("/dataframe-cache/pin/{file_name}")
+def pin_dataset(file_name: str):
+    full_file_path = getFullInputPath(file_name)
+    dataframe_cache.pin(full_file_path)
+    try:
+        # Loads the file into the cache now, so the first request does not pay for it
+        createDataframe(file_name)
+    except Exception as e:
+        dataframe_cache.unpin(full_file_path)
+        logger.error(f"Could not pin {file_name}: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"{file_name} pinned"}
+
+@router.delete("/dataframe-cache/pin/{file_name}")
+def unpin_dataset(file_name: str):
+    full_file_path = getFullInputPath(file_name)
+    if not dataframe_cache.is_pinned(full_file_path):
+        raise HTTPException(status_code=404, detail=f"{file_name} is not pinned")
+    dataframe_cache.unpin(full_file_path)
+    return {"message": f"{file_name} unpinned"}
+
+@router.delete("/dataframe-cache")
+def clear_dataframe_cache():
+    dataframe_cache.clear()
+    return dataframe_cache.stats()
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from models.pydantic_models import InputModel
+from services.job_manager import job_manager, JobQueueFull, FINISHED_STATES
+from utils.logger import logger
+from utils.fileNameAppender import file_append
+
+router = APIRouter()
+
+@router.post("/jobs", status_code=202)
+def submit_job(request: InputModel):
+    try:
+        request = file_append(request)
+    except Exception as e:
+        logger.error(f"Invalid job request: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        job = job_manager.submit(request)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if job.status in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return job_manager.cancel(job_id).to_dict()
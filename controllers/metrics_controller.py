@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.job_manager import job_manager
+from services.result_cache import result_cache
+from utils.dataframe_cache import dataframe_cache
+from utils.metrics import metrics, processRssBytes
+
+router = APIRouter()
+
+CACHE_HIT_RATIO = metrics.gauge("cache_hit_ratio", "Share of cache lookups that were hits", ["cache"])
+CACHE_BYTES = metrics.gauge("cache_bytes", "Bytes held by a cache", ["cache"])
+JOBS = metrics.gauge("jobs", "Jobs currently known to the job manager", ["status"])
+PROCESS_RSS = metrics.gauge("process_resident_memory_bytes", "Resident memory size of the API process")
+
+
+def _record_cache(name: str, stats: dict):
+    # (lookups are counted by the caches themselves, see cache_lookups_total)
+    lookups = stats["hits"] + stats["misses"]
+    CACHE_HIT_RATIO.set(stats["hits"] / lookups if lookups else 0.0, cache=name)
+    CACHE_BYTES.set(stats["bytes"], cache=name)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Point-in-time values are read at scrape time; everything else is recorded as it happens
+    _record_cache("result", result_cache.stats())
+    _record_cache("dataframe", dataframe_cache.stats())
+    for status, count in job_manager.status_counts().items():
+        JOBS.set(count, status=status)
+    PROCESS_RSS.set(processRssBytes())
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Response
+from models.pydantic_models import InputModel, PipelineRunRequest
+from services.job_manager import job_manager, JobQueueFull
+from services.pipeline import run_pipeline
+from services.pipeline_registry import pipeline_registry
+from utils.logger import logger
+
+router = APIRouter()
+
+@router.post("/pipelines", status_code=201)
+def register_pipeline(request: InputModel):
+    try:
+        pipeline = pipeline_registry.register(request)
+    except Exception as e:
+        logger.error(f"Invalid pipeline: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return pipeline.to_dict()
+
+@router.get("/pipelines/{pipeline_id}")
+def get_pipeline(pipeline_id: str):
+    pipeline = pipeline_registry.get(pipeline_id)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline not found: {pipeline_id}")
+    return pipeline.to_dict()
+
+@router.delete("/pipelines/{pipeline_id}")
+def delete_pipeline(pipeline_id: str):
+    pipeline = pipeline_registry.delete(pipeline_id)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline not found: {pipeline_id}")
+    return pipeline.to_dict()
+
+@router.post("/pipelines/{pipeline_id}/run")
+def run_registered_pipeline(pipeline_id: str, run_request: PipelineRunRequest, response: Response):
+    pipeline = pipeline_registry.get(pipeline_id)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Pipeline not found: {pipeline_id}")
+    try:
+        params = pipeline_registry.bind(pipeline, run_request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if run_request.background:
+        try:
+            job = job_manager.submit(pipeline.request, params)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        response.status_code = 202
+        return {"job_id": job.id, "status": job.status}
+
+    try:
+        output_path = run_pipeline(pipeline.request, params=params)
+        return {"message": output_path}
+    except Exception as e:
+        logger.error(f"API error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -16,11 +16,31 @@ class AppConfig:
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_PORT = int(os.getenv("DB_PORT", 3306))
     DB_DATABASE = os.getenv("DB_DATABASE", "your_database_name") # ⚠️ Replace with your actual database name
+    # A full SQLAlchemy URL (e.g. "sqlite:///local.db") replaces the DB_* settings above
+    DB_URL = os.getenv("DB_URL")
     
     # Data Loading Configuration
     DEFAULT_BATCH_SIZE = int(os.getenv("DEFAULT_BATCH_SIZE", 50000)) # Rows per batch
+    # How MySQLDataWriter loads batches: "executemany", "load_data" or "orm"
+    DEFAULT_WRITE_METHOD = os.getenv("DEFAULT_WRITE_METHOD", "executemany")
+    # Lets the client send LOAD DATA LOCAL INFILE files (the server must allow local_infile too)
+    DB_LOCAL_INFILE = os.getenv("DB_LOCAL_INFILE", "false").lower() == "true"
+    # Connections ParallelDataWriter inserts over, and prepared batches it keeps waiting (0: twice the connections)
+    DB_WRITE_CONNECTIONS = int(os.getenv("DB_WRITE_CONNECTIONS", 4))
+    DB_WRITE_QUEUE_SIZE = int(os.getenv("DB_WRITE_QUEUE_SIZE", 0))
+    # Lets requests read database inputs from a free-form SELECT query (not only a table); they
+    # run with this service's credentials, on a read-only connection
+    DB_ALLOW_QUERIES = os.getenv("DB_ALLOW_QUERIES", "false").lower() == "true"
+    # Connections a partitioned read of a database input uses at most
+    DB_READ_CONNECTIONS = int(os.getenv("DB_READ_CONNECTIONS", 4))
+    # Connections kept open by the engine's pool
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    # Table recording the committed batches of checkpointed loads (see LoadCheckpoint)
+    DB_CHECKPOINT_TABLE = os.getenv("DB_CHECKPOINT_TABLE", "load_checkpoints")
+    # Id under which main.py checkpoints its load; rerunning with the same id resumes it
+    DB_LOAD_ID = os.getenv("DB_LOAD_ID")
 
     # Table Name
     # MAIN_TABLE_NAME = "your_main_data_table" # Make sure this matches your desired MySQL table name
     # print(DB_DRIVERNAME,DB_HOST,DB_USERNAME,DB_PASSWORD,sep="\n\n\n\n")
-    MAIN_TABLE_NAME = os.environ.get('MAIN_TABLE_NAME')
+    MAIN_TABLE_NAME = os.environ.get('MAIN_TABLE_NAME', 'project_data')
@@ -16,3 +16,9 @@ class DataTransformationError(Exception):
     """
     pass
 
+class TableSchemaError(Exception):
+    """
+    Custom exception for a target table that does not fit the data written to it.
+    """
+    pass
+
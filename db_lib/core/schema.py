@@ -0,0 +1,179 @@
+import re
+import polars as pl
+from typing import Dict, List, Optional
+from sqlalchemy import (
+    BigInteger, Boolean, Column, Date, DateTime, Double, Float, Index, Integer, LargeBinary,
+    MetaData, Numeric, SmallInteger, String, Table, Text, Time, inspect,
+)
+from sqlalchemy.schema import DropTable
+from sqlalchemy.engine import Engine
+from db_lib.core.exceptions import TableSchemaError
+from utils.logger import logger
+
+# MySQL limits identifiers to 64 characters
+MAX_IDENTIFIER_LENGTH = 64
+# Length of text columns that are part of an index (MySQL cannot index TEXT without a prefix length)
+INDEXED_STRING_LENGTH = 255
+
+TABLE_IF_EXISTS = ("append", "replace", "fail")
+# Appended to a table's name for the copy a replacing load fills before it is swapped in
+STAGING_SUFFIX = "_staging"
+
+# Polars integer types -> SQL types wide enough to hold them
+INTEGER_TYPES = {
+    pl.Int8: SmallInteger, pl.Int16: SmallInteger, pl.UInt8: SmallInteger,
+    pl.Int32: Integer, pl.UInt16: Integer,
+    pl.Int64: BigInteger, pl.UInt32: BigInteger,
+}
+
+def sanitize_column_name(name: str) -> str:
+    """
+    🔄 Turns an output column name into a SQL identifier: 'data1__id' -> 'data1_id'.
+    Anything but letters, digits and underscores becomes '_'.
+    """
+    sanitized = re.sub(r"[^0-9A-Za-z_]", "_", name.replace("__", "_"))
+    return sanitized[:MAX_IDENTIFIER_LENGTH]
+
+def sanitized_names(columns: List[str]) -> Dict[str, str]:
+    """
+    Maps every column to its sanitized name, raising if two columns end up with the same one.
+    """
+    mapping = {col: sanitize_column_name(col) for col in columns}
+    seen = {}
+    for col, name in mapping.items():
+        if name.lower() in seen:
+            raise TableSchemaError(f"❌ Columns {seen[name.lower()]!r} and {col!r} both map to {name!r}.")
+        seen[name.lower()] = col
+    return mapping
+
+def sql_type_for(dtype: pl.DataType, indexed: bool = False):
+    """
+    SQL column type for a Polars dtype. Text is unbounded unless the column is indexed.
+    """
+    base = dtype.base_type()
+    if base in INTEGER_TYPES:
+        return INTEGER_TYPES[base]()
+    if base == pl.UInt64:
+        return Numeric(20, 0)
+    if base == pl.Float32:
+        return Float()
+    if base == pl.Float64:
+        return Double()
+    if base == pl.Boolean:
+        return Boolean()
+    if base == pl.Decimal:
+        return Numeric(dtype.precision or 38, dtype.scale or 0)
+    if base == pl.Date:
+        return Date()
+    if base == pl.Datetime:
+        return DateTime(timezone=getattr(dtype, "time_zone", None) is not None)
+    if base == pl.Time:
+        return Time()
+    if base in (pl.Utf8, pl.Categorical, pl.Enum):
+        return String(INDEXED_STRING_LENGTH) if indexed else Text()
+    if base == pl.Binary:
+        return LargeBinary()
+    if base == pl.Null:
+        return Text()
+    raise TableSchemaError(f"❌ No SQL type for Polars dtype {dtype}.")
+
+def table_from_schema(
+    table_name: str,
+    schema: Dict[str, pl.DataType],
+    indexes: Optional[List[List[str]]] = None,
+    metadata: Optional[MetaData] = None,
+) -> Table:
+    """
+    ✨ Builds the table definition for a DataFrame schema. Column names are sanitized
+    (see sanitize_column_name); `indexes` lists the (unsanitized) columns of each index.
+    """
+    names = sanitized_names(list(schema))
+    indexed = {col for index in indexes or [] for col in index}
+    missing = sorted(indexed - set(schema))
+    if missing:
+        raise TableSchemaError(f"❌ Index columns not found in the data: {missing}")
+
+    table = Table(
+        table_name,
+        metadata if metadata is not None else MetaData(),
+        *[Column(names[col], sql_type_for(dtype, col in indexed), nullable=True) for col, dtype in schema.items()],
+    )
+    for index in indexes or []:
+        index_name = f"ix_{table_name}_{'_'.join(names[col] for col in index)}"[:MAX_IDENTIFIER_LENGTH]
+        Index(index_name, *[table.c[names[col]] for col in index])
+    return table
+
+def create_or_validate_table(engine: Engine, table: Table, if_exists: str = "append") -> Table:
+    """
+    ✨ Makes sure `table` can be written to:
+    "append" creates it when missing and otherwise checks the existing table has every column,
+    "replace" drops and recreates it, "fail" refuses an existing table.
+    Returns the table as it exists in the database.
+    """
+    if if_exists not in TABLE_IF_EXISTS:
+        raise ValueError(f"❌ Unknown if_exists {if_exists!r}, expected one of {TABLE_IF_EXISTS}")
+
+    exists = inspect(engine).has_table(table.name)
+    if exists and if_exists == "fail":
+        raise TableSchemaError(f"❌ Table '{table.name}' already exists.")
+    if exists and if_exists == "replace":
+        Table(table.name, MetaData()).drop(engine)
+        exists = False
+    if not exists:
+        table.create(engine)
+        logger.info("Created table %r with %d columns", table.name, len(table.columns))
+        return table
+
+    existing = Table(table.name, MetaData(), autoload_with=engine)
+    existing_columns = {col.name.lower(): col for col in existing.columns}
+    missing = [col.name for col in table.columns if col.name.lower() not in existing_columns]
+    if missing:
+        raise TableSchemaError(f"❌ Table '{table.name}' has no columns {missing}.")
+    # Columns the data does not provide must be able to stay empty
+    provided = {col.name.lower() for col in table.columns}
+    required = [
+        col.name for col in existing.columns
+        if col.name.lower() not in provided and not col.nullable
+        and col.server_default is None and not col.primary_key
+    ]
+    if required:
+        raise TableSchemaError(f"❌ Table '{table.name}' requires columns the data lacks: {required}")
+    return existing
+
+def staging_table(table: Table) -> Table:
+    """
+    🔄 Copy of `table` (columns only, indexes are built after the swap) under a name of its own,
+    for loading a replacement next to the live table; see swap_in_table.
+    """
+    name = table.name[:MAX_IDENTIFIER_LENGTH - len(STAGING_SUFFIX)] + STAGING_SUFFIX
+    return Table(name, MetaData(), *[Column(col.name, col.type, nullable=col.nullable) for col in table.columns])
+
+def create_staging_table(engine: Engine, table: Table) -> Table:
+    """
+    ✨ Creates an empty staging table for `table`, dropping one a failed load left behind.
+    """
+    staging = staging_table(table)
+    staging.drop(engine, checkfirst=True)
+    staging.create(engine)
+    return staging
+
+def swap_in_table(engine: Engine, staging: Table, table: Table):
+    """
+    ✨ Replaces `table` by the loaded `staging` table and builds the indexes of `table` on it.
+    Drop, rename and index creation run in one transaction, so readers see either the old
+    rows or the new ones. MySQL commits every DDL statement on its own; there the tables
+    are exchanged with one atomic RENAME TABLE instead and the old one dropped afterwards.
+    """
+    preparer = engine.dialect.identifier_preparer
+    target, loaded = preparer.quote(table.name), preparer.quote(staging.name)
+    with engine.begin() as connection:
+        if engine.dialect.name in ("mysql", "mariadb"):
+            retired = preparer.quote(table.name[:MAX_IDENTIFIER_LENGTH - 8] + "_retired")
+            connection.exec_driver_sql(f"DROP TABLE IF EXISTS {retired}")
+            connection.exec_driver_sql(f"RENAME TABLE {target} TO {retired}, {loaded} TO {target}")
+            connection.exec_driver_sql(f"DROP TABLE {retired}")
+        else:
+            connection.execute(DropTable(Table(table.name, MetaData()), if_exists=True))
+            connection.exec_driver_sql(f"ALTER TABLE {loaded} RENAME TO {target}")
+        for index in table.indexes:
+            index.create(connection)
@@ -1,5 +1,6 @@
 import polars as pl
 from typing import Dict
+from utils.logger import logger
 
 def rename_polars_columns_for_mysql(df: pl.DataFrame) -> pl.DataFrame:
     """
@@ -7,7 +8,7 @@ def rename_polars_columns_for_mysql(df: pl.DataFrame) -> pl.DataFrame:
     Converts 'dataX__colY' to 'dataX_colY' and standardizes 'Message'.
     This adheres to a specific naming convention often used in SQL.
     """
-    print("Renaming Polars DataFrame columns for MySQL compatibility... 🔄")
+    logger.debug("Renaming Polars DataFrame columns for MySQL compatibility")
     
     # Define a mapping for explicit renames
     column_mapping = {
@@ -31,7 +32,7 @@ def rename_polars_columns_for_mysql(df: pl.DataFrame) -> pl.DataFrame:
         raise ValueError(f"❌ Missing expected columns in DataFrame: {missing_columns}. Please check your input DataFrame schema.")
 
     df_renamed = df.rename(column_mapping)
-    print("✅ Columns renamed.")
+    logger.debug("Columns renamed")
     return df_renamed
 
 def convert_datetime_columns(df: pl.DataFrame, datetime_cols: list[str]) -> pl.DataFrame:
@@ -39,7 +40,7 @@ def convert_datetime_columns(df: pl.DataFrame, datetime_cols: list[str]) -> pl.D
     Converts specified string columns in a Polars DataFrame to datetime objects.
     Polars handles timezone-naive datetimes as 'datetime[ns]'.
     """
-    print(f"Converting specified columns to Datetime: {datetime_cols}...")
+    logger.debug("Converting columns to Datetime: %s", datetime_cols)
     for col in datetime_cols:
         if col in df.columns:
             try:
@@ -53,7 +54,7 @@ def convert_datetime_columns(df: pl.DataFrame, datetime_cols: list[str]) -> pl.D
             except Exception as e:
                 raise ValueError(f"❌ Could not convert column '{col}' to datetime: {e}")
         else:
-            print(f"⚠️ Warning: Datetime column '{col}' not found in DataFrame. Skipping conversion.")
-    print("✅ Datetime conversion complete.")
+            logger.warning("Datetime column %r not found in DataFrame, skipping its conversion", col)
+    logger.debug("Datetime conversion complete")
     return df
 
@@ -0,0 +1,97 @@
+import datetime
+import hashlib
+import polars as pl
+from typing import Set
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+from db_lib.config import AppConfig
+from db_lib.core.exceptions import DataWriteError
+from utils.logger import logger
+
+def frame_hash(df: pl.DataFrame) -> str:
+    """
+    🔑 Content hash of a DataFrame: its schema plus a hash of every row.
+    Row hashes come from Polars and are only stable for one Polars version; after an
+    upgrade a retried load is refused rather than resumed against different offsets.
+    """
+    digest = hashlib.sha256(repr(list(df.schema.items())).encode())
+    digest.update(str(df.height).encode())
+    if df.height:
+        digest.update(df.hash_rows(seed=0).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def checkpoint_table(table_name: str) -> Table:
+    """
+    One row per committed batch of a load.
+    """
+    return Table(
+        table_name,
+        MetaData(),
+        Column("load_id", String(128), primary_key=True),
+        Column("batch_offset", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=False),
+        Column("batch_rows", Integer, nullable=False),
+        Column("batch_size", Integer, nullable=False),
+        Column("target_table", String(64), nullable=False),
+        Column("source_hash", String(64), nullable=False),
+        Column("committed_at", DateTime, nullable=False),
+    )
+
+class LoadCheckpoint:
+    """
+    ✅ Progress of one load (`load_id`) of a DataFrame into `target_table`.
+    Every batch records its offset in the checkpoint table inside the batch's own
+    transaction, so a batch and its checkpoint row are committed (or rolled back)
+    together. A retried load with the same id skips the offsets already recorded,
+    provided the source hash and batch size are the same as before.
+    """
+    def __init__(self, engine: Engine, config: AppConfig, load_id: str, target_table: str,
+                 source_hash: str, batch_size: int):
+        self.engine = engine
+        self.load_id = load_id
+        self.target_table = target_table
+        self.source_hash = source_hash
+        self.batch_size = batch_size
+        self.table = checkpoint_table(config.DB_CHECKPOINT_TABLE)
+        self.table.create(engine, checkfirst=True)
+        self.completed = self._completed_offsets()
+
+    def _completed_offsets(self) -> Set[int]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(
+                    self.table.c.batch_offset, self.table.c.batch_size,
+                    self.table.c.target_table, self.table.c.source_hash,
+                ).where(self.table.c.load_id == self.load_id)
+            ).all()
+        for _, batch_size, target_table, source_hash in rows:
+            if (batch_size, target_table, source_hash) != (self.batch_size, self.target_table, self.source_hash):
+                raise DataWriteError(
+                    f"❌ Load '{self.load_id}' was started with different data, batch size or table "
+                    f"({target_table}, batch size {batch_size}); use a new load id or clear it first."
+                )
+        if rows:
+            logger.info("Resuming load %r: %d batches already committed", self.load_id, len(rows))
+        return {row[0] for row in rows}
+
+    def record(self, connection: Connection, offset: int, rows: int):
+        """
+        Marks the batch at `offset` as done; must run in the batch's transaction.
+        """
+        connection.execute(insert(self.table).values(
+            load_id=self.load_id,
+            batch_offset=offset,
+            batch_rows=rows,
+            batch_size=self.batch_size,
+            target_table=self.target_table,
+            source_hash=self.source_hash,
+            committed_at=datetime.datetime.now(),
+        ))
+        self.completed.add(offset)
+
+    def clear(self):
+        """
+        Forgets the load, so the same id loads the data again from the first batch.
+        """
+        with self.engine.begin() as connection:
+            connection.execute(delete(self.table).where(self.table.c.load_id == self.load_id))
+        self.completed = set()
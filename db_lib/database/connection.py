@@ -3,8 +3,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.engine import URL
 from sqlalchemy.exc import SQLAlchemyError
-from config import AppConfig
-from core.exceptions import DatabaseConnectionError
+from db_lib.config import AppConfig
+from db_lib.core.exceptions import DatabaseConnectionError
+from utils.logger import logger
 
 class DatabaseConnection:
     """
@@ -23,7 +24,7 @@ class DatabaseConnection:
         """
         if self._engine is None:
             try:
-                connection_url = URL.create(
+                connection_url = self.config.DB_URL or URL.create(
                     drivername=self.config.DB_DRIVERNAME,
                     username=self.config.DB_USERNAME,
                     password=self.config.DB_PASSWORD,
@@ -31,15 +32,26 @@ class DatabaseConnection:
                     port=self.config.DB_PORT,
                     database=self.config.DB_DATABASE
                 )
+                connect_args = {}
+                if self.config.DB_LOCAL_INFILE and str(connection_url).startswith("mysql"):
+                    connect_args["local_infile"] = True # Needed by the "load_data" write method
+                pool_args = {}
+                if not str(connection_url).startswith("sqlite"):
+                    # Room for every parallel reader or writer connection plus the rest of the app
+                    pool_args["pool_size"] = max(
+                        self.config.DB_POOL_SIZE, self.config.DB_WRITE_CONNECTIONS, self.config.DB_READ_CONNECTIONS
+                    )
                 self._engine = create_engine(
                     connection_url,
                     pool_pre_ping=True, # Helps prevent stale connections
-                    pool_recycle=3600 # Recycle connections after 1 hour
+                    pool_recycle=3600, # Recycle connections after 1 hour
+                    connect_args=connect_args,
+                    **pool_args
                 )
                 # Test connection immediately
                 with self._engine.connect() as connection:
                     connection.execute(sqlalchemy.text("SELECT 1"))
-                print("✅ Database connection established successfully!")
+                logger.info("Database connection established to %s", self._engine.url.render_as_string(hide_password=True))
             except SQLAlchemyError as e:
                 raise DatabaseConnectionError(f"❌ Error connecting to database: {e}") from e
         return self._engine
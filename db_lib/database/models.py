@@ -1,7 +1,8 @@
 from sqlalchemy import Column, BigInteger, String, Text, DateTime, Integer
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.exc import SQLAlchemyError
-from config import AppConfig
+from db_lib.config import AppConfig
+from utils.logger import logger
 
 Base = declarative_base()
 
@@ -15,7 +16,8 @@ class YourDataTable(Base):
 
     # Adding a synthetic primary key column 'id'
     # This column will auto-increment and serve as the primary key
-    id = Column(BigInteger, primary_key=True, autoincrement=True) # ✨ NEW SYNTHETIC PK
+    # (SQLite only auto-increments INTEGER primary keys, which lets the writers be tested against it)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True) # ✨ NEW SYNTHETIC PK
 
     # Mapping Polars Int64 to MySQL BIGINT
     data1_id = Column(BigInteger) # No longer the primary key
@@ -42,12 +44,12 @@ def create_tables(engine):
     """
     ✨ Creates all defined tables in the database if they do not already exist.
     """
-    print(f"Attempting to create table: {YourDataTable.__tablename__} if it doesn't exist...")
+    logger.info("Creating table %s if it does not exist", YourDataTable.__tablename__)
     try:
         Base.metadata.create_all(engine)
-        print("✅ Tables created or already exist.")
+        logger.info("Tables created or already exist")
     except SQLAlchemyError as e:
-        print(f"❌ Error creating tables: {e}")
+        logger.error("Error creating tables: %s", e)
         raise # Re-raise to indicate critical failure
 
 
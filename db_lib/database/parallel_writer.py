@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+import polars as pl
+from typing import List, Optional
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from db_lib.config import AppConfig
+from db_lib.core.exceptions import DataWriteError
+from db_lib.database.checkpoint import LoadCheckpoint
+from db_lib.database.writer import MySQLDataWriter, _report_batch
+from utils.logger import logger
+
+# Tells an insert worker there are no more batches
+_DONE = None
+
+class ParallelDataWriter(MySQLDataWriter):
+    """
+    ⚡ MySQLDataWriter that overlaps client and server work: a converter thread prepares
+    batch N+1 (see prepare_batch) while `connections` pooled connections insert earlier
+    batches. A bounded queue between them stops the converter from running ahead of the
+    database. Batches commit independently and not necessarily in order; a checkpoint
+    records which ones did, so a retry fills exactly the gaps.
+    """
+    def __init__(self, engine: Engine, session_maker: sessionmaker, config: AppConfig,
+                 connections: int = None, queue_size: int = None):
+        super().__init__(engine, session_maker, config)
+        self.connections = connections or config.DB_WRITE_CONNECTIONS
+        if engine.dialect.name == "sqlite":
+            # SQLite allows one writer at a time; more connections would only wait on its lock
+            if connections and connections > 1:
+                logger.warning("SQLite takes one writer at a time, using a single insert connection")
+            self.connections = 1
+        self.queue_size = queue_size or config.DB_WRITE_QUEUE_SIZE or 2 * self.connections
+
+    def load_frame(self, df: pl.DataFrame, table_name: str, batch_size: int, method: str = "executemany",
+                   checkpoint: Optional[LoadCheckpoint] = None) -> List[dict]:
+        """
+        Inserts `df` in batches through the pipeline and returns per-batch stats, in commit order.
+        On the first failure no further batches are started and DataWriteError is raised
+        for it; batches already committed stay committed.
+        """
+        total_rows = len(df)
+        batches = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        stats, errors = [], []
+        lock = threading.Lock()
+
+        def put(item) -> bool:
+            # Timed puts, so a converter waiting on a full queue notices a failure: it stops
+            # offering batches once `stop` is set, and gives up entirely if no worker is left
+            while True:
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    if (item is not _DONE and stop.is_set()) or not any(t.is_alive() for t in workers):
+                        return False
+
+        def convert():
+            offset = 0
+            try:
+                for offset in range(0, total_rows, batch_size):
+                    if stop.is_set():
+                        break
+                    if checkpoint is not None and offset in checkpoint.completed:
+                        continue
+                    start_time = time.perf_counter()
+                    prepared = self.prepare_batch(df.slice(offset, batch_size), table_name, method)
+                    # Waits while the queue is full: the converter keeps pace with the inserts
+                    if not put((offset, prepared, time.perf_counter() - start_time)):
+                        prepared.discard()
+                        break
+            except Exception as e:
+                with lock:
+                    errors.append((offset, e))
+                stop.set()
+            finally:
+                for _ in range(self.connections):
+                    put(_DONE)
+
+        def insert(worker: int):
+            connection = None
+            try:
+                connection = self.engine.connect()
+            except Exception as e:
+                with lock:
+                    errors.append((None, e))
+                stop.set()
+            try:
+                # Keeps taking batches after a failure (skipping them), so the converter never
+                # waits on a queue nobody reads
+                while True:
+                    item = batches.get()
+                    if item is _DONE:
+                        return
+                    offset, prepared, convert_seconds = item
+                    try:
+                        if stop.is_set():
+                            continue
+                        start_time = time.perf_counter()
+                        with connection.begin():
+                            self.execute_batch(connection, prepared)
+                            if checkpoint is not None:
+                                checkpoint.record(connection, offset, prepared.row_count)
+                        with lock:
+                            stats.append(_report_batch(
+                                offset, prepared.row_count, total_rows, time.perf_counter() - start_time,
+                                convert_seconds=convert_seconds, connection=worker,
+                            ))
+                    except Exception as e:
+                        with lock:
+                            errors.append((offset, e))
+                        stop.set()
+                    finally:
+                        prepared.discard()
+            finally:
+                if connection is not None:
+                    connection.close()
+
+        start_time = time.perf_counter()
+        workers = [threading.Thread(target=insert, args=(i,), name=f"db-insert-{i}") for i in range(self.connections)]
+        threads = workers + [threading.Thread(target=convert, name="db-convert")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            # A connection failure (offset None) comes first, then the earliest batch
+            offset, error = min(errors, key=lambda item: -1 if item[0] is None else item[0])
+            if offset is None:
+                raise DataWriteError(f"❌ Could not open an insert connection: {error}") from error
+            raise DataWriteError(f"❌ Error during {method} insertion for chunk starting at row {offset}: {error}") from error
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            "Inserted %d rows over %d connections in %.2fs (%.0f rows/s)", total_rows, self.connections, elapsed,
+            total_rows / elapsed if elapsed else 0, stage="write", rows=total_rows, seconds=elapsed,
+        )
+        return stats
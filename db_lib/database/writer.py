@@ -71,25 +71,64 @@
 #             raise DataWriteError(f"❌ Error during batch insertion to MySQL: {e}") from e
 
 
+import os
+import tempfile
+import time
 import polars as pl
-from sqlalchemy.engine import Engine
+from typing import List, Optional
+from sqlalchemy import MetaData, Table
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
-from core.interfaces import IDataWriter
-from core.exceptions import DataWriteError, DataTransformationError
-from core.utils import rename_polars_columns_for_mysql, convert_datetime_columns
-from config import AppConfig
-from database.models import YourDataTable # Import the ORM model
+from db_lib.core.interfaces import IDataWriter
+from db_lib.core.exceptions import DataWriteError, DataTransformationError
+from db_lib.core.utils import rename_polars_columns_for_mysql, convert_datetime_columns
+from db_lib.config import AppConfig
+from db_lib.database.checkpoint import LoadCheckpoint, frame_hash
+from db_lib.database.models import YourDataTable # Import the ORM model
+from utils.logger import logger
+
+# "executemany": multi-row INSERTs from Arrow columns; "load_data": LOAD DATA LOCAL INFILE
+# from a temporary CSV (MySQL only); "orm": one ORM object per row (slowest, kept for compatibility)
+WRITE_METHODS = ("executemany", "load_data", "orm")
+
+# DB-API parameter markers, by driver paramstyle
+PARAM_MARKERS = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+
+class PreparedBatch:
+    """
+    One batch ready to be sent: its parameter rows, or the CSV file LOAD DATA reads.
+    """
+    def __init__(self, table: Table, columns: List[str], row_count: int, rows: list = None, csv_path: str = None):
+        self.table = table
+        self.columns = columns
+        self.row_count = row_count
+        self.rows = rows
+        self.csv_path = csv_path
+
+    def discard(self):
+        if self.csv_path is not None and os.path.exists(self.csv_path):
+            os.remove(self.csv_path)
+
+def _report_batch(offset: int, rows: int, total_rows: int, seconds: float, **extra) -> dict:
+    rate = rows / seconds if seconds else 0
+    logger.debug(
+        "Rows %d-%d of %d inserted in %.2fs (%.0f rows/s)", offset, offset + rows, total_rows, seconds, rate,
+        stage="write", rows=rows, seconds=seconds,
+    )
+    return {"offset": offset, "rows": rows, "seconds": seconds, "rows_per_second": rate, **extra}
 
 class MySQLDataWriter(IDataWriter):
     """
-    ✍️ Implements IDataWriter for writing Polars DataFrames to MySQL using
-    direct SQLAlchemy ORM batch insertion.
+    ✍️ Implements IDataWriter for writing Polars DataFrames to MySQL.
+    Batches are loaded through SQLAlchemy Core (see WRITE_METHODS); each batch is
+    committed on its own.
     """
     def __init__(self, engine: Engine, session_maker: sessionmaker, config: AppConfig):
         self.engine = engine
         self.session_maker = session_maker
         self.config = config
+        self._tables = {}
         # Define the datetime columns that need conversion
         self.datetime_columns = [
             'data1__created_at', # Original name in Polars
@@ -97,17 +136,31 @@ class MySQLDataWriter(IDataWriter):
             'data_in_json__created_at'
         ]
 
-    def write_data(self, df: pl.DataFrame, table_name: str, batch_size: int = None):
+    def write_data(self, df: pl.DataFrame, table_name: str, batch_size: int = None, method: str = None,
+                   load_id: str = None):
         """
-        Writes a Polars DataFrame to the specified MySQL table using
-        direct SQLAlchemy ORM batch insertion.
+        Writes a Polars DataFrame to the specified MySQL table in batches of `batch_size` rows.
         Converts specified columns to datetime objects before writing.
+        `method` is one of WRITE_METHODS (default: config.DEFAULT_WRITE_METHOD).
+        With a `load_id` the load is checkpointed (see LoadCheckpoint): after a failure,
+        calling write_data again with the same id and data skips the batches already committed.
         """
-        print(f"Starting direct SQLAlchemy ORM batch insertion to MySQL table '{table_name}'...")
-        
+        method = method or self.config.DEFAULT_WRITE_METHOD
+        if method not in WRITE_METHODS:
+            raise ValueError(f"❌ Unknown write method {method!r}, expected one of {WRITE_METHODS}")
+        if method == "load_data" and self.engine.dialect.name != "mysql":
+            logger.warning("LOAD DATA needs MySQL, using executemany on %s", self.engine.dialect.name)
+            method = "executemany"
+
+        logger.info("Starting %s batch insertion to table %r", method, table_name)
+
         if batch_size is None:
             batch_size = self.config.DEFAULT_BATCH_SIZE
 
+        checkpoint = None
+        if load_id is not None:
+            checkpoint = LoadCheckpoint(self.engine, self.config, load_id, table_name, frame_hash(df), batch_size)
+
         # Step 1: Convert specified columns to datetime type in Polars
         try:
             df_with_datetime = convert_datetime_columns(df, self.datetime_columns)
@@ -115,16 +168,127 @@ class MySQLDataWriter(IDataWriter):
             raise DataTransformationError(f"Error during datetime conversion: {e}") from e
 
         # Step 2: Rename Polars DataFrame columns to match MySQL table column names (ORM field names)
-        # The ORM model column names (e.g., data1_id) must match the DataFrame column names after renaming.
         try:
-            df_orm_ready = rename_polars_columns_for_mysql(df_with_datetime)
+            df_ready = rename_polars_columns_for_mysql(df_with_datetime)
         except ValueError as e:
             raise DataTransformationError(f"Error during column renaming: {e}") from e
 
-        # Step 3: Iterate through DataFrame in chunks and insert using SQLAlchemy ORM
+        if method == "orm":
+            self._write_orm(df_ready, batch_size, checkpoint)
+        else:
+            self.load_frame(df_ready, table_name, batch_size, method, checkpoint)
+        logger.info("All %d rows written to %r using %s", len(df_ready), table_name, method)
+
+    def load_frame(self, df: pl.DataFrame, table_name: str, batch_size: int, method: str = "executemany",
+                   checkpoint: Optional[LoadCheckpoint] = None) -> List[dict]:
+        """
+        Inserts `df` batch after batch, each in its own transaction, and returns per-batch stats.
+        Batches the checkpoint has already seen committed are skipped.
+        """
+        total_rows = len(df)
+        stats = []
+        for i in range(0, total_rows, batch_size):
+            if checkpoint is not None and i in checkpoint.completed:
+                continue
+            batch_df = df.slice(i, batch_size)
+            start_time = time.perf_counter()
+            try:
+                self.write_batch(batch_df, table_name, method, checkpoint, i)
+            except Exception as e:
+                raise DataWriteError(f"❌ Error during {method} insertion for chunk starting at row {i}: {e}") from e
+            stats.append(_report_batch(i, len(batch_df), total_rows, time.perf_counter() - start_time))
+        return stats
+
+    def write_batch(self, batch_df: pl.DataFrame, table_name: str, method: str = "executemany",
+                    checkpoint: Optional[LoadCheckpoint] = None, offset: int = 0):
+        """
+        Inserts one batch in its own transaction, together with its checkpoint row if any.
+        """
+        prepared = self.prepare_batch(batch_df, table_name, method)
+        try:
+            with self.engine.begin() as connection: # Commits the batch, or rolls it back on error
+                self.execute_batch(connection, prepared)
+                if checkpoint is not None:
+                    checkpoint.record(connection, offset, prepared.row_count)
+        finally:
+            prepared.discard()
+
+    def prepare_batch(self, batch_df: pl.DataFrame, table_name: str, method: str = "executemany") -> "PreparedBatch":
+        """
+        The client-side work for one batch, done without a connection: one parameter tuple
+        per row, built by Polars in a single pass over the batch, or the temporary CSV
+        for LOAD DATA.
+        Columns the table does not have are left out.
+        """
+        table = self._table(table_name)
+        columns = [col for col in batch_df.columns if col in table.columns]
+        if not columns:
+            raise DataTransformationError(f"❌ None of the DataFrame columns exist in table '{table_name}'.")
+        batch_df = batch_df.select(columns)
+        if method == "load_data" and self.engine.dialect.name == "mysql":
+            return PreparedBatch(table, columns, len(batch_df), csv_path=self._write_temp_csv(batch_df))
+        return PreparedBatch(table, columns, len(batch_df), rows=batch_df.rows())
+
+    def execute_batch(self, connection: Connection, prepared: "PreparedBatch"):
+        """
+        Sends a prepared batch over `connection`; the caller owns the transaction.
+        """
+        table_name = self._quoted(prepared.table.name)
+        column_list = ", ".join(self._quoted(col) for col in prepared.columns)
+        if prepared.csv_path is not None:
+            escaped_path = prepared.csv_path.replace("\\", "\\\\").replace("'", "\\'")
+            connection.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{escaped_path}' INTO TABLE {table_name} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '\\n' ({column_list})"
+            )
+            return
+
+        marker = PARAM_MARKERS.get(self.engine.dialect.paramstyle)
+        if marker is None:
+            # Drivers with named parameters go through SQLAlchemy's own executemany
+            connection.execute(prepared.table.insert(), [dict(zip(prepared.columns, row)) for row in prepared.rows])
+            return
+        # One INSERT ... VALUES for all rows; PyMySQL rewrites it into multi-row INSERTs
+        # of up to max_allowed_packet bytes
+        placeholders = ", ".join([marker] * len(prepared.columns))
+        connection.exec_driver_sql(
+            f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})", prepared.rows
+        )
+
+    def _table(self, table_name: str) -> Table:
+        # Reflected once per writer
+        if table_name not in self._tables:
+            self._tables[table_name] = Table(table_name, MetaData(), autoload_with=self.engine)
+        return self._tables[table_name]
+
+    def _quoted(self, name: str) -> str:
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def _write_temp_csv(self, batch_df: pl.DataFrame) -> str:
+        """
+        The batch as a CSV for LOAD DATA LOCAL INFILE. The server must allow local_infile
+        and the engine must be created with DB_LOCAL_INFILE=true.
+        """
+        fd, csv_path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        # Strings are always quoted, so only an unquoted NULL reads back as NULL
+        batch_df.write_csv(
+            csv_path,
+            include_header=False,
+            null_value="NULL",
+            quote_style="non_numeric",
+            datetime_format="%Y-%m-%d %H:%M:%S",
+        )
+        return csv_path
+
+    def _write_orm(self, df_orm_ready: pl.DataFrame, batch_size: int, checkpoint: Optional[LoadCheckpoint] = None):
+        """
+        Direct SQLAlchemy ORM batch insertion, one YourDataTable object per row.
+        """
         total_rows = len(df_orm_ready)
         current_row = 0
-        
+
         # Use a list of column names from the ORM model for dictionary creation order
         # This ensures the dictionary keys match the ORM attributes
         # We exclude 'id' as it's auto-incrementing and not in the source DataFrame
@@ -135,43 +299,35 @@ class MySQLDataWriter(IDataWriter):
             'Message'
         ]
 
-        # Use Polars' iter_slices for efficient chunking without converting to Pandas upfront
         for i in range(0, total_rows, batch_size):
+            if checkpoint is not None and i in checkpoint.completed:
+                continue
             batch_df = df_orm_ready.slice(i, batch_size)
-            print(f"Processing batch from row {i} to {min(i + batch_size, total_rows)}...")
+            logger.debug("Processing batch from row %d to %d", i, min(i + batch_size, total_rows))
 
-            # Convert each row in the batch to a dictionary, then to an ORM object
-            # Polars' to_dicts() is efficient for this.
             orm_objects = []
             for row_dict in batch_df.to_dicts():
-                # Ensure the dictionary keys match the ORM model attributes
-                # Also handle datetime objects correctly if they were strings in source
-                # (convert_datetime_columns in utils already handles this for Polars,
-                # SQLAlchemy ORM will handle the Python datetime object to DB DATETIME)
                 try:
-                    # Create an ORM object, unpacking the dictionary.
                     # Ensure 'id' is NOT in row_dict as it's auto-incrementing.
                     orm_objects.append(YourDataTable(**{k: row_dict[k] for k in orm_column_names}))
                 except Exception as e:
-                    print(f"⚠️ Warning: Could not create ORM object for row {row_dict}. Skipping. Error: {e}")
-                    # You might want more sophisticated error handling here, e.g., logging bad rows
+                    logger.warning("Could not create ORM object for row %s, skipping it: %s", row_dict, e)
                     continue
-            
+
             if not orm_objects:
-                print("No valid ORM objects in this batch. Skipping insertion.")
+                logger.warning("No valid ORM objects in this batch, skipping it")
                 continue
 
             session:Session = self.session_maker()
             try:
-                session.add()
                 session.bulk_save_objects(orm_objects) # Efficiently save objects in bulk
+                if checkpoint is not None:
+                    checkpoint.record(session.connection(), i, len(orm_objects))
                 session.commit() # Commit the batch
                 current_row += len(orm_objects)
-                print(f"  ✅ Batch inserted. Total rows processed: {current_row}/{total_rows}")
+                logger.debug("Batch inserted, %d of %d rows processed", current_row, total_rows)
             except Exception as e:
                 session.rollback() # Rollback the transaction on error
                 raise DataWriteError(f"❌ Error during SQLAlchemy ORM batch insertion for chunk starting at row {i}: {e}") from e
             finally:
                 session.close() # Always close the session
-
-        print(f"✅ All {total_rows} rows successfully written to '{table_name}' in MySQL using SQLAlchemy ORM.")
@@ -1,9 +1,10 @@
+# Run from the repository root: python -m db_lib.main
 import polars as pl
-from config import AppConfig
-from database.connection import DatabaseConnection
-from database.models import create_tables, YourDataTable
-from database.writer import MySQLDataWriter
-from core.exceptions import DatabaseConnectionError, DataWriteError, DataTransformationError
+from db_lib.config import AppConfig
+from db_lib.database.connection import DatabaseConnection
+from db_lib.database.models import create_tables, YourDataTable
+from db_lib.database.writer import MySQLDataWriter
+from db_lib.core.exceptions import DatabaseConnectionError, DataWriteError, DataTransformationError
 import datetime
 import sys
 
@@ -86,7 +87,8 @@ def main():
         data_writer.write_data(
             df=your_premade_dataframe,
             table_name=app_config.MAIN_TABLE_NAME,
-            batch_size=app_config.DEFAULT_BATCH_SIZE
+            batch_size=app_config.DEFAULT_BATCH_SIZE,
+            load_id=app_config.DB_LOAD_ID
         )
         print("\n🎉 Process completed successfully! Data loaded to MySQL. 🎉")
     except (DataTransformationError, DataWriteError) as e:
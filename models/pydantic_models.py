@@ -1,24 +1,83 @@
-from typing import List, Optional, Literal
+import re
+from typing import Any, Dict, List, Optional, Literal
 from pydantic import BaseModel, Field, model_validator
-from utils.constants import replacements
+from db_lib.config import AppConfig
+from utils.constants import replacements, output_compressions, dtype_names
 from utils.date_validator import extract_date_tokens
+from utils.sql_parser import check_select_query, parse_case_statement
+
+# Table names accepted for database inputs and outputs
+TABLE_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,63}")
 
 class DerivedColumn(BaseModel):
     sql_statement: str
 
     @model_validator(mode='after')
     def validate_case_statement(self):
-        # Must contain all required keywords
-        required_keywords = ['CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'FROM']
+        # Must contain the keywords every statement has; ELSE and FROM are optional
+        required_keywords = ['CASE', 'WHEN', 'THEN', 'END']
         for keyword in required_keywords:
             if keyword not in self.sql_statement.upper():
                 raise ValueError(f"Missing keyword: {keyword}")
+        # Raises with the position of the problem when the statement does not parse
+        parse_case_statement(self.sql_statement)
+        return self
+
+class ReadOptions(BaseModel):
+    # Column names as they appear in the file, without the '<file>__' prefix
+    dtypes: Optional[Dict[str, str]] = None
+    # Column -> date format using the same tokens as ConvertCondition, e.g. 'dd/mm/yyyy'
+    date_formats: Optional[Dict[str, str]] = None
+    infer_schema_length: Optional[int] = Field(None, ge=0)
+    null_values: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_options(self):
+        for column, dtype in (self.dtypes or {}).items():
+            if dtype.lower() not in dtype_names:
+                raise ValueError(
+                    f"Unsupported dtype {dtype!r} for column {column!r}. Allowed: {list(dtype_names)}"
+                )
+        for column, date_format in (self.date_formats or {}).items():
+            try:
+                extract_date_tokens(date_format, replacements)
+            except Exception as e:
+                raise ValueError(f"Invalid date format for column {column!r}: {date_format!r}. Error: {str(e)}")
+        return self
+
+class DatabaseSource(BaseModel):
+    # Exactly one of a table or a SELECT query in the db_lib database (queries need DB_ALLOW_QUERIES)
+    table: Optional[str] = None
+    query: Optional[str] = None
+    # Numeric column (as named in the table) whose value range is split into `partitions`
+    # reads running on separate connections
+    partition_column: Optional[str] = None
+    partitions: int = Field(1, ge=1, le=64)
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if (self.table is None) == (self.query is None):
+            raise ValueError("Exactly one of table and query is required")
+        if self.table is not None and not TABLE_NAME_PATTERN.fullmatch(self.table):
+            raise ValueError(f"Invalid table name: {self.table!r}")
+        if self.query is not None:
+            if not AppConfig.DB_ALLOW_QUERIES:
+                raise ValueError("Database queries are disabled, read a table instead (or set DB_ALLOW_QUERIES=true)")
+            self.query = check_select_query(self.query)
+        if self.partitions > 1 and self.partition_column is None:
+            raise ValueError("partition_column is required to read in several partitions")
         return self
 
 class PrimaryFile(BaseModel):
     file_name: str = Field(..., alias="Filename")
     join_columns: List[str] = Field(default_factory=list, alias="Join_columns")
     derived_columns: Optional[List[DerivedColumn]] = None
+    read_options: Optional[ReadOptions] = None
+    # Columns wanted in the output; when set, only these plus the columns the request uses are read
+    select_columns: Optional[List[str]] = None
+    # Reads the input from the database instead of INPUT_DIR; Filename then only names it
+    # (and prefixes its columns) like a file would
+    database: Optional[DatabaseSource] = None
 
     @model_validator(mode="after")
     def check_join_columns(self):
@@ -33,6 +92,13 @@ class JoinFile(PrimaryFile):
     # join_columns: List[str] = Field(default_factory=list, alias="Join_columns")
     join_type: Optional[Literal["inner", "full outer", "left", "right"]] = "full outer"
     # derived_columns: Optional[List[DerivedColumn]]
+    # Cardinality check between the running result and this file, e.g. "m:1" for a lookup table
+    join_validation: Literal["m:m", "1:m", "m:1", "1:1"] = "m:m"
+    # Merge the key columns of both sides into one; by default both are kept, as the SQL join did
+    coalesce: bool = False
+    suffix: str = "_right"
+    # "sorted" promises both sides are sorted on a single join key so a merge join can be used
+    strategy: Literal["hash", "sorted"] = "hash"
 
     @model_validator(mode="after")
     def check_join_columns(self):
@@ -90,9 +156,47 @@ class FilesAndJoinInfo(BaseModel):
 
     model_config = {"populate_by_name" : True}
 
+class OutputSpec(BaseModel):
+    format: Literal["csv", "parquet", "ipc", "database"] = "csv"
+    compression: Optional[str] = None
+    row_group_size: Optional[int] = Field(None, gt=0)
+    # Output column names as written, e.g. "data1__id"; writes one hive-style directory per value
+    partition_by: Optional[List[str]] = None
+    # Database output: the table in the db_lib database, created from the result's schema when missing
+    table: Optional[str] = None
+    if_exists: Literal["append", "replace", "fail"] = "append"
+    # Output column names of each index to create along with the table
+    indexes: Optional[List[List[str]]] = None
+    write_method: Literal["executemany", "load_data"] = "executemany"
+
+    @model_validator(mode="after")
+    def check_format_options(self):
+        allowed = output_compressions[self.format]
+        if self.compression is not None and self.compression not in allowed:
+            raise ValueError(
+                f"Compression {self.compression!r} is not supported for {self.format} output. "
+                f"Allowed: {allowed}"
+            )
+        if self.row_group_size is not None and self.format != "parquet":
+            raise ValueError("row_group_size is only supported for parquet output")
+        if self.partition_by is not None and not self.partition_by:
+            raise ValueError("partition_by cannot be an empty list")
+        if (self.format == "database") != (self.table is not None):
+            raise ValueError("table is required for database output and only allowed there")
+        if self.format == "database" and self.partition_by:
+            raise ValueError("partition_by is not supported for database output")
+        if self.table is not None and not TABLE_NAME_PATTERN.fullmatch(self.table):
+            raise ValueError(f"Invalid table name: {self.table!r}")
+        return self
+
 class InputModel(BaseModel):
     files_and_join_info: FilesAndJoinInfo
     filter: Optional[List[Filter]]
+    # "lazy" scans the inputs and collects the whole request once; "eager" reads every file fully first
+    execution_mode: Literal["eager", "lazy"] = "lazy"
+    output: OutputSpec = Field(default_factory=OutputSpec)
+    # Return a previous identical result when the input files have not changed
+    use_cache: bool = True
 
     @model_validator(mode="after")
     def validate_files_and_filters(self):
@@ -102,4 +206,8 @@ class InputModel(BaseModel):
 
     model_config = {"populate_by_name" : True}
 
-
+class PipelineRunRequest(BaseModel):
+    # Values for the :parameters of the registered pipeline's filter expressions
+    params: Dict[str, Any] = Field(default_factory=dict)
+    # Queue the run as a job (see /jobs) instead of waiting for the output
+    background: bool = False
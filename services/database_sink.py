@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import polars as pl
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from sqlalchemy import inspect
+
+from db_lib.config import AppConfig
+from db_lib.core.schema import (
+    create_or_validate_table, create_staging_table, sanitized_names, swap_in_table, table_from_schema,
+)
+from db_lib.database.connection import DatabaseConnection
+from db_lib.database.parallel_writer import ParallelDataWriter
+from models.pydantic_models import OutputSpec
+from services.output_writer import write_frame
+from utils.logger import logger
+
+load_dotenv()
+# Rows sent to the database per transaction
+DB_OUTPUT_BATCH_ROWS = int(os.getenv('DB_OUTPUT_BATCH_ROWS', 50000))
+# File the result is streamed into before it is loaded, inside the run directory
+DATABASE_STAGING_FILENAME = "_database_staging.parquet"
+
+_connection: Optional[DatabaseConnection] = None
+_connection_lock = threading.Lock()
+
+
+def database_connection() -> DatabaseConnection:
+    """
+    The process-wide connection (and pool) to the database configured in db_lib.config.
+    """
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = DatabaseConnection(AppConfig())
+        return _connection
+
+
+class DatabaseSink:
+    """
+    Writes result chunks into a table, the database counterpart of ChunkedWriter.
+    The first chunk's schema defines the table (see db_lib.core.schema): it is created,
+    replaced or checked according to output.if_exists. Column names are sanitized
+    ('data1__id' -> 'data1_id') and every DB_OUTPUT_BATCH_ROWS rows are committed together,
+    over DB_WRITE_CONNECTIONS connections (see ParallelDataWriter).
+    Replacing an existing table loads a staging table next to it, swapped in by close();
+    discard() drops it instead, leaving the old table as it was.
+    """
+    def __init__(self, output: OutputSpec):
+        self.output = output
+        self.rows = 0
+        self._names = None
+        self._writer = None
+        self._table = None
+        self._staging = None
+        self._loading = output.table
+
+    @property
+    def target(self) -> str:
+        return f"table {self.output.table}"
+
+    def _prepare(self, schema):
+        connection = database_connection()
+        engine = connection.get_engine()
+        self._names = sanitized_names(list(schema))
+        self._table = table_from_schema(self.output.table, dict(schema), self.output.indexes)
+        if self.output.if_exists == "replace" and inspect(engine).has_table(self._table.name):
+            self._staging = create_staging_table(engine, self._table)
+            self._loading = self._staging.name
+        else:
+            create_or_validate_table(engine, self._table, self.output.if_exists)
+        self._writer = ParallelDataWriter(engine, connection.get_session_maker(), connection.config)
+
+    def write(self, df: pl.DataFrame) -> None:
+        if self._writer is None:
+            self._prepare(df.schema)
+        start_time = time.time()
+        self._writer.load_frame(df.rename(self._names), self._loading, DB_OUTPUT_BATCH_ROWS, self.output.write_method)
+        self.rows += df.height
+        logger.info(
+            "Wrote %d rows to %s in %.2fs", df.height, self.output.table, time.time() - start_time,
+            stage="write", rows=df.height,
+        )
+
+    def discard(self) -> None:
+        if self._staging is not None:
+            self._staging.drop(database_connection().get_engine(), checkfirst=True)
+            self._staging = None
+
+    def close(self) -> None:
+        if self._staging is not None:
+            swap_in_table(database_connection().get_engine(), self._staging, self._table)
+            self._staging = None
+        logger.info("Wrote %d rows to %s", self.rows, self.output.table)
+
+
+def write_database(frame: pl.LazyFrame, output: OutputSpec, staging_dir: Path) -> DatabaseSink:
+    """
+    Runs the plan and loads the result into output.table. The plan streams into a Parquet
+    file under `staging_dir` (see services.output_writer.write_frame), which is loaded
+    DB_OUTPUT_BATCH_ROWS rows per connection at a time, so only one chunk is in memory.
+    Returns the closed sink, which knows the table it wrote and the rows it loaded.
+    """
+    staging_path = staging_dir / DATABASE_STAGING_FILENAME
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    sink = DatabaseSink(output)
+    try:
+        write_frame(frame, OutputSpec(format="parquet", compression="lz4"), staging_path)
+        batches = pq.ParquetFile(staging_path).iter_batches(DB_OUTPUT_BATCH_ROWS * AppConfig.DB_WRITE_CONNECTIONS)
+        for batch in batches:
+            sink.write(pl.from_arrow(batch))
+        if sink.rows == 0:
+            # An empty result still defines (or replaces) the table
+            sink.write(pl.read_parquet(staging_path))
+    except BaseException:
+        sink.discard()
+        raise
+    finally:
+        staging_path.unlink(missing_ok=True)
+    sink.close()
+    return sink
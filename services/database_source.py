@@ -0,0 +1,333 @@
+import operator
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import polars as pl
+from dotenv import load_dotenv
+from sqlalchemy import MetaData, Table, and_, column, func, not_, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import sqltypes
+
+from models.pydantic_models import DatabaseSource, FilesAndJoinInfo, Filter, PrimaryFile
+from services.database_sink import database_connection
+from utils.file_reader import _applyReadOptions
+from utils.filter_expression import bind_params, literal_value, node_columns, parse_filter
+from utils.logger import logger
+
+load_dotenv()
+FILENAME_CONNECTOR = os.getenv('FILENAME_CONNECTOR')
+
+# Column types whose comparisons give the same result in SQL as in Polars
+EXACT_TYPES = (sqltypes.Integer, sqltypes.Numeric, sqltypes.Float, sqltypes.Date, sqltypes.DateTime, sqltypes.Time, sqltypes.Boolean)
+TEMPORAL_TYPES = (sqltypes.Date, sqltypes.DateTime, sqltypes.Time)
+
+SQL_OPERATORS = {"==": operator.eq, "!=": operator.ne, ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+# The same comparison with its operands swapped
+MIRRORED_OPERATORS = {"==": "==", "!=": "!=", ">": "<", ">=": "<=", "<": ">", "<=": ">="}
+
+
+def has_database_inputs(files_and_join_info: FilesAndJoinInfo) -> bool:
+    all_files = [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+    return any(f.database is not None for f in all_files)
+
+
+# Statements making a session read-only and back, for the dialects that have one
+READ_ONLY_STATEMENTS = {
+    "sqlite": ("PRAGMA query_only = ON", "PRAGMA query_only = OFF"),
+    "mysql": ("SET SESSION TRANSACTION READ ONLY", "SET SESSION TRANSACTION READ WRITE"),
+    "mariadb": ("SET SESSION TRANSACTION READ ONLY", "SET SESSION TRANSACTION READ WRITE"),
+    "postgresql": (
+        "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+        "SET SESSION CHARACTERISTICS AS TRANSACTION READ WRITE",
+    ),
+}
+
+
+@contextmanager
+def read_only_connection(engine: Engine):
+    """
+    A pooled connection on which the server refuses writes, for reading database inputs.
+    The session is made writable again before the connection goes back to the pool.
+    Dialects without such a setting get a plain connection, and no queries (see _source).
+    """
+    statements = READ_ONLY_STATEMENTS.get(engine.dialect.name)
+    with engine.connect() as connection:
+        if statements is None:
+            yield connection
+            return
+        connection.exec_driver_sql(statements[0])
+        # The setting applies from the next transaction on
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            connection.exec_driver_sql(statements[1])
+            connection.commit()
+
+
+def _source(engine: Engine, source: DatabaseSource):
+    """
+    The table, or the query as a subquery whose columns are found by running it for no rows.
+    Queries (only accepted with DB_ALLOW_QUERIES, see DatabaseSource) run on a read-only connection.
+    """
+    if source.table is not None:
+        return Table(source.table, MetaData(), autoload_with=engine)
+    if engine.dialect.name not in READ_ONLY_STATEMENTS:
+        raise ValueError(f"Database queries are not supported on {engine.dialect.name}, read a table instead")
+    # A line break, so a trailing -- comment cannot swallow the closing parenthesis
+    query = source.query + "\n"
+    with read_only_connection(engine) as connection:
+        names = list(connection.execute(text(f"SELECT * FROM ({query}) AS src WHERE 1 = 0")).keys())
+    return text(query).columns(*[column(name) for name in names]).subquery("src")
+
+
+def _pushable(col, dialect: str) -> Optional[bool]:
+    """
+    Whether filters on a column can be pushed down: True when SQL compares its values
+    exactly as Polars does, False for text, None when not at all.
+    Text may follow a case-insensitive or space-padding collation, so it only takes
+    conditions where that can add rows (which Polars then filters out again), never drop
+    them. SQLite keeps dates as text in whatever format they were written, and the
+    columns of a query have no known type.
+    """
+    if isinstance(col.type, TEMPORAL_TYPES) and dialect == "sqlite":
+        return None
+    if isinstance(col.type, EXACT_TYPES):
+        return True
+    if isinstance(col.type, sqltypes.String):
+        return False
+    return None
+
+
+def _value(node: tuple, exact: bool):
+    # Text columns are compared with the literal as written, as Polars does for Utf8 columns
+    return literal_value(node, None) if exact else node[1]
+
+
+def _leaf_clause(node: tuple, columns: Dict[str, Tuple[object, bool]]):
+    """
+    SQL form of one predicate and whether it is exact; (None, False) when it cannot be pushed down.
+    """
+    tag = node[0]
+    if tag == "isnull":
+        if node[1][0] != "col":
+            return None, False
+        col, _ = columns[node[1][1]]
+        return (col.is_not(None) if node[2] else col.is_(None)), True
+
+    if tag == "cmp":
+        op, left, right = node[1], node[2], node[3]
+        if left[0] != "col":
+            # Keep the column on the left so the value is bound with the column's type
+            op, left, right = MIRRORED_OPERATORS[op], right, left
+        if left[0] != "col" or (right[0] == "lit" and right[2] == "null"):
+            # (NULL comparisons are never true in Polars, SQLAlchemy would turn them into IS NULL)
+            return None, False
+        col, exact = columns[left[1]]
+        if right[0] == "col":
+            value, other_exact = columns[right[1]]
+            if other_exact != exact:
+                return None, False
+        else:
+            value = _value(right, exact)
+        if not exact and op != "==":
+            return None, False
+        return SQL_OPERATORS[op](col, value), exact
+
+    subject = node[1]
+    if subject[0] != "col":
+        return None, False
+    col, exact = columns[subject[1]]
+    negated = node[-1]
+    if negated and not exact:
+        return None, False
+
+    if tag == "in":
+        if any(value[0] != "lit" or value[2] == "null" for value in node[2]):
+            return None, False
+        clause = col.in_([_value(value, exact) for value in node[2]])
+    elif tag == "between":
+        if not exact or any(bound[0] != "lit" or bound[2] == "null" for bound in node[2:4]):
+            return None, False
+        clause = col.between(_value(node[2], exact), _value(node[3], exact))
+    else:
+        # LIKE is case-insensitive in most collations, and MySQL treats a backslash as an escape
+        if exact or "\\" in node[2]:
+            return None, False
+        clause = col.like(node[2])
+    return (not_(clause) if negated else clause), exact
+
+
+def filter_clause(node: tuple, columns: Dict[str, Tuple[object, bool]]) -> Tuple[Optional[object], bool]:
+    """
+    Translates a filter tree (see utils.filter_expression) into a SQL condition over
+    `columns` (prefixed name -> (table column, exact), see _pushable). Returns the condition
+    and whether it selects exactly the rows Polars would; an inexact condition selects a
+    superset of them. Parts that cannot be translated without dropping rows are left out
+    of AND conditions and make anything else untranslatable, returning (None, False).
+    """
+    tag = node[0]
+    if tag in ("and", "or"):
+        parts = [filter_clause(child, columns) for child in node[1]]
+        pushed = [clause for clause, _ in parts if clause is not None]
+        if not pushed or (tag == "or" and len(pushed) < len(parts)):
+            return None, False
+        exact = len(pushed) == len(parts) and all(exact for _, exact in parts)
+        return (and_(*pushed) if tag == "and" else or_(*pushed)), exact
+    if tag == "not":
+        # NOT of a superset would be a subset
+        clause, exact = filter_clause(node[1], columns)
+        return (not_(clause), True) if clause is not None and exact else (None, False)
+    if not set(node_columns(node)) <= set(columns):
+        return None, False
+    return _leaf_clause(node, columns)
+
+
+def pushdown_condition(file_details: PrimaryFile, source, dialect: str, filters: Optional[List[Filter]],
+                       params: Optional[Dict[str, object]] = None):
+    """
+    The WHERE condition for a database input: the part of the request's filters on it
+    that SQL can evaluate. The filters still run in Polars after the read, so the pushed
+    condition only has to keep every row they keep.
+    Columns the pipeline changes before filtering (date conversion, read option casts)
+    and derived columns are not pushed down.
+    """
+    prefix = f"{file_details.file_name.split('.')[0]}{FILENAME_CONNECTOR}"
+    file_filters = [f for f in filters or [] if f.file_name == file_details.file_name]
+    changed = set()
+    if file_details.read_options is not None:
+        changed |= {prefix + col for col in file_details.read_options.dtypes or {}}
+        changed |= {prefix + col for col in file_details.read_options.date_formats or {}}
+    changed |= {f.convert_condition.column_name for f in file_filters if f.convert_condition is not None}
+    columns = {}
+    for col in source.c:
+        exact = _pushable(col, dialect)
+        if exact is not None and prefix + col.name not in changed:
+            columns[prefix + col.name] = (col, exact)
+
+    clauses = []
+    for filter_details in file_filters:
+        nodes = [bind_params(parse_filter(expr), params or {}) for expr in filter_details.conditions.expressions]
+        combined = ("or" if filter_details.conditions.operator == "Or" else "and", nodes)
+        clause, _ = filter_clause(combined, columns)
+        if clause is not None:
+            clauses.append(clause)
+    return and_(*clauses) if clauses else None
+
+
+def _partition_bounds(low, high, partitions: int) -> list:
+    """
+    Split points dividing [low, high] into at most `partitions` ranges of equal width.
+    """
+    if isinstance(low, bool) or not isinstance(low, (int, float, Decimal)):
+        raise ValueError(f"partition_column must be numeric, its minimum is {low!r}")
+    if isinstance(low, int) and isinstance(high, int):
+        step = max(1, -(-(high - low + 1) // partitions))
+        return list(range(low + step, high + 1, step))
+    step = (float(high) - float(low)) / partitions
+    return [float(low) + step * i for i in range(1, partitions)] if step else []
+
+
+def _partition_conditions(key, bounds: list) -> list:
+    # The outer ranges are open-ended and the first one takes the NULL keys,
+    # so every row is read exactly once whatever the actual bounds are
+    if not bounds:
+        return [None]
+    conditions = [or_(key < bounds[0], key.is_(None))]
+    conditions += [and_(key >= low, key < high) for low, high in zip(bounds, bounds[1:])]
+    conditions.append(key >= bounds[-1])
+    return conditions
+
+
+def build_query(file_details: PrimaryFile, engine: Engine, columns: Optional[List[str]] = None,
+                filters: Optional[List[Filter]] = None, params: Optional[Dict[str, object]] = None):
+    """
+    The SELECT reading a database input: only `columns` (prefixed names, all when None)
+    and only the rows the pushed-down filters keep. Also returns the source it reads from.
+    """
+    source = _source(engine, file_details.database)
+    prefix = f"{file_details.file_name.split('.')[0]}{FILENAME_CONNECTOR}"
+    if columns is None:
+        selected = list(source.c)
+    else:
+        raw_columns = [col[len(prefix):] if col.startswith(prefix) else col for col in columns]
+        missing = [col for col in raw_columns if col not in source.c]
+        if missing:
+            raise ValueError(f"Columns not found in {file_details.file_name}: {missing}")
+        selected = [source.c[col] for col in raw_columns]
+
+    query = select(*selected).select_from(source)
+    condition = pushdown_condition(file_details, source, engine.dialect.name, filters, params)
+    if condition is not None:
+        query = query.where(condition)
+    return query, source
+
+
+def count_database_rows(file_details: PrimaryFile, filters: Optional[List[Filter]] = None,
+                        params: Optional[Dict[str, object]] = None) -> int:
+    """
+    Rows read_database would return with the same filters, counted by the database
+    without fetching any of them.
+    """
+    engine = database_connection().get_engine()
+    query, _ = build_query(file_details, engine, None, filters, params)
+    with read_only_connection(engine) as conn:
+        return conn.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+
+def read_database(file_details: PrimaryFile, columns: Optional[List[str]] = None,
+                  filters: Optional[List[Filter]] = None, params: Optional[Dict[str, object]] = None,
+                  limit: Optional[int] = None) -> pl.DataFrame:
+    """
+    Reads a database input (see build_query) into a DataFrame with the same '<name>__'
+    column prefixes and read options as a file. With several partitions the rows are read
+    by ranges of partition_column, in parallel over at most DB_READ_CONNECTIONS pooled
+    connections, and concatenated in range order.
+    With `limit`, at most that many rows are read, over a single connection.
+    """
+    connection = database_connection()
+    engine = connection.get_engine()
+    database = file_details.database
+    query, source = build_query(file_details, engine, columns, filters, params)
+    if limit is not None:
+        query = query.limit(limit)
+
+    conditions = [None]
+    if database.partitions > 1 and limit is None:
+        if database.partition_column not in source.c:
+            raise ValueError(f"Partition column {database.partition_column!r} not found in {file_details.file_name}")
+        key = source.c[database.partition_column]
+        with read_only_connection(engine) as conn:
+            # The bounds of the rows the read will return, pushed-down filters included
+            low, high = conn.execute(query.with_only_columns(func.min(key), func.max(key))).one()
+        if low is not None:
+            conditions = _partition_conditions(key, _partition_bounds(low, high, database.partitions))
+
+    def read(condition) -> pl.DataFrame:
+        with read_only_connection(engine) as conn:
+            return pl.read_database(
+                query if condition is None else query.where(condition), conn, infer_schema_length=None
+            )
+
+    start_time = time.time()
+    if len(conditions) == 1:
+        df = read(conditions[0])
+    else:
+        workers = min(len(conditions), connection.config.DB_READ_CONNECTIONS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(read, conditions))
+        df = pl.concat(frames, how="vertical_relaxed")
+    logger.info(
+        "Read %d rows of %s from the database in %d partitions in %.2fs",
+        df.height, file_details.file_name, len(conditions), time.time() - start_time,
+        stage="read", file=file_details.file_name, rows=df.height,
+    )
+
+    df = _applyReadOptions(df, file_details.read_options)
+    prefix = f"{file_details.file_name.split('.')[0]}{FILENAME_CONNECTOR}"
+    return df.rename({col: f"{prefix}{col}" for col in df.columns})
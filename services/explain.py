@@ -0,0 +1,146 @@
+import os
+from typing import Dict, List, Optional
+
+import polars as pl
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from models.pydantic_models import InputModel, JoinFile
+from services.database_source import count_database_rows
+from services.join_planner import JOIN_PLANNER_SAMPLE_ROWS, estimate_input, plan_join_order, sample_input
+from services.pipeline import combine_files, filter_files, read_files
+from services.projection import output_columns_to_drop, plan_projections
+from services.spill_join import spill_partition_count
+from utils.logger import logger
+from utils.path_util import getFullInputPath
+
+load_dotenv()
+# Largest JSON/Excel input explain reads: those formats have no lazy reader, so they are read in full
+EXPLAIN_MAX_FULL_READ_BYTES = int(os.getenv('EXPLAIN_MAX_FULL_READ_BYTES', 256 * 1024 ** 2))
+FULL_READ_EXTENSIONS = (".json", ".xls", ".xlsx")
+
+
+def _many_to_many_keys(left: pl.DataFrame, left_on: List[str], right: pl.DataFrame, right_on: List[str]) -> int:
+    """
+    Number of sampled join keys that repeat on both sides, i.e. that multiply rows.
+    """
+    left_counts = left.group_by(left_on).agg(pl.len().alias("left_count"))
+    right_counts = right.group_by(right_on).agg(pl.len().alias("right_count"))
+    matched = left_counts.join(right_counts, left_on=left_on, right_on=right_on, how="inner")
+    return matched.filter((pl.col("left_count") > 1) & (pl.col("right_count") > 1)).height
+
+
+def explain_request(request: InputModel, params: Optional[Dict[str, object]] = None) -> dict:
+    """
+    Plans a normalized request (see file_append) the way run_pipeline would, without running it.
+
+    Inputs are opened straight from the source whatever the execution mode, bypassing the
+    dataframe cache and ingest sidecars, and read as follows:
+    - CSV/TSV, Parquet and IPC: the first JOIN_PLANNER_SAMPLE_ROWS rows, filtered in memory
+      (see sample_input); row counts come from Parquet/IPC footers or are extrapolated from
+      the size of CSV files.
+    - JSON and Excel: read in full, as Polars has no lazy reader for them. Files over
+      EXPLAIN_MAX_FULL_READ_BYTES are refused.
+    - Database inputs: at most JOIN_PLANNER_SAMPLE_ROWS rows with their filters pushed down,
+      counted by a COUNT(*) of the same query the database runs.
+    Samples are taken from the head of each input, so the estimates are off when a file is
+    sorted on a filtered or join column.
+
+    Returns the optimized Polars plan, the join order, per-file size estimates and an output
+    cardinality estimate: the request joined over the sampled rows, scaled up by each
+    file's sampling ratio.
+    """
+    files_and_join_info = request.files_and_join_info
+    primary_file = files_and_join_info.primary_file
+    secondary_files = list(files_and_join_info.secondary_files or [])
+    all_files = [primary_file] + secondary_files
+    for file_details in all_files:
+        if file_details.database is not None:
+            continue
+        path = getFullInputPath(file_details.file_name)
+        if path.suffix.lower() in FULL_READ_EXTENSIONS and os.path.getsize(path) > EXPLAIN_MAX_FULL_READ_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{file_details.file_name} would be read in full, it is larger than "
+                       f"EXPLAIN_MAX_FULL_READ_BYTES ({EXPLAIN_MAX_FULL_READ_BYTES} bytes)",
+            )
+
+    df_map = read_files(
+        files_and_join_info, True, plan_projections(request), filters=request.filter, params=params,
+        sample_rows=JOIN_PLANNER_SAMPLE_ROWS,
+    )
+    # Database inputs were only sampled, the database counts their rows
+    source_rows = {
+        f.file_name: count_database_rows(f, request.filter, params) for f in all_files if f.database is not None
+    }
+    unfiltered_map = dict(df_map)
+    if request.filter:
+        df_map = filter_files(df_map, request.filter, params)
+    join_order, _ = plan_join_order(df_map, files_and_join_info, unfiltered_map, request.filter, params, source_rows)
+    combined = combine_files(df_map, files_and_join_info, output_columns_to_drop(request), join_order)
+
+    warnings = []
+    inputs = {}
+    samples = {}
+    scale = 1.0
+    for file_details in all_files:
+        file_name = file_details.file_name
+        file_filters = [f for f in request.filter or [] if f.file_name == file_name]
+        sample = sample_input(unfiltered_map[file_name], df_map[file_name], file_filters, params)
+        estimate = estimate_input(
+            JoinFile(Filename=file_name, Join_columns=file_details.join_columns),
+            unfiltered_map[file_name],
+            df_map[file_name],
+            file_filters,
+            params,
+            source_rows.get(file_name),
+            sample,
+        )
+        samples[file_name] = sample[0]
+        sampled_rows = samples[file_name].height
+        if sampled_rows:
+            scale *= max(estimate["estimated_rows"], sampled_rows) / sampled_rows
+        inputs[file_name] = {
+            "bytes": os.path.getsize(getFullInputPath(file_name)) if file_details.database is None else None,
+            "filters": sum(len(f.conditions.expressions) for f in file_filters),
+            **estimate,
+        }
+
+    for file_details in secondary_files:
+        repeated = _many_to_many_keys(
+            samples[primary_file.file_name], primary_file.join_columns,
+            samples[file_details.file_name], file_details.join_columns,
+        )
+        inputs[file_details.file_name]["many_to_many_keys"] = repeated
+        if repeated:
+            warnings.append(
+                f"{file_details.file_name}: {repeated} sampled join keys repeat on both sides, "
+                f"the join multiplies rows ({file_details.join_type} join)"
+            )
+
+    try:
+        sampled_output = combine_files(
+            samples, files_and_join_info, output_columns_to_drop(request), join_order
+        ).select(pl.len()).collect().item()
+        estimated_output = int(sampled_output * scale)
+    except Exception as e:
+        logger.warning(f"Could not join the samples: {e}")
+        sampled_output, estimated_output = None, None
+        warnings.append(f"Joining the sampled rows failed: {e}")
+
+    estimated_input = sum(estimate["estimated_rows"] for estimate in inputs.values())
+    if estimated_output is not None and secondary_files and estimated_output > estimated_input:
+        warnings.append(f"Estimated output ({estimated_output} rows) exceeds all inputs combined ({estimated_input} rows)")
+
+    partitions = spill_partition_count(request)
+    return {
+        "execution_mode": request.execution_mode,
+        "join_strategy": f"spill ({partitions} partitions)" if partitions else "in memory",
+        "join_order": [primary_file.file_name] + [f.file_name for f in join_order],
+        "inputs": inputs,
+        "sampled_output_rows": sampled_output,
+        "estimated_output_rows": estimated_output,
+        "output_columns": combined.columns,
+        "plan": combined.explain(optimized=True),
+        "warnings": warnings,
+    }
@@ -1,45 +1,112 @@
 from fastapi import HTTPException
 from models.pydantic_models import PrimaryFile, JoinFile
 from utils.logger import logger
-from typing import List,Dict
+from typing import List,Dict,Union
 import polars as pl
 
-def make_join_statement(left_join_cols: List[str], right_join_cols: List[str]) -> str:
+# Request join types -> Polars join strategies. Polars 0.20 has no right join, see join_pair.
+# A full join keeps both key columns unless the request asks to coalesce them (how="outer"
+# and "outer_coalesce" are deprecated spellings of the two)
+JOIN_HOW = {"inner": "inner", "left": "left", "full outer": "full"}
+
+# A right join is run as a left join with the sides swapped, so the cardinality check flips too
+FLIPPED_VALIDATION = {"m:m": "m:m", "1:1": "1:1", "1:m": "m:1", "m:1": "1:m"}
+
+# Marks the right-hand rows of a left join, so unmatched rows can be told apart after the join
+MATCH_COLUMN = "__join_matched"
+
+def check_join_columns(left_join_cols: List[str], right_join_cols: List[str]):
     if len(left_join_cols) != len(right_join_cols):
         logger.error("Joins Columns number mismatch")
-        raise Exception("Joins Columns number mismatch")  # is line ko complete kar dena
-    join_string = ""
-    n = len(left_join_cols)
-    for i in range(n):
-        join_string = f"df1.{left_join_cols[i]} = df2.{right_join_cols[i]}"
-        if i != n - 1:
-            join_string += " and "
-    return join_string
-
-def join_files(df_map: Dict[str,pl.DataFrame], primary_info: PrimaryFile, secondary_files: list[JoinFile]) -> pl.DataFrame:
+        raise Exception("Joins Columns number mismatch")
+
+def _join_keeping_keys(left: pl.LazyFrame, right: pl.LazyFrame, how: str, left_on: List[str],
+                       right_on: List[str], validate: str, suffix: str) -> pl.LazyFrame:
+    """
+    An inner or left join with the key columns of both sides in the result, laid out as
+    coalesce=False lays them out. Polars 0.20 can only stream coalesced joins, so the join
+    itself coalesces and the right keys are put back from the left ones afterwards:
+    equal to them where a row matched, null where a left join found no match.
+    """
+    left_columns = left.columns
+    right_columns = right.columns
+    if how == "left":
+        right = right.with_columns(pl.lit(True).alias(MATCH_COLUMN))
+    joined = left.join(
+        right, how=how, left_on=left_on, right_on=right_on, validate=validate, suffix=suffix, coalesce=True
+    )
+    # Right columns whose name the left side already uses get the suffix, keys included
+    names = {col: f"{col}{suffix}" if col in left_columns else col for col in right_columns}
+    keys = [
+        (pl.col(l) if how == "inner" else pl.when(pl.col(MATCH_COLUMN)).then(pl.col(l))).alias(names[r])
+        for l, r in zip(left_on, right_on)
+    ]
+    return joined.with_columns(keys).select(left_columns + [names[col] for col in right_columns])
+
+def join_pair(left: pl.LazyFrame, right: pl.LazyFrame, left_on: List[str], file_details: JoinFile) -> pl.LazyFrame:
+    """
+    Joins one secondary file onto the running result on every key pair at once.
+    Inner, left and right joins are always run coalesced so the plan stays streamable,
+    whether or not the request keeps both key columns (see _join_keeping_keys).
+    """
+    right_on = file_details.join_columns
+    check_join_columns(left_on, right_on)
+
+    if file_details.strategy == "sorted":
+        if len(left_on) == 1:
+            # The caller vouches both sides are sorted on the key; Polars then merges instead of hashing
+            left = left.set_sorted(left_on[0])
+            right = right.set_sorted(right_on[0])
+        else:
+            logger.warning(f"Sorted join needs a single key, hashing {file_details.file_name} instead")
+
+    if file_details.join_type == "right":
+        validate = FLIPPED_VALIDATION[file_details.join_validation]
+        if file_details.coalesce:
+            joined = right.join(
+                left, how="left", left_on=right_on, right_on=left_on,
+                validate=validate, suffix=file_details.suffix, coalesce=True,
+            )
+        else:
+            joined = _join_keeping_keys(right, left, "left", right_on, left_on, validate, file_details.suffix)
+        if file_details.coalesce:
+            # Merged keys keep the running result's names, as in every other join type
+            joined = joined.rename(dict(zip(right_on, left_on)))
+        # Put the running result's columns back in front
+        left_columns = [col for col in left.columns if col in joined.columns]
+        return joined.select(left_columns + [col for col in joined.columns if col not in left_columns])
+
+    how = JOIN_HOW[file_details.join_type]
+    if how != "full" and not file_details.coalesce:
+        return _join_keeping_keys(
+            left, right, how, left_on, right_on, file_details.join_validation, file_details.suffix
+        )
+    # Full joins cannot stream on Polars 0.20 either way
+    return left.join(
+        right,
+        how=how,
+        left_on=left_on,
+        right_on=right_on,
+        validate=file_details.join_validation,
+        suffix=file_details.suffix,
+        coalesce=file_details.coalesce,
+    )
+
+def join_files(df_map: Dict[str,Union[pl.DataFrame,pl.LazyFrame]], primary_info: PrimaryFile, secondary_files: list[JoinFile]) -> pl.LazyFrame:
     try:
         primary_df_name = primary_info.file_name
         primary_join_columns = primary_info.join_columns
 
-        df1=df_map[primary_df_name]
+        joined_df = df_map[primary_df_name].lazy()
 
         # Iteratively join all secondary files
         for file_details in secondary_files:
-            df2=df_map[file_details.file_name]
-            join_columns = file_details.join_columns
-
-            join_expr = f"""
-                SELECT * 
-                FROM df1 
-                {file_details.join_type} JOIN df2
-                on 
-            """
-
-            join_expr += make_join_statement(primary_join_columns,join_columns)
-            # logger.info(f"Executing SQL: {join_expr}")
-            joined_df = pl.sql(join_expr)
-
-            df1 = joined_df
+            joined_df = join_pair(
+                joined_df,
+                df_map[file_details.file_name].lazy(),
+                primary_join_columns,
+                file_details,
+            )
 
         return joined_df
 
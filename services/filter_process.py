@@ -1,22 +1,58 @@
+import os
+import threading
 import polars as pl
-import re
+from collections import OrderedDict
+from dotenv import load_dotenv
 from models.pydantic_models import ConvertCondition, FilterConditions
 from utils.logger import logger
-from utils.constants import replacements, known_formats
-from datetime import datetime
-
-def apply_filters(df: pl.DataFrame, conditions: FilterConditions, convert_condition: ConvertCondition = None) -> pl.DataFrame:
+from utils.constants import known_formats
+from utils.date_validator import convert_to_python_strftime
+from utils.filter_expression import compile_filter, filter_columns
+from utils.file_fingerprint import fileFingerprint
+from typing import Dict, List, Optional, Union
+
+load_dotenv()
+# Non-null values of a column sampled to infer its date format(s)
+DATE_FORMAT_SAMPLE_ROWS = int(os.getenv('DATE_FORMAT_SAMPLE_ROWS', 1000))
+# (file, column) pairs whose inferred formats are kept; the least recently used go first
+DATE_FORMAT_CACHE_SIZE = int(os.getenv('DATE_FORMAT_CACHE_SIZE', 1024))
+
+Frame = Union[pl.DataFrame, pl.LazyFrame]
+
+# Inferred source formats per (file, column) -> (fingerprint, formats), reused while the
+# file is unchanged; a rewritten file replaces its own entry
+_inferred_formats: "OrderedDict[tuple, tuple]" = OrderedDict()
+_inferred_formats_lock = threading.Lock()
+
+def _cached_formats(key: tuple, version: tuple) -> Optional[List[str]]:
+    with _inferred_formats_lock:
+        entry = _inferred_formats.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        _inferred_formats.move_to_end(key)
+        return entry[1]
+
+def _remember_formats(key: tuple, version: tuple, formats: List[str]):
+    with _inferred_formats_lock:
+        _inferred_formats[key] = (version, formats)
+        _inferred_formats.move_to_end(key)
+        while len(_inferred_formats) > DATE_FORMAT_CACHE_SIZE:
+            _inferred_formats.popitem(last=False)
+
+def apply_filters(df: Frame, conditions: FilterConditions, convert_condition: ConvertCondition = None,
+                  source_path=None, params: Optional[Dict[str, object]] = None) -> Frame:
     try:
         # Apply datetime conversion if needed
 
         if convert_condition:
-            df = convertDatetimeColumn(df, convert_condition)
+            df = convertDatetimeColumn(df, convert_condition, source_path)
         
         expressions = conditions.expressions
         operator = conditions.operator
 
-        # Parse expressions into Polars expressions
-        parsed_exprs = [parse_expression(expr) for expr in expressions]
+        # Compile expressions into Polars expressions, typing literals after the file's columns
+        schema = df.schema
+        parsed_exprs = [parse_expression(expr, schema, params) for expr in expressions]
 
         if len(parsed_exprs) == 1:
             # Single expression, apply directly
@@ -39,19 +75,39 @@ def apply_filters(df: pl.DataFrame, conditions: FilterConditions, convert_condit
         raise Exception("Got error while applying filter ")
 
 
-def convertDatetimeColumn(df: pl.DataFrame, convert_condition: ConvertCondition) -> pl.DataFrame:
+def convertDatetimeColumn(df: Frame, convert_condition: ConvertCondition, source_path=None) -> Frame:
+    """
+    Reformats a date column into the user's format. Text columns are parsed with the
+    format(s) inferred from a sample (see infer_formats); with several formats every value
+    takes the first one that parses it, all in one native pass.
+    `source_path` (the input file) lets the inferred formats be reused on later requests.
+    """
     column = convert_condition.column_name
     user_format = convert_condition.format
 
     # logger.easyPrint(f"Converting column '{column}' using target format '{user_format}'")
 
-    # Step 1: Infer original format from the first row
-    example_value = df[column][0]
-    original_format = infer_format_from_string(example_value)
-    if not original_format:
-        raise ValueError(f"Could not infer original format from value: {example_value}")
-
-    # logger.easyPrint(f"Inferred original format: {original_format}")
+    # Columns typed as dates at read time only need reformatting
+    if df.schema[column].is_temporal():
+        return df.with_columns(pl.col(column).dt.strftime(convert_to_python_strftime(user_format)).alias(column))
+
+    # Step 1: Infer the original format(s) from a sample of the column
+    cache_key = version = None
+    if source_path is not None:
+        fingerprint = fileFingerprint(source_path)
+        cache_key = (str(source_path), column)
+        version = (fingerprint["size"], fingerprint["mtime_ns"], fingerprint["digest"])
+    original_formats = _cached_formats(cache_key, version) if cache_key else None
+    if original_formats is None:
+        # (on a LazyFrame only the sampled rows are materialized)
+        sample = df.select(pl.col(column).drop_nulls().head(DATE_FORMAT_SAMPLE_ROWS))
+        if isinstance(sample, pl.LazyFrame):
+            sample = sample.collect()
+        original_formats = infer_formats(sample[column])
+        if not original_formats:
+            raise ValueError(f"Could not infer original format of column '{column}'")
+        if cache_key:
+            _remember_formats(cache_key, version, original_formats)
 
     # Step 2: Convert user-provided format to Python datetime format
     python_target_format = convert_to_python_strftime(user_format)
@@ -59,8 +115,10 @@ def convertDatetimeColumn(df: pl.DataFrame, convert_condition: ConvertCondition)
     # Step 3: Convert to datetime using original format, then format to user format
     try:
         df = df.with_columns(
-            pl.col(column)
-            .str.strptime(pl.Datetime, original_format, strict=False)
+            pl.coalesce([
+                pl.col(column).str.strptime(pl.Datetime, original_format, strict=False)
+                for original_format in original_formats
+            ])
             .dt.strftime(python_target_format)
             .alias(column)
         )
@@ -72,68 +130,47 @@ def convertDatetimeColumn(df: pl.DataFrame, convert_condition: ConvertCondition)
     return df
 
 
-def infer_format_from_string(date_str: str) -> str:
+def infer_formats(values: pl.Series) -> List[str]:
     """
-    Infer a datetime format from a sample date string.
+    Smallest list of known_formats that parses the sampled values, best match first.
+    Every candidate is tried on the whole sample at once; ties go to the earlier known format.
     """
-    # Examples of common formats — expand as needed
-    
-    for fmt in known_formats:
-        try:
-            datetime.strptime(date_str, fmt)
-            return fmt
-        except ValueError:
-            continue
-    return None
-
-
-def convert_to_python_strftime(custom_format: str) -> str:
+    if values.dtype != pl.Utf8:
+        values = values.cast(pl.Utf8)
+    if values.is_empty():
+        return []
+
+    matches = pl.DataFrame({
+        fmt: values.str.strptime(pl.Datetime, fmt, strict=False).is_not_null()
+        for fmt in known_formats
+    })
+    chosen = []
+    unmatched = pl.Series([True] * len(values))
+    while True:
+        counts = {fmt: (matches[fmt] & unmatched).sum() for fmt in known_formats if fmt not in chosen}
+        best = max(counts, key=counts.get, default=None)
+        if best is None or counts[best] == 0:
+            break
+        chosen.append(best)
+        unmatched &= ~matches[best]
+
+    left_over = unmatched.sum()
+    if chosen and left_over:
+        logger.warning(f"{left_over} of {len(values)} sampled values match no known date format and become null")
+    return chosen
+
+
+def expression_columns(expr: str) -> List[str]:
     """
-    Convert user-provided format like 'yy/mm/dd' to Python strftime format.
+    Columns referenced by a filter expression such as 'age > 30 AND city IN (Pune, Delhi)'.
     """
+    return filter_columns(expr)
 
-    python_format = custom_format.lower()
-    for key, val in replacements.items():
-        python_format = python_format.replace(key, val)
-
-    return python_format
 
-
-def parse_expression(expr: str) -> pl.Expr:
+def parse_expression(expr: str, schema: Optional[Dict[str, pl.DataType]] = None,
+                     params: Optional[Dict[str, object]] = None) -> pl.Expr:
     """
-    Convert a string expression like 'age > 30' to a Polars expression.
+    Convert a string expression like 'age > 30' or 'age > :min_age' to a Polars expression.
+    See utils.filter_expression for the grammar; compiled expressions are cached.
     """
-    pattern = r"(.+?)\s*(==|!=|>=|<=|>|<)\s*(.+)"
-    match = re.match(pattern, expr.strip())
-    if not match:
-        raise ValueError(f"Invalid expression format: '{expr}'")
-
-    column, op, value = match.groups()
-    column = column.strip()
-    value = value.strip().strip('"').strip("'")
-
-    # Try to infer the type
-    try:
-        if "-" in value or "/" in value:
-            value = pl.lit(datetime.fromisoformat(value))
-        elif "." in value:
-            value = float(value)
-        else:
-            value = int(value)
-    except ValueError:
-        value = pl.lit(value)
-
-    if op == "==":
-        return pl.col(column) == value
-    elif op == "!=":
-        return pl.col(column) != value
-    elif op == ">":
-        return pl.col(column) > value
-    elif op == ">=":
-        return pl.col(column) >= value
-    elif op == "<":
-        return pl.col(column) < value
-    elif op == "<=":
-        return pl.col(column) <= value
-    else:
-        raise ValueError(f"Unsupported operator: '{op}'")
\ No newline at end of file
+    return compile_filter(expr, schema, params)
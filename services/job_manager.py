@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from models.pydantic_models import InputModel
+from services.pipeline import PipelineCancelled, run_pipeline
+from utils.logger import logger, request_id_var
+
+load_dotenv()
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+# Jobs allowed to wait for a worker; submissions beyond this are rejected
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 50))
+# Finished jobs kept around for GET /jobs/{id}
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', 1000))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    """
+    State of one submitted /process request.
+    """
+    def __init__(self, request: InputModel, params: Optional[Dict[str, object]] = None):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.params = params
+        self.status = QUEUED
+        self.timings: Dict[str, float] = {}
+        self.output = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage_timings": dict(self.timings),
+            "output": str(self.output) if self.output is not None else None,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs normalized requests on a bounded worker pool so the API threads only enqueue.
+    At most `workers` jobs run at once and at most `queue_size` more may wait.
+    """
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 history_size: int = JOB_HISTORY_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._history_size = history_size
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, request: InputModel, params: Optional[Dict[str, object]] = None) -> Job:
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull("Job queue is full, retry later")
+
+        job = Job(request, params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim_history()
+        job.future = self._executor.submit(self._run, job)
+        job.future.add_done_callback(lambda _: self._slots.release())
+        logger.info(f"Job {job.id} queued")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Queued jobs never start; running jobs stop at their next stage boundary.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            # The future never started, so _run will not record the outcome
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        logger.info(f"Job {job.id} cancellation requested")
+        return job
+
+    def _run(self, job: Job):
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        # Everything logged for this run carries the job id
+        token = request_id_var.set(job.id)
+        try:
+            job.output = run_pipeline(
+                job.request, timings=job.timings, cancel_event=job.cancel_event, run_id=job.id,
+                params=job.params,
+            )
+            job.status = SUCCEEDED
+        except PipelineCancelled as e:
+            job.status = CANCELLED
+            job.error = str(e)
+        except HTTPException as e:
+            job.status = FAILED
+            job.error = e.detail
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            logger.info("Job %s %s", job.id, job.status)
+            request_id_var.reset(token)
+
+    def status_counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _trim_history(self):
+        # Only finished jobs are dropped; live jobs are bounded by the slots already
+        overflow = len(self._jobs) - self._history_size
+        for job_id in [j.id for j in self._jobs.values() if j.status in FINISHED_STATES][:max(overflow, 0)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
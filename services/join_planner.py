@@ -0,0 +1,185 @@
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+import polars as pl
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from models.pydantic_models import FilesAndJoinInfo, Filter, JoinFile
+from services.filter_process import apply_filters
+from services.output_writer import ipc_rows
+from utils.logger import logger
+from utils.path_util import getFullInputPath
+
+load_dotenv()
+JOIN_REORDER_ENABLED = os.getenv('JOIN_REORDER_ENABLED', 'true').lower() == 'true'
+# Rows sampled per file to estimate filter selectivity and key distinctness
+JOIN_PLANNER_SAMPLE_ROWS = int(os.getenv('JOIN_PLANNER_SAMPLE_ROWS', 10000))
+
+Frame = Union[pl.DataFrame, pl.LazyFrame]
+
+# Every secondary file joins on the primary file's key columns, so inner and left joins
+# commute with each other. A full outer or right join can null those keys and fixes
+# the position of everything after it.
+REORDERABLE_JOIN_TYPES = ("inner", "left")
+
+
+def reorderable_prefix(secondary_files: List[JoinFile]) -> int:
+    """
+    Number of leading secondary files that may be joined in any order.
+    """
+    for position, file_details in enumerate(secondary_files):
+        if file_details.join_type not in REORDERABLE_JOIN_TYPES:
+            return position
+    return len(secondary_files)
+
+
+def _estimate_source_rows(file_name: str, raw: Frame) -> int:
+    """
+    Row count of an unfiltered input without reading its rows: exact for in-memory frames
+    and from the footers of Parquet and IPC files, extrapolated from the average line length
+    of the first 64 KB for CSV/TSV. Other inputs (JSON, Excel, database reads) are held in
+    memory once opened and are counted there.
+    """
+    if isinstance(raw, pl.DataFrame):
+        return raw.height
+
+    full_file_path = getFullInputPath(file_name)
+    ext = os.path.splitext(full_file_path)[-1].lower()
+    if ext in [".csv", ".tsv"]:
+        with open(full_file_path, "rb") as f:
+            head = f.read(64 * 1024)
+        lines = head.count(b"\n")
+        if lines == 0 or len(head) < 64 * 1024:
+            return max(lines - 1, 0) if head.endswith(b"\n") else lines
+        return int(os.path.getsize(full_file_path) / (len(head) / lines)) - 1
+    if ext == ".parquet":
+        return pq.ParquetFile(full_file_path).metadata.num_rows
+    if ext in [".ipc", ".feather"]:
+        return ipc_rows(full_file_path)
+    return raw.select(pl.len()).collect().item()
+
+
+def sample_input(
+    raw: Frame,
+    filtered: Frame,
+    file_filters: List[Filter],
+    params: Optional[Dict[str, object]] = None,
+) -> Tuple[pl.DataFrame, float]:
+    """
+    A filtered sample of one input and the share of the sampled rows its filters keep.
+    Eager frames are already filtered and are sampled as they are. Lazy ones read the first
+    JOIN_PLANNER_SAMPLE_ROWS rows of the unfiltered input (the slice is pushed into the scan)
+    and filter them in memory, so a selective filter cannot run the read on through the file.
+    A head-of-file sample is biased when the file is sorted on a filtered or join column.
+    """
+    if isinstance(filtered, pl.DataFrame):
+        return filtered.head(JOIN_PLANNER_SAMPLE_ROWS), 1.0
+    sample = raw.head(JOIN_PLANNER_SAMPLE_ROWS).collect()
+    sampled_rows = sample.height
+    for filter_details in file_filters:
+        sample = apply_filters(
+            sample, filter_details.conditions, filter_details.convert_condition, params=params
+        )
+    return sample, sample.height / sampled_rows if sampled_rows else 1.0
+
+
+def estimate_input(
+    file_details: JoinFile,
+    raw: Frame,
+    filtered: Frame,
+    file_filters: List[Filter],
+    params: Optional[Dict[str, object]] = None,
+    source_rows: Optional[int] = None,
+    sample: Optional[Tuple[pl.DataFrame, float]] = None,
+) -> Dict[str, float]:
+    """
+    Post-filter cardinality of one secondary file and the number of distinct join keys it keeps.
+    Eager frames are already filtered and counted exactly; lazy ones are estimated from
+    their unfiltered row count (or `source_rows`, when the caller knows it) and the
+    selectivity of a sample (see sample_input; `sample` reuses one already taken).
+    """
+    keys = file_details.join_columns
+    sample, selectivity = sample or sample_input(raw, filtered, file_filters, params)
+    if isinstance(filtered, pl.DataFrame):
+        rows = filtered.height
+    elif source_rows is not None:
+        rows = source_rows
+    else:
+        rows = _estimate_source_rows(file_details.file_name, raw)
+
+    distinct_ratio = sample.select(keys).unique().height / sample.height if sample.height and keys else 0.0
+    estimated_rows = rows * selectivity
+    return {
+        "rows": rows,
+        "selectivity": round(selectivity, 4),
+        "distinct_ratio": round(distinct_ratio, 4),
+        "estimated_rows": int(estimated_rows),
+        # An inner join can keep at most this many distinct keys of the running result
+        "estimated_keys": int(estimated_rows * distinct_ratio),
+    }
+
+
+def plan_join_order(
+    df_map: Dict[str, Frame],
+    files_and_join_info: FilesAndJoinInfo,
+    unfiltered_map: Optional[Dict[str, Frame]] = None,
+    filters: Optional[List[Filter]] = None,
+    params: Optional[Dict[str, object]] = None,
+    source_rows: Optional[Dict[str, int]] = None,
+) -> Tuple[List[JoinFile], Dict[str, dict]]:
+    """
+    Orders the secondary files so the running result stays small: within the reorderable
+    prefix, inner joins come first, the one keeping the fewest distinct keys leading,
+    followed by the left joins in request order. Files after the first full outer or
+    right join keep their position.
+    `source_rows` gives the unfiltered row counts of inputs that were only sampled from.
+    Returns the join order and the per-file estimates it was based on.
+    """
+    secondary_files = list(files_and_join_info.secondary_files or [])
+    prefix = reorderable_prefix(secondary_files)
+    inner_joins = [f for f in secondary_files[:prefix] if f.join_type == "inner"]
+    if not JOIN_REORDER_ENABLED or not inner_joins or prefix < 2:
+        return secondary_files, {}
+
+    unfiltered_map = unfiltered_map or df_map
+    estimates = {}
+    try:
+        for file_details in secondary_files[:prefix]:
+            if file_details.join_type != "inner":
+                continue
+            file_filters = [f for f in filters or [] if f.file_name == file_details.file_name]
+            estimates[file_details.file_name] = estimate_input(
+                file_details,
+                unfiltered_map[file_details.file_name],
+                df_map[file_details.file_name],
+                file_filters,
+                params,
+                (source_rows or {}).get(file_details.file_name),
+            )
+    except Exception as e:
+        logger.warning(f"Join planning failed, keeping request order: {e}")
+        return secondary_files, {}
+
+    inner_joins.sort(key=lambda f: (estimates[f.file_name]["estimated_keys"], estimates[f.file_name]["estimated_rows"]))
+    left_joins = [f for f in secondary_files[:prefix] if f.join_type == "left"]
+    ordered = inner_joins + left_joins + secondary_files[prefix:]
+
+    logger.info(f"Join order: {' -> '.join(f.file_name for f in ordered)}")
+    for file_name, estimate in estimates.items():
+        logger.info(f"Join estimate for {file_name}: {estimate}")
+    if prefix < len(secondary_files):
+        logger.info(f"Join order fixed from {secondary_files[prefix].file_name} on ({secondary_files[prefix].join_type} join)")
+    return ordered, estimates
+
+
+def restore_column_order(joined: pl.LazyFrame, df_map: Dict[str, Frame], files_and_join_info: FilesAndJoinInfo) -> pl.LazyFrame:
+    """
+    Puts the columns back in the order the request's own join order would have produced.
+    """
+    expected = list(df_map[files_and_join_info.primary_file.file_name].columns)
+    for file_details in files_and_join_info.secondary_files or []:
+        expected += df_map[file_details.file_name].columns
+    present = joined.columns
+    ordered = [col for col in expected if col in present]
+    return joined.select(ordered + [col for col in present if col not in ordered])
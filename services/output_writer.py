@@ -0,0 +1,229 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from models.pydantic_models import OutputSpec
+from utils.constants import output_extensions
+from utils.logger import logger
+
+load_dotenv()
+# Name of the temporary spill file used while splitting a result into partitions
+PARTITION_SPILL_FILENAME = "_partition_spill.parquet"
+# Rows held in memory at a time while a spill file is split into partitions
+PARTITION_CHUNK_ROWS = int(os.getenv('PARTITION_CHUNK_ROWS', 256 * 1024))
+
+
+def _ipc_compression(output: OutputSpec):
+    # Polars spells an uncompressed IPC file as compression=None
+    if output.compression == "uncompressed":
+        return None
+    return output.compression or "zstd"
+
+
+def _sink(frame: pl.LazyFrame, output: OutputSpec, path: Path) -> None:
+    """
+    Streams the plan straight into the file without materializing the full result.
+    """
+    if output.format == "parquet":
+        frame.sink_parquet(
+            path,
+            compression=output.compression or "zstd",
+            statistics=True,
+            row_group_size=output.row_group_size,
+        )
+    elif output.format == "ipc":
+        frame.sink_ipc(path, compression=_ipc_compression(output))
+    else:
+        frame.sink_csv(path)
+
+
+def _write_collected(df: pl.DataFrame, output: OutputSpec, path: Path) -> None:
+    if output.format == "parquet":
+        df.write_parquet(
+            path,
+            compression=output.compression or "zstd",
+            statistics=True,
+            row_group_size=output.row_group_size,
+        )
+    elif output.format == "ipc":
+        df.write_ipc(path, compression=_ipc_compression(output))
+    else:
+        df.write_csv(path)
+
+
+def write_frame(frame: pl.LazyFrame, output: OutputSpec, path: Path) -> None:
+    """
+    Writes one LazyFrame to `path`, streaming when the plan allows it.
+    Plans the streaming engine cannot run yet (e.g. SQL outer joins) fall back
+    to a regular collect followed by a write.
+    """
+    try:
+        _sink(frame, output, path)
+    except pl.exceptions.PolarsError as e:
+        logger.warning(
+            "Streaming sink not available for this plan, collecting it in memory instead: %s", e,
+            stage="write", fallback="collect",
+        )
+        _write_collected(frame.collect(), output, path)
+
+
+def _partition_dir_name(column: str, value) -> str:
+    return f"{column}={'null' if value is None else value}"
+
+
+def _write_partitioned(frame: pl.LazyFrame, output: OutputSpec, output_dir: Path) -> None:
+    """
+    Writes a hive-style directory tree (col=value/part-0.<ext>).
+    The plan is executed once into a Parquet spill file, which is then split in a
+    single pass (see split_parquet), so neither step needs the full result in RAM.
+    Every partition keeps a file open until the split is done.
+    """
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+
+    spill_path = output_dir / PARTITION_SPILL_FILENAME
+    write_frame(frame, OutputSpec(format="parquet", compression="lz4"), spill_path)
+    try:
+        spilled = pl.scan_parquet(spill_path)
+        missing = [col for col in output.partition_by if col not in spilled.columns]
+        if missing:
+            raise ValueError(f"Partition columns not found in the output: {missing}")
+
+        def writer_for(key: tuple) -> ChunkedWriter:
+            partition_dir = output_dir.joinpath(
+                *[_partition_dir_name(col, value) for col, value in zip(output.partition_by, key)]
+            )
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            return ChunkedWriter(output, partition_dir / f"part-0{output_extensions[output.format]}")
+
+        split_parquet(spill_path, output.partition_by, writer_for)
+    finally:
+        spill_path.unlink(missing_ok=True)
+
+
+def split_parquet(path: Path, by: List[str], writer_for: Callable[[tuple], "ChunkedWriter"]) -> Dict[tuple, "ChunkedWriter"]:
+    """
+    Splits a Parquet file by the values of the `by` columns, reading it once in chunks of
+    PARTITION_CHUNK_ROWS rows: the rows of each distinct key are appended to the writer
+    `writer_for(key)` opens for it (keys are tuples, None for null), without the `by`
+    columns. The writers are closed on return and returned by key.
+    """
+    writers = {}
+    try:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=PARTITION_CHUNK_ROWS):
+            chunk = pl.from_arrow(batch)
+            for key, part in chunk.partition_by(by, as_dict=True, include_key=False).items():
+                if key not in writers:
+                    writers[key] = writer_for(key)
+                writers[key].write(part)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return writers
+
+
+class ChunkedWriter:
+    """
+    Appends DataFrames one after another to a single csv, parquet or ipc file, for results
+    produced piece by piece (see services.spill_join). Only one chunk is in memory at a time.
+    """
+    def __init__(self, output: OutputSpec, path: Path):
+        self.output = output
+        self.path = path
+        self._file = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pl.DataFrame) -> None:
+        if self.output.format == "csv":
+            if self._file is None:
+                self._file = open(self.path, "wb")
+                df.write_csv(self._file)
+            else:
+                df.write_csv(self._file, include_header=False)
+            return
+
+        table = df.to_arrow()
+        if self._writer is None:
+            self._schema = table.schema
+            if self.output.format == "parquet":
+                compression = self.output.compression or "zstd"
+                self._writer = pq.ParquetWriter(
+                    self.path,
+                    self._schema,
+                    compression="none" if compression == "uncompressed" else compression,
+                )
+            else:
+                self._writer = pa.ipc.new_file(
+                    str(self.path),
+                    self._schema,
+                    options=pa.ipc.IpcWriteOptions(compression=_ipc_compression(self.output)),
+                )
+        elif table.schema != self._schema:
+            table = table.cast(self._schema)
+
+        if self.output.format == "parquet":
+            self._writer.write_table(table, row_group_size=self.output.row_group_size)
+        else:
+            self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def discard(self) -> None:
+        # A failed result is not kept
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def ipc_rows(path: Path) -> int:
+    """
+    Rows in an IPC file, from the headers of its record batches; the file is memory-mapped
+    so no column data is read.
+    """
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def count_output_rows(output_path: Path, output: OutputSpec) -> int:
+    """
+    Rows in a written output (a file or a partitioned directory). Parquet and IPC
+    are counted from their metadata; CSV files with Polars' row count, which skips
+    parsing the values but still counts quoted values spanning several lines once.
+    """
+    extension = output_extensions[output.format]
+    files = sorted(output_path.rglob(f"*{extension}")) if output_path.is_dir() else [output_path]
+    rows = 0
+    for path in files:
+        if output.format == "parquet":
+            rows += pq.ParquetFile(path).metadata.num_rows
+        elif output.format == "ipc":
+            rows += ipc_rows(path)
+        else:
+            rows += pl.scan_csv(path).select(pl.len()).collect().item()
+    return rows
+
+
+def write_output(frame: pl.LazyFrame, output: OutputSpec, output_path: Path) -> Path:
+    """
+    Writes the final result in the requested format and returns where it went.
+    With partition_by the result is a directory named after the output file.
+    """
+    output_path = output_path.with_suffix(output_extensions[output.format])
+    if output.partition_by:
+        output_path = output_path.with_suffix("")
+        _write_partitioned(frame, output, output_path)
+    else:
+        write_frame(frame, output, output_path)
+    return output_path
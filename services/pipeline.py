@@ -0,0 +1,462 @@
+import contextvars
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import polars as pl
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from models.pydantic_models import InputModel, PrimaryFile, Filter, FilesAndJoinInfo, JoinFile, OutputSpec
+from services.database_sink import DatabaseSink, write_database
+from services.database_source import has_database_inputs, read_database
+from services.file_joiner import join_files
+from services.filter_process import apply_filters
+from services.join_planner import plan_join_order, restore_column_order
+from services.output_writer import ChunkedWriter, count_output_rows, write_output
+from services.projection import derived_column_names, output_columns_to_drop, plan_projections
+from services.result_cache import result_cache
+from services.spill_join import input_bytes, partition_inputs, scan_partition, spill_partition_count
+from utils.column_adder import add_case_columns
+from utils.constants import output_extensions
+from utils.file_reader import createDataframe, scanDataframe
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.path_util import getFullInputPath, getFullOutputPath, pathSize
+
+load_dotenv()
+# Files read concurrently per request; Polars readers release the GIL, so threads overlap I/O and parsing
+READ_PARALLELISM = int(os.getenv('READ_PARALLELISM', 4))
+
+STAGE_DURATION = metrics.histogram(
+    "pipeline_stage_duration_seconds", "Duration of one pipeline stage of a request", ["stage"]
+)
+# Read and filter rows are only known for eager frames (a lazy plan runs once, in the sink),
+# join and write rows are counted from the output for every run
+STAGE_ROWS = metrics.counter(
+    "pipeline_rows_total",
+    "Rows produced by a pipeline stage (read and filter: eager requests only; join and write: every request)",
+    ["stage"],
+)
+STAGE_BYTES = metrics.counter("pipeline_bytes_total", "Bytes read from inputs and written to outputs", ["stage"])
+PIPELINE_RUNS = metrics.counter("pipeline_runs_total", "Pipeline runs by outcome", ["outcome"])
+IN_FLIGHT = metrics.gauge("pipeline_in_flight", "Pipeline runs currently executing")
+
+# Directory inside the run directory holding the partitions of a spill join
+SPILL_DIRNAME = "_spill"
+
+Frame = Union[pl.DataFrame, pl.LazyFrame]
+# Where a result went: a file or partition directory, or a database table (see services.database_sink)
+Output = Union[Path, str]
+
+
+class PipelineCancelled(Exception):
+    """
+    Raised between stages when the caller asked for the run to stop.
+    """
+    pass
+
+
+def _check_cancelled(cancel_event: Optional[threading.Event], next_stage: str):
+    if cancel_event is not None and cancel_event.is_set():
+        raise PipelineCancelled(f"Cancelled before the {next_stage} stage")
+
+
+def add_derived_columns(frame: Frame, file_details: PrimaryFile) -> Frame:
+    """
+    Appends every derived column of a file as '<file>__dc<n>', all in one pass.
+    Works on both eager and lazy frames; on a LazyFrame the columns only
+    become part of the plan.
+    """
+    if not file_details.derived_columns:
+        return frame
+
+    return add_case_columns(
+        frame,
+        derived_column_names(file_details),
+        [stmt.sql_statement for stmt in file_details.derived_columns],
+    )
+
+
+def read_file(file_details: PrimaryFile, lazy: bool, columns: Optional[List[str]] = None,
+              streamable: bool = False, derive_spans: Optional[Dict[str, Tuple[float, float]]] = None,
+              filters: Optional[List[Filter]] = None, params: Optional[Dict[str, object]] = None,
+              sample_rows: Optional[int] = None) -> Frame:
+    """
+    Opens one input file (scan in lazy mode, full read otherwise) and adds its derived columns.
+    `columns` limits the read to those prefixed columns; `streamable` asks for a scan the
+    streaming engine can run.
+    Database inputs are read in full, with what SQL can evaluate of `filters`
+    pushed into the query (see services.database_source).
+    With `sample_rows` the input is only sampled from: files are scanned straight from the
+    source (see scanDataframe's `direct`) and database inputs return at most that many rows.
+    When and for how long derived columns were added is stored in `derive_spans` under the
+    file name, as (start, end) times.
+    """
+    file_name = file_details.file_name
+    read_options = file_details.read_options
+    if file_details.database is not None:
+        frame = read_database(file_details, columns, filters, params, sample_rows)
+        frame = frame.lazy() if lazy else frame
+    elif lazy:
+        frame = scanDataframe(file_name, read_options, columns, streamable, direct=sample_rows is not None)
+    else:
+        frame = createDataframe(file_name, read_options, columns)
+    start_time = time.time()
+    frame = add_derived_columns(frame, file_details)
+    if derive_spans is not None:
+        derive_spans[file_name] = (start_time, time.time())
+    return frame
+
+
+def _covered_seconds(spans) -> float:
+    """
+    Wall-clock time covered by (start, end) spans that may overlap.
+    """
+    total, covered_until = 0.0, float("-inf")
+    for start, end in sorted(spans):
+        if end > covered_until:
+            total += end - max(start, covered_until)
+            covered_until = end
+    return total
+
+
+def _timed_read_file(file_details: PrimaryFile, lazy: bool, columns: Optional[List[str]],
+                     streamable: bool = False, derive_spans: Optional[Dict[str, Tuple[float, float]]] = None,
+                     filters: Optional[List[Filter]] = None, params: Optional[Dict[str, object]] = None,
+                     sample_rows: Optional[int] = None) -> Frame:
+    start_time = time.time()
+    frame = read_file(file_details, lazy, columns, streamable, derive_spans, filters, params, sample_rows)
+    seconds = time.time() - start_time
+    logger.info("Time taken to read %s: %s", file_details.file_name, seconds, stage="read", file=file_details.file_name, seconds=seconds)
+    return frame
+
+
+def read_files(
+    files_and_join_info: FilesAndJoinInfo,
+    lazy: bool,
+    projections: Optional[Dict[str, Optional[List[str]]]] = None,
+    streamable: bool = False,
+    timings: Optional[Dict[str, float]] = None,
+    filters: Optional[List[Filter]] = None,
+    params: Optional[Dict[str, object]] = None,
+    sample_rows: Optional[int] = None,
+) -> Dict[str, Frame]:
+    """
+    Reads the primary and all secondary files (plus their derived columns) concurrently,
+    at most READ_PARALLELISM at a time. The first failure is re-raised.
+    `projections` maps a file name to the columns to read (see plan_projections).
+    `filters` and `params` are pushed down into the queries of database inputs.
+    `sample_rows` only samples the inputs (see read_file).
+    The wall-clock time spent on derived columns is stored in `timings["derive"]`; reads
+    running at the same time count once.
+    """
+    projections = projections or {}
+    derive_spans = {}
+    all_files = [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+    if len(all_files) == 1 or READ_PARALLELISM <= 1:
+        df_map = {
+            f.file_name: _timed_read_file(
+                f, lazy, projections.get(f.file_name), streamable, derive_spans, filters, params, sample_rows
+            )
+            for f in all_files
+        }
+    else:
+        with ThreadPoolExecutor(max_workers=min(READ_PARALLELISM, len(all_files))) as executor:
+            futures = {
+                # Each read runs in a copy of the caller's context, so its log lines keep the request id
+                f.file_name: executor.submit(
+                    contextvars.copy_context().run,
+                    _timed_read_file, f, lazy, projections.get(f.file_name), streamable, derive_spans,
+                    filters, params, sample_rows,
+                )
+                for f in all_files
+            }
+            df_map = {file_name: future.result() for file_name, future in futures.items()}
+
+    if timings is not None:
+        timings["derive"] = _covered_seconds(derive_spans.values())
+    return df_map
+
+
+def filter_files(df_map: Dict[str, Frame], filters: Optional[List[Filter]],
+                 params: Optional[Dict[str, object]] = None) -> Dict[str, Frame]:
+    for file_details in filters or []:
+        filter_file_name = file_details.file_name
+        if filter_file_name not in df_map:
+            logger.error(" This file is not in join files ")
+            raise HTTPException(
+                status_code=404,
+                detail="Error occurred as file is not in join files list.",
+            )
+        source_path = getFullInputPath(filter_file_name)
+        df_map[filter_file_name] = apply_filters(
+            df_map[filter_file_name],
+            file_details.conditions,
+            file_details.convert_condition,
+            # (database inputs have no file to remember inferred date formats by)
+            source_path if source_path.is_file() else None,
+            params,
+        )
+    return df_map
+
+
+def combine_files(
+    df_map: Dict[str, Frame],
+    files_and_join_info: FilesAndJoinInfo,
+    drop_columns: Optional[List[str]] = None,
+    join_order: Optional[List[JoinFile]] = None,
+) -> pl.LazyFrame:
+    """
+    Joins the secondary files onto the primary one, or returns the primary file alone,
+    then drops the columns that were only read for the pipeline's own use.
+    `join_order` (see plan_join_order) overrides the request's join order; the columns
+    still come out in request order.
+    The result is always a LazyFrame so the caller collects exactly once.
+    """
+    primary_file = files_and_join_info.primary_file
+    if files_and_join_info.secondary_files:
+        join_order = join_order or files_and_join_info.secondary_files
+        combined = join_files(df_map, primary_file, join_order)
+        if join_order != files_and_join_info.secondary_files:
+            combined = restore_column_order(combined, df_map, files_and_join_info)
+    else:
+        combined = df_map[primary_file.file_name].lazy()
+
+    if drop_columns:
+        combined = combined.drop([col for col in drop_columns if col in combined.columns])
+    return combined
+
+
+def write_result(final_processed_df: pl.LazyFrame, output: OutputSpec, run_id: str) -> Tuple[Output, int]:
+    """
+    Writes the result and returns where it went and how many rows it has. File outputs are
+    counted afterwards from Parquet/IPC metadata or Polars' CSV row count, without parsing values.
+    """
+    if output.format == "database":
+        run_dir = getFullOutputPath(run_id=run_id).parent
+        try:
+            sink = write_database(final_processed_df, output, run_dir)
+        finally:
+            # A database output leaves nothing in the run directory
+            shutil.rmtree(run_dir, ignore_errors=True)
+        return sink.target, sink.rows
+    output_path = write_output(final_processed_df, output, getFullOutputPath(run_id=run_id))
+    return output_path, count_output_rows(output_path, output)
+
+
+def spill_join_and_write(
+    df_map: Dict[str, Frame],
+    files_and_join_info: FilesAndJoinInfo,
+    drop_columns: List[str],
+    join_order: List[JoinFile],
+    output: OutputSpec,
+    run_id: str,
+    partitions: int,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[Output, int]:
+    """
+    Out-of-core join for inputs larger than memory: every input is hash-partitioned on its
+    join keys to disk (see services.spill_join), then partition i of all files is joined
+    and appended to the output before partition i + 1 is read.
+    Partitioned output is first collected in a Parquet staging file and split from there.
+    Returns where the output went and how many rows were joined into it.
+    """
+    output_path = getFullOutputPath(run_id=run_id)
+    spill_dir = output_path.parent / SPILL_DIRNAME
+    try:
+        partition_paths = partition_inputs(df_map, files_and_join_info, partitions, spill_dir)
+
+        if output.format == "database":
+            writer = DatabaseSink(output)
+        elif output.partition_by:
+            writer = ChunkedWriter(OutputSpec(format="parquet", compression="lz4"), spill_dir / "joined.parquet")
+        else:
+            writer = ChunkedWriter(output, output_path.with_suffix(output_extensions[output.format]))
+        rows = 0
+        try:
+            for partition in range(partitions):
+                _check_cancelled(cancel_event, f"join of partition {partition}")
+                combined = combine_files(
+                    scan_partition(partition_paths, partition), files_and_join_info, drop_columns, join_order
+                ).collect()
+                writer.write(combined)
+                rows += combined.height
+        except BaseException:
+            # (a database sink leaves a table it was replacing as it was)
+            writer.discard()
+            raise
+        writer.close()
+
+        if output.format == "database":
+            return writer.target, rows
+        if output.partition_by:
+            return write_output(pl.scan_parquet(writer.path), output, output_path), rows
+        return writer.path, rows
+    finally:
+        # A database output leaves nothing in the run directory
+        shutil.rmtree(output_path.parent if output.format == "database" else spill_dir, ignore_errors=True)
+
+
+def _count_rows(df_map: Dict[str, Frame]) -> Optional[int]:
+    # Only eager frames know their height without running a query
+    if any(isinstance(frame, pl.LazyFrame) for frame in df_map.values()):
+        return None
+    return sum(frame.height for frame in df_map.values())
+
+
+def run_pipeline(
+    request: InputModel,
+    timings: Optional[Dict[str, float]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    run_id: Optional[str] = None,
+    params: Optional[Dict[str, object]] = None,
+) -> Output:
+    """
+    Runs read -> filter -> join -> write for an already normalized request
+    (see file_append) and returns the output path, or the table for database output.
+
+    In lazy mode the read, filter and join stages only build one plan per file
+    and nothing is materialized until the write stage streams the request into the output sink.
+    Stage durations are logged and, when given, stored in `timings`.
+    Setting `cancel_event` stops the run at the next stage boundary with PipelineCancelled;
+    a stage that is already executing inside Polars runs to completion.
+
+    Lazy requests whose inputs exceed SPILL_JOIN_THRESHOLD_BYTES are joined partition by
+    partition from disk (see spill_join_and_write) instead of in one plan.
+
+    `params` binds the :parameters of the request's filter expressions (see services.pipeline_registry).
+
+    Every run writes under its own OUTPUT_DIR/<run_id>/. Unless the request opts out,
+    an identical earlier request over unchanged input files returns its output instead.
+    Requests reading or writing the database are never cached, its tables may have changed since.
+
+    Stage durations, data volumes and the outcome are recorded in utils.metrics. Row counts
+    cover the join and write stages of every run, but the read and filter stages of eager
+    runs only: counting a lazy plan's rows before the sink would run it twice.
+    """
+    if timings is None:
+        timings = {}
+    IN_FLIGHT.inc()
+    outcome = "failed"
+    try:
+        output_path, cached = _run_stages(request, timings, cancel_event, run_id, params)
+        outcome = "cached" if cached else "succeeded"
+        return output_path
+    except PipelineCancelled:
+        outcome = "cancelled"
+        raise
+    finally:
+        IN_FLIGHT.dec()
+        PIPELINE_RUNS.inc(outcome=outcome)
+        for stage, seconds in timings.items():
+            STAGE_DURATION.observe(seconds, stage=stage)
+
+
+def _run_stages(
+    request: InputModel,
+    timings: Dict[str, float],
+    cancel_event: Optional[threading.Event],
+    run_id: Optional[str],
+    params: Optional[Dict[str, object]],
+) -> Tuple[Output, bool]:
+    """
+    The stages of run_pipeline; also reports whether the output came from the result cache.
+    """
+    run_id = run_id or uuid.uuid4().hex
+    lazy = request.execution_mode == "lazy"
+    files_and_join_info = request.files_and_join_info
+
+    _check_cancelled(cancel_event, "read")
+    try:
+        cache_key = None
+        if (request.use_cache and result_cache.enabled and request.output.format != "database"
+                and not has_database_inputs(files_and_join_info)):
+            cache_key = result_cache.key_for(request, params)
+            cached_output = result_cache.get(cache_key)
+            if cached_output is not None:
+                logger.info("Result cache hit, returning %s", cached_output)
+                return cached_output, True
+
+        start_time = time.time()
+        partitions = spill_partition_count(request)
+        # Lazy plans always end in a streaming sink (or the spill partitioner)
+        df_map = read_files(
+            files_and_join_info, lazy, plan_projections(request), streamable=lazy, timings=timings,
+            filters=request.filter, params=params,
+        )
+        timings["read"] = time.time() - start_time - timings["derive"]
+        logger.info("Time taken to read the file: %s", timings["read"], stage="read", seconds=timings["read"])
+        STAGE_BYTES.inc(input_bytes(files_and_join_info), stage="read")
+        rows = _count_rows(df_map)
+        if rows is not None:
+            STAGE_ROWS.inc(rows, stage="read")
+    except Exception as e:
+        logger.error("Error occurred during reading the file: %s", e, stage="read")
+        raise HTTPException(status_code=404, detail=str(e))
+
+    _check_cancelled(cancel_event, "filter")
+    unfiltered_map = dict(df_map)
+    try:
+        if request.filter:
+            start_time = time.time()
+            df_map = filter_files(df_map, request.filter, params)
+            timings["filter"] = time.time() - start_time
+            logger.info("Time taken to filter the file: %s", timings["filter"], stage="filter", seconds=timings["filter"])
+            rows = _count_rows(df_map)
+            if rows is not None:
+                STAGE_ROWS.inc(rows, stage="filter")
+
+        logger.info("After applying filter")
+    except Exception as e:
+        logger.error("Error occurred during filtering the file: %s", e, stage="filter")
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        start_time = time.time()
+        join_order, _ = plan_join_order(df_map, files_and_join_info, unfiltered_map, request.filter, params)
+        if partitions:
+            logger.info("Inputs exceed the spill threshold, joining in %d partitions", partitions)
+            output_path, rows = spill_join_and_write(
+                df_map, files_and_join_info, output_columns_to_drop(request), join_order,
+                request.output, run_id, partitions, cancel_event,
+            )
+            timings["join"] = time.time() - start_time
+            logger.info("Time taken to join and write the file: %s", timings["join"], stage="join", seconds=timings["join"])
+        else:
+            final_processed_df = combine_files(
+                df_map, files_and_join_info, output_columns_to_drop(request), join_order
+            )
+            timings["join"] = time.time() - start_time
+            logger.info("Time taken to join the file: %s", timings["join"], stage="join", seconds=timings["join"])
+
+            _check_cancelled(cancel_event, "write")
+            start_time = time.time()
+            output_path, rows = write_result(final_processed_df, request.output, run_id)
+            timings["write"] = time.time() - start_time
+            logger.info("Time taken to write the file: %s", timings["write"], stage="write", seconds=timings["write"])
+    except PipelineCancelled:
+        # A spill join may have written part of the output already
+        shutil.rmtree(getFullOutputPath(run_id=run_id).parent, ignore_errors=True)
+        raise
+    except Exception as e:
+        logger.error("Error occurred during joining the file: %s", e, stage="join")
+        shutil.rmtree(getFullOutputPath(run_id=run_id).parent, ignore_errors=True)
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # Writing keeps every joined row, so both stages produced the output's rows
+    STAGE_ROWS.inc(rows, stage="join")
+    STAGE_ROWS.inc(rows, stage="write")
+    if request.output.format != "database":
+        STAGE_BYTES.inc(pathSize(output_path), stage="write")
+
+    if cache_key is not None:
+        result_cache.put(cache_key, output_path)
+    # Outputs that did not go into the cache expire after a while
+    result_cache.sweep()
+    return output_path, False
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from models.pydantic_models import InputModel
+from utils.fileNameAppender import file_append
+from utils.filter_expression import bind_params, node_params, pin_filter, unpin_filter
+from utils.logger import logger
+from utils.sql_parser import parse_case_statement
+
+load_dotenv()
+# Registered pipelines kept; registering more drops the least recently used one
+PIPELINE_REGISTRY_SIZE = int(os.getenv('PIPELINE_REGISTRY_SIZE', 1000))
+
+class RegisteredPipeline:
+    """
+    A request registered once through POST /pipelines: validated and normalized by
+    file_append, with its filter expressions parsed. The trees are kept on the pipeline
+    (and pinned, see utils.filter_expression.pin_filter, so runs never parse them again);
+    each run only binds its parameter values into them.
+    """
+    def __init__(self, request: InputModel, filters: Dict[str, tuple]):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.filters = filters
+        self.parameters = sorted(set().union(*map(node_params, filters.values())))
+        self.created_at = time.time()
+        self.runs = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "pipeline_id": self.id,
+            "parameters": self.parameters,
+            "created_at": self.created_at,
+            "runs": self.runs,
+            "request": self.request.model_dump(mode="json", by_alias=True),
+        }
+
+
+class PipelineRegistry:
+    """
+    Registered pipelines by id, at most `max_size` of them (least recently used dropped first).
+    """
+    def __init__(self, max_size: int = PIPELINE_REGISTRY_SIZE):
+        self._max_size = max_size
+        self._pipelines: "OrderedDict[str, RegisteredPipeline]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, request: InputModel) -> RegisteredPipeline:
+        request = file_append(request)
+
+        # Parsing now reports errors at registration time
+        filters = {}
+        try:
+            for filter_details in request.filter or []:
+                for expression in filter_details.conditions.expressions:
+                    if expression not in filters:
+                        filters[expression] = pin_filter(expression)
+        except Exception:
+            self._unpin(filters)
+            raise
+
+        files_and_join_info = request.files_and_join_info
+        all_files = [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+        for file_details in all_files:
+            for stmt in file_details.derived_columns or []:
+                for condition, _ in parse_case_statement(stmt.sql_statement)["branches"]:
+                    if node_params(condition):
+                        self._unpin(filters)
+                        raise ValueError("Parameters are only supported in filter expressions")
+
+        pipeline = RegisteredPipeline(request, filters)
+        evicted = []
+        with self._lock:
+            self._pipelines[pipeline.id] = pipeline
+            while len(self._pipelines) > self._max_size:
+                evicted.append(self._pipelines.popitem(last=False)[1])
+        for dropped in evicted:
+            self._unpin(dropped.filters)
+        logger.info(f"Registered pipeline {pipeline.id} with parameters {pipeline.parameters}")
+        return pipeline
+
+    def get(self, pipeline_id: str) -> Optional[RegisteredPipeline]:
+        with self._lock:
+            pipeline = self._pipelines.get(pipeline_id)
+            if pipeline is not None:
+                self._pipelines.move_to_end(pipeline_id)
+            return pipeline
+
+    def delete(self, pipeline_id: str) -> Optional[RegisteredPipeline]:
+        with self._lock:
+            pipeline = self._pipelines.pop(pipeline_id, None)
+        if pipeline is not None:
+            self._unpin(pipeline.filters)
+        return pipeline
+
+    @staticmethod
+    def _unpin(filters: Dict[str, tuple]):
+        for expression in filters:
+            unpin_filter(expression)
+
+    def bind(self, pipeline: RegisteredPipeline, params: Dict[str, object]) -> Dict[str, object]:
+        """
+        Checks the values given for a run against the pipeline's parameters by binding them
+        into its filter trees, so a value of the wrong kind is refused before the run starts.
+        """
+        missing = sorted(set(pipeline.parameters) - set(params))
+        unknown = sorted(set(params) - set(pipeline.parameters))
+        if missing:
+            raise ValueError(f"Missing parameters: {missing}")
+        if unknown:
+            raise ValueError(f"Unknown parameters: {unknown}")
+        for tree in pipeline.filters.values():
+            bind_params(tree, params)
+        with self._lock:
+            pipeline.runs += 1
+        return params
+
+
+pipeline_registry = PipelineRegistry()
@@ -0,0 +1,79 @@
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from models.pydantic_models import InputModel, PrimaryFile
+from services.filter_process import expression_columns
+from utils.fileNameAppender import generateColumnName
+from utils.sql_parser import case_statement_columns
+
+load_dotenv()
+FILENAME_CONNECTOR = os.getenv('FILENAME_CONNECTOR')
+
+
+def derived_column_names(file_details: PrimaryFile) -> List[str]:
+    """
+    Names the pipeline gives to a file's derived columns: '<file>__dc1', '<file>__dc2', ...
+    """
+    file_stem = file_details.file_name.split('.')[0]
+    return [
+        generateColumnName(file_stem, FILENAME_CONNECTOR, "dc" + str(counter))
+        for counter in range(1, len(file_details.derived_columns or []) + 1)
+    ]
+
+
+def _all_files(request: InputModel) -> List[PrimaryFile]:
+    files_and_join_info = request.files_and_join_info
+    return [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+
+
+def _used_columns(request: InputModel, file_details: PrimaryFile) -> List[str]:
+    """
+    Columns of one file the pipeline itself needs, without duplicates and in the order
+    the request mentions them: join keys, the sources of derived columns, then filter
+    and date-conversion columns.
+    """
+    used = list(file_details.join_columns)
+    for stmt in file_details.derived_columns or []:
+        used += case_statement_columns(stmt.sql_statement)
+    for filter_details in request.filter or []:
+        if filter_details.file_name != file_details.file_name:
+            continue
+        if filter_details.convert_condition is not None:
+            used.append(filter_details.convert_condition.column_name)
+        for expression in filter_details.conditions.expressions:
+            used += expression_columns(expression)
+    return list(dict.fromkeys(used))
+
+
+def plan_projections(request: InputModel) -> Dict[str, Optional[List[str]]]:
+    """
+    Prefixed columns to read from each file of a normalized request: its select_columns
+    in their order, then the other columns the pipeline needs (see _used_columns).
+    Files without select_columns map to None and are read in full.
+    """
+    projections = {}
+    for file_details in _all_files(request):
+        if not file_details.select_columns:
+            projections[file_details.file_name] = None
+            continue
+        # Derived columns are computed after the read, they do not exist in the file
+        derived = set(derived_column_names(file_details))
+        needed = dict.fromkeys(file_details.select_columns + _used_columns(request, file_details))
+        projections[file_details.file_name] = [col for col in needed if col not in derived]
+    return projections
+
+
+def output_columns_to_drop(request: InputModel) -> List[str]:
+    """
+    Columns read only because the pipeline needed them; they are dropped from the result
+    so the output holds select_columns plus the derived columns.
+    """
+    drop = []
+    for file_details in _all_files(request):
+        if not file_details.select_columns:
+            continue
+        kept = set(file_details.select_columns) | set(derived_column_names(file_details))
+        drop += [col for col in _used_columns(request, file_details) if col not in kept]
+    return drop
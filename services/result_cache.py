@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from models.pydantic_models import InputModel
+from utils.file_fingerprint import fileFingerprint
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.path_util import getFullInputPath, pathSize, OUTPUT_DIR
+
+load_dotenv()
+# Disk budget for cached outputs; 0 disables caching
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 10 * 1024 ** 3))
+# Run outputs that are not in the cache are deleted this long after they were last written; 0 keeps them
+RUN_OUTPUT_TTL_SECONDS = int(os.getenv('RUN_OUTPUT_TTL_SECONDS', 24 * 3600))
+# Expired run outputs are looked for at most this often
+RUN_OUTPUT_SWEEP_SECONDS = 60
+
+# Written into the run directory of every cached output, so the cache survives a restart
+CACHE_ENTRY_FILENAME = ".result_cache.json"
+# Run directories are named after a uuid4().hex run id; anything else in OUTPUT_DIR is left alone
+RUN_DIR_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Request fields that change how a result is computed but not what it contains
+KEY_EXCLUDED_FIELDS = {"execution_mode", "use_cache"}
+
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups by outcome", ["cache", "result"])
+
+
+def _remove_run_output(path: Path):
+    # Outputs live in OUTPUT_DIR/<run_id>/, drop the whole run directory
+    run_dir = path.parent
+    if run_dir.resolve() != OUTPUT_DIR.resolve():
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def _last_written(run_dir: Path) -> float:
+    # A run still being written keeps touching its output files
+    return max([run_dir.stat().st_mtime] + [f.stat().st_mtime for f in run_dir.rglob("*")])
+
+
+class ResultCache:
+    """
+    Maps a request (normalized by file_append) plus the fingerprints of its input
+    files to the output an earlier identical run produced.
+    Outputs are kept on disk within `max_bytes`, least recently used evicted first.
+
+    Each cached run directory holds a CACHE_ENTRY_FILENAME marker, touched on every hit;
+    on start the cache is rebuilt from the markers under `output_dir`, in order of last use.
+    Run outputs that never enter the cache (use_cache=False, too large, cache disabled)
+    are deleted RUN_OUTPUT_TTL_SECONDS after they were last written (see sweep).
+    """
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, output_dir: Path = OUTPUT_DIR,
+                 ttl_seconds: int = RUN_OUTPUT_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.output_dir = Path(output_dir)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._load_index()
+        self.sweep(force=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key_for(self, request: InputModel, params: Optional[Dict[str, object]] = None) -> str:
+        files_and_join_info = request.files_and_join_info
+        file_names = [files_and_join_info.primary_file.file_name]
+        file_names += [f.file_name for f in files_and_join_info.secondary_files or []]
+
+        payload = {
+            "request": request.model_dump(mode="json", exclude=KEY_EXCLUDED_FIELDS),
+            "inputs": {name: fileFingerprint(getFullInputPath(name)) for name in sorted(file_names)},
+            "params": params or {},
+        }
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Path]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry[0].exists():
+                # Removed from disk behind our back
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(cache="result", result="miss")
+                return None
+            self._entries.move_to_end(key)
+            (entry[0].parent / CACHE_ENTRY_FILENAME).touch()
+            self.hits += 1
+            CACHE_LOOKUPS.inc(cache="result", result="hit")
+            return entry[0]
+
+    def put(self, key: str, path: Path):
+        size = pathSize(path)
+        if size > self.max_bytes:
+            # Never evict a result we are about to hand back
+            logger.info(f"Result of {size} bytes exceeds the cache budget, not cached")
+            return
+
+        with self._lock:
+            if key in self._entries:
+                # A concurrent identical request finished first; keep only the newest output
+                previous_path = self._entries[key][0]
+                self._drop(key)
+                if previous_path != path:
+                    _remove_run_output(previous_path)
+            (path.parent / CACHE_ENTRY_FILENAME).write_text(json.dumps({"key": key, "output": path.name}))
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            evicted_key, (evicted_path, _) = next(iter(self._entries.items()))
+            self._drop(evicted_key)
+            _remove_run_output(evicted_path)
+            logger.info(f"Evicted cached result {evicted_path}")
+
+    def _run_dirs(self):
+        if not self.output_dir.is_dir():
+            return []
+        return [d for d in self.output_dir.iterdir() if d.is_dir() and RUN_DIR_PATTERN.fullmatch(d.name)]
+
+    def _load_index(self):
+        """
+        Re-registers the cached outputs a previous process left under output_dir.
+        """
+        found = []
+        for run_dir in self._run_dirs():
+            marker = run_dir / CACHE_ENTRY_FILENAME
+            try:
+                entry = json.loads(marker.read_text())
+                path = run_dir / entry["output"]
+                found.append((marker.stat().st_mtime, entry["key"], path, pathSize(path)))
+            except (OSError, ValueError, KeyError):
+                # Not a cached run, or an unreadable marker; the sweep deals with it
+                marker.unlink(missing_ok=True)
+        with self._lock:
+            for _, key, path, size in sorted(found, key=lambda item: item[0]):
+                self._entries[key] = (path, size)
+                self._total_bytes += size
+            self._evict()
+        if found:
+            logger.info(f"Result cache reloaded {len(self._entries)} cached outputs from {self.output_dir}")
+
+    def sweep(self, force: bool = False):
+        """
+        Deletes run directories that are not in the cache and were last written more than
+        ttl_seconds ago. Runs at most every RUN_OUTPUT_SWEEP_SECONDS unless forced.
+        """
+        now = time.time()
+        if self.ttl_seconds <= 0 or (not force and now - self._last_sweep < RUN_OUTPUT_SWEEP_SECONDS):
+            return
+        self._last_sweep = now
+        with self._lock:
+            cached_dirs = {path.parent.resolve() for path, _ in self._entries.values()}
+        for run_dir in self._run_dirs():
+            if run_dir.resolve() in cached_dirs:
+                continue
+            try:
+                expired = now - _last_written(run_dir) > self.ttl_seconds
+            except OSError:
+                # Removed while we looked
+                continue
+            if expired:
+                shutil.rmtree(run_dir, ignore_errors=True)
+                logger.info(f"Removed expired run output {run_dir}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key: str):
+        _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+
+result_cache = ResultCache()
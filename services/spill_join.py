@@ -0,0 +1,108 @@
+import math
+import os
+from pathlib import Path
+from typing import Dict, List, Union
+
+import polars as pl
+from dotenv import load_dotenv
+
+from models.pydantic_models import FilesAndJoinInfo, InputModel, OutputSpec
+from services.output_writer import ChunkedWriter, split_parquet
+from utils.logger import logger
+from utils.path_util import getFullInputPath
+
+load_dotenv()
+# Combined input size above which lazy joins hash-partition their inputs to disk first
+SPILL_JOIN_THRESHOLD_BYTES = int(os.getenv('SPILL_JOIN_THRESHOLD_BYTES', 8 * 1024 ** 3))
+# Input bytes per partition; one partition of every file is joined in memory at a time
+SPILL_JOIN_PARTITION_BYTES = int(os.getenv('SPILL_JOIN_PARTITION_BYTES', 512 * 1024 ** 2))
+
+PARTITION_COLUMN = "__spill_partition"
+
+
+def input_bytes(files_and_join_info: FilesAndJoinInfo) -> int:
+    # Database inputs are read into memory whole and not counted
+    all_files = [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+    return sum(os.path.getsize(getFullInputPath(f.file_name)) for f in all_files if f.database is None)
+
+
+def spill_partition_count(request: InputModel) -> int:
+    """
+    Number of on-disk partitions to join the request in, or 0 to join in memory.
+    Only lazy requests with at least one secondary file above SPILL_JOIN_THRESHOLD_BYTES spill.
+    """
+    files_and_join_info = request.files_and_join_info
+    if request.execution_mode != "lazy" or not files_and_join_info.secondary_files:
+        return 0
+    total = input_bytes(files_and_join_info)
+    if total <= SPILL_JOIN_THRESHOLD_BYTES:
+        return 0
+    return max(2, math.ceil(total / SPILL_JOIN_PARTITION_BYTES))
+
+
+def _partition_expr(keys: List[str], partitions: int) -> pl.Expr:
+    # Keys are hashed as text so equal values of different integer widths land together
+    return (
+        (pl.struct([pl.col(key).cast(pl.Utf8) for key in keys]).hash(seed=0) % partitions)
+        .cast(pl.UInt32)
+        .alias(PARTITION_COLUMN)
+    )
+
+
+def _sink_parquet(frame: pl.LazyFrame, path: Path) -> None:
+    try:
+        frame.sink_parquet(path, compression="lz4")
+    except pl.exceptions.PolarsError as e:
+        logger.warning(
+            "Spill of %s is not streamable, collecting it in memory instead: %s", path.name, e,
+            stage="join", fallback="collect",
+        )
+        frame.collect().write_parquet(path, compression="lz4")
+
+
+def partition_inputs(
+    df_map: Dict[str, Union[pl.DataFrame, pl.LazyFrame]],
+    files_and_join_info: FilesAndJoinInfo,
+    partitions: int,
+    spill_dir: Path,
+) -> Dict[str, List[Path]]:
+    """
+    Hash-partitions every (filtered) input on its join keys into `partitions` Parquet files.
+    Rows with equal keys end up in the same partition number on every side, so joining
+    partition i of each file and concatenating the results equals the full join.
+    Each input is streamed once into a tagged spill file, which is then split into the
+    partition files in a single chunked pass (see split_parquet); neither step holds a
+    whole input in memory when the plan is streamable.
+    """
+    spill_dir.mkdir(parents=True, exist_ok=True)
+    all_files = [files_and_join_info.primary_file] + list(files_and_join_info.secondary_files or [])
+    partition_paths = {}
+    for file_details in all_files:
+        stem = file_details.file_name.split('.')[0]
+        tagged_path = spill_dir / f"{stem}.parquet"
+        _sink_parquet(
+            df_map[file_details.file_name].lazy().with_columns(
+                _partition_expr(file_details.join_columns, partitions)
+            ),
+            tagged_path,
+        )
+
+        paths = [spill_dir / f"{stem}-{partition}.parquet" for partition in range(partitions)]
+        spill = OutputSpec(format="parquet", compression="lz4")
+        written = split_parquet(
+            tagged_path, [PARTITION_COLUMN], lambda key: ChunkedWriter(spill, paths[key[0]])
+        )
+        # Partitions no key hashed into still get an (empty) file with the input's columns
+        empty = pl.scan_parquet(tagged_path).drop(PARTITION_COLUMN).head(0).collect()
+        for partition in set(range(partitions)) - {key[0] for key in written}:
+            writer = ChunkedWriter(spill, paths[partition])
+            writer.write(empty)
+            writer.close()
+        tagged_path.unlink()
+        partition_paths[file_details.file_name] = paths
+        logger.info(f"Partitioned {file_details.file_name} into {partitions} spill files")
+    return partition_paths
+
+
+def scan_partition(partition_paths: Dict[str, List[Path]], partition: int) -> Dict[str, pl.LazyFrame]:
+    return {file_name: pl.scan_parquet(paths[partition]) for file_name, paths in partition_paths.items()}
@@ -0,0 +1,22 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Modules read their configuration from the environment when first imported, so the
+# test directories are set up before anything from the app is imported
+REPO_DIR = Path(__file__).resolve().parent.parent
+TEST_DIR = Path(tempfile.mkdtemp(prefix="task_meta_tests_"))
+INPUT_DIR = TEST_DIR / "input"
+shutil.copytree(REPO_DIR / "data" / "input", INPUT_DIR)
+
+os.environ.update({
+    "INPUT_DIR": str(INPUT_DIR),
+    "OUTPUT_DIR": str(TEST_DIR / "output"),
+    "OUTPUT_FILENAME": "out.csv",
+    "FILENAME_CONNECTOR": "__",
+    "INGEST_CACHE_DIR": str(TEST_DIR / "ingest"),
+    "DB_URL": f"sqlite:///{TEST_DIR / 'db.sqlite'}",
+})
+sys.path.insert(0, str(REPO_DIR))
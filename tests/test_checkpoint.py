@@ -0,0 +1,71 @@
+import polars as pl
+import pytest
+from sqlalchemy import text
+
+from db_lib.core.exceptions import DataWriteError
+from db_lib.database.checkpoint import LoadCheckpoint, frame_hash
+from db_lib.database.parallel_writer import ParallelDataWriter
+from db_lib.database.writer import MySQLDataWriter
+from services.database_sink import database_connection
+
+FRAME = pl.DataFrame({"id": range(100), "name": [f"n{i}" for i in range(100)]})
+BATCH_SIZE = 10
+
+
+@pytest.fixture(params=[MySQLDataWriter, ParallelDataWriter])
+def writer(request):
+    connection = database_connection()
+    engine = connection.get_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS loaded"))
+        conn.execute(text("CREATE TABLE loaded (id INTEGER, name VARCHAR(20))"))
+    return request.param(engine, connection.get_session_maker(), connection.config)
+
+
+def _loaded_ids(writer) -> list:
+    with writer.engine.connect() as connection:
+        return [row[0] for row in connection.execute(text("SELECT id FROM loaded ORDER BY id"))]
+
+
+def _load(writer, df: pl.DataFrame, load_id: str):
+    # What write_data does once the frame is converted to the table's columns
+    checkpoint = LoadCheckpoint(writer.engine, writer.config, load_id, "loaded", frame_hash(df), BATCH_SIZE)
+    writer.load_frame(df, "loaded", BATCH_SIZE, checkpoint=checkpoint)
+
+
+def _fail_at_batch(writer, monkeypatch, failing: int) -> list:
+    # Makes the `failing`-th batch sent raise, and records every batch sent
+    sent = []
+    original = writer.execute_batch
+
+    def execute(connection, prepared):
+        sent.append(prepared.rows[0][0])
+        if len(sent) == failing:
+            raise RuntimeError("connection lost")
+        original(connection, prepared)
+    monkeypatch.setattr(writer, "execute_batch", execute)
+    return sent
+
+
+def test_retried_load_resumes_after_the_committed_batches(writer, monkeypatch, request):
+    load_id = f"resume-{request.node.name}"
+    sent = _fail_at_batch(writer, monkeypatch, 4)
+    with pytest.raises(DataWriteError):
+        _load(writer, FRAME, load_id)
+    committed = _loaded_ids(writer)
+    assert len(committed) == 3 * BATCH_SIZE
+
+    monkeypatch.undo()
+    sent = _fail_at_batch(writer, monkeypatch, 0)
+    _load(writer, FRAME, load_id)
+    # Every row exactly once, and the committed batches were not sent again
+    assert _loaded_ids(writer) == list(range(100))
+    assert len(sent) == 7 and not set(sent) & set(committed)
+
+
+def test_load_id_is_refused_for_different_data(writer, request):
+    load_id = f"changed-{request.node.name}"
+    _load(writer, FRAME.head(20), load_id)
+    with pytest.raises(DataWriteError, match="different data"):
+        _load(writer, FRAME.tail(20), load_id)
+    assert _loaded_ids(writer) == list(range(20))
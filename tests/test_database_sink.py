@@ -0,0 +1,100 @@
+import polars as pl
+import pytest
+from sqlalchemy import inspect, text
+
+from db_lib.config import AppConfig
+from models.pydantic_models import InputModel, OutputSpec
+from services import database_sink, output_writer
+from services.database_sink import DatabaseSink, database_connection, write_database
+from services.pipeline import run_pipeline
+from utils.fileNameAppender import file_append
+from utils.path_util import getFullInputPath
+
+FRAME = pl.DataFrame({"t__id": range(1000), "t__name": [f"n{i}" for i in range(1000)]})
+
+
+@pytest.fixture
+def engine():
+    engine = database_connection().get_engine()
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS sunk"))
+        connection.execute(text("CREATE TABLE sunk (old INTEGER)"))
+        connection.execute(text("INSERT INTO sunk VALUES (1), (2)"))
+    return engine
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(database_sink, "DB_OUTPUT_BATCH_ROWS", 100)
+    monkeypatch.setattr(AppConfig, "DB_WRITE_CONNECTIONS", 2)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the plan was collected instead of streamed into the sink")
+    monkeypatch.setattr(output_writer, "_write_collected", fail)
+
+
+def _rows(engine, table: str) -> list:
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT * FROM {table} ORDER BY 1")).all()
+
+
+def test_result_is_loaded_chunk_by_chunk(engine, small_batches, tmp_path, monkeypatch):
+    chunks = []
+    original = DatabaseSink.write
+    monkeypatch.setattr(DatabaseSink, "write", lambda self, df: chunks.append(df.height) or original(self, df))
+
+    sink = write_database(FRAME.lazy(), OutputSpec(format="database", table="sunk", if_exists="replace"), tmp_path)
+    assert sink.rows == 1000
+    assert chunks == [200] * 5
+    assert len(_rows(engine, "sunk")) == 1000
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_replaced_table_is_kept_when_the_load_fails(engine, small_batches, tmp_path, monkeypatch):
+    original = DatabaseSink.write
+
+    def failing(self, df):
+        if self.rows:
+            raise RuntimeError("connection lost")
+        original(self, df)
+    monkeypatch.setattr(DatabaseSink, "write", failing)
+
+    with pytest.raises(RuntimeError):
+        write_database(FRAME.lazy(), OutputSpec(format="database", table="sunk", if_exists="replace"), tmp_path)
+    assert _rows(engine, "sunk") == [(1,), (2,)]
+    assert not inspect(engine).has_table("sunk_staging")
+
+
+def test_replace_swaps_the_new_table_in_with_its_indexes(engine):
+    request = file_append(InputModel(**{
+        "files_and_join_info": {"primary_file": {"Filename": "data1.csv"}},
+        "filter": [{"fileName": "data1.csv", "conditions": {"Expressions": ["id > 0"]}}],
+        "output": {"format": "database", "table": "sunk", "if_exists": "replace", "indexes": [["data1__id"]]},
+    }))
+    assert run_pipeline(request) == "table sunk"
+    columns = [col["name"] for col in inspect(engine).get_columns("sunk")]
+    assert columns == ["data1_id", "data1_value1", "data1_created_at"]
+    assert [index["column_names"] for index in inspect(engine).get_indexes("sunk")] == [["data1_id"]]
+    assert not inspect(engine).has_table("sunk_staging")
+
+    # Replacing again reuses the index name without a clash
+    run_pipeline(request)
+    assert len(_rows(engine, "sunk")) == pl.read_csv(getFullInputPath("data1.csv")).height
+
+
+def test_empty_result_still_replaces_the_table(engine, tmp_path):
+    write_database(FRAME.head(0).lazy(), OutputSpec(format="database", table="sunk", if_exists="replace"), tmp_path)
+    assert [col["name"] for col in inspect(engine).get_columns("sunk")] == ["t_id", "t_name"]
+    assert _rows(engine, "sunk") == []
+
+
+def test_database_writes_log_instead_of_printing(engine, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError(f"printed {args}")
+    monkeypatch.setattr("builtins.print", fail)
+    messages = []
+    for level in ("debug", "info", "warning"):
+        monkeypatch.setattr(database_sink.logger, level, lambda message, *args, **fields: messages.append(message % args))
+
+    write_database(FRAME.lazy(), OutputSpec(format="database", table="sunk", if_exists="replace"), tmp_path)
+    assert any(message.startswith("Inserted 1000 rows") for message in messages)
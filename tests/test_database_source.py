@@ -0,0 +1,110 @@
+import polars as pl
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from db_lib.config import AppConfig
+from models.pydantic_models import DatabaseSource, Filter, PrimaryFile
+from services import database_source
+from services.database_source import build_query, read_only_connection
+from utils.sql_parser import check_select_query
+
+
+@pytest.fixture
+def queries_allowed(monkeypatch):
+    monkeypatch.setattr(AppConfig, "DB_ALLOW_QUERIES", True)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE orders (oid INTEGER, amount REAL, status VARCHAR(20))"))
+        connection.execute(
+            text("INSERT INTO orders VALUES (:oid, :amount, :status)"),
+            [{"oid": i, "amount": i * 1.5, "status": "open" if i % 2 else "closed"} for i in range(1, 101)],
+        )
+    return engine
+
+
+@pytest.mark.parametrize("query", [
+    "DELETE FROM orders",
+    "UPDATE orders SET amount = 0",
+    "  insert into orders values (1, 2, 'x')",
+    "SELECT 1; DROP TABLE orders",
+    "WITH d AS (DELETE FROM orders RETURNING *) SELECT * FROM d",
+    "SELECT * INTO OUTFILE '/tmp/orders' FROM orders",
+    "SELECT * FROM orders FOR UPDATE",
+    "SELECT 1 # 2; DELETE FROM orders",
+    "SELECT 1--1; DELETE FROM orders",
+    "SELECT 1 /*! ; DELETE FROM orders */",
+    "SELECT '\\' ; DELETE FROM orders; --'",
+    "SELECT 'unterminated",
+    "PRAGMA query_only = OFF",
+])
+def test_queries_that_are_not_a_single_select_are_rejected(query, queries_allowed):
+    with pytest.raises(ValidationError):
+        DatabaseSource(query=query)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM orders;", "SELECT * FROM orders"),
+    ("select oid, replace(status, 'o', 'O') from orders where status = 'DELETE; x'", None),
+    ("WITH big AS (SELECT * FROM orders WHERE amount > 10) SELECT * FROM big", None),
+    ('SELECT "update" FROM orders -- trailing comment', None),
+])
+def test_select_queries_are_accepted(query, expected):
+    assert check_select_query(query) == (expected or query)
+
+
+def test_queries_need_the_config_flag(monkeypatch):
+    monkeypatch.setattr(AppConfig, "DB_ALLOW_QUERIES", False)
+    with pytest.raises(ValidationError, match="DB_ALLOW_QUERIES"):
+        DatabaseSource(query="SELECT * FROM orders")
+    assert DatabaseSource(table="orders").table == "orders"
+
+
+def test_read_only_connection_refuses_writes_and_is_reset(engine):
+    with read_only_connection(engine) as connection:
+        assert connection.execute(text("SELECT count(*) FROM orders")).scalar() == 100
+        with pytest.raises(OperationalError):
+            connection.execute(text("DELETE FROM orders"))
+    # The pooled connection is writable again afterwards
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM orders WHERE oid = 1"))
+        assert connection.execute(text("SELECT count(*) FROM orders")).scalar() == 99
+
+
+def test_query_input_is_read_in_partitions_on_a_read_only_connection(engine, queries_allowed, monkeypatch):
+    monkeypatch.setattr(database_source, "database_connection", lambda: _Connection(engine))
+    file_details = PrimaryFile(
+        Filename="recent.db",
+        database=DatabaseSource(query="SELECT oid, amount, status FROM orders -- all of them", partition_column="oid", partitions=3),
+    )
+    filters = [Filter(**{"fileName": "recent.db", "conditions": {"Expressions": ["recent__amount > 100"]}})]
+    # The columns of a query have no known type, so nothing is pushed down
+    query, _ = build_query(file_details, engine, filters=filters)
+    assert "WHERE" not in str(query)
+
+    df = database_source.read_database(file_details, filters=filters)
+    assert df.columns == ["recent__oid", "recent__amount", "recent__status"]
+    assert sorted(df["recent__oid"].to_list()) == list(range(1, 101))
+
+
+def test_table_filters_are_pushed_down(engine, monkeypatch):
+    monkeypatch.setattr(database_source, "database_connection", lambda: _Connection(engine))
+    file_details = PrimaryFile(Filename="orders.db", database=DatabaseSource(table="orders"))
+    filters = [Filter(**{"fileName": "orders.db", "conditions": {"Expressions": ["orders__amount > 100"]}})]
+    query, _ = build_query(file_details, engine, filters=filters)
+    assert "WHERE orders.amount >" in str(query)
+    assert database_source.read_database(file_details, filters=filters)["orders__oid"].to_list() == list(range(67, 101))
+
+
+class _Connection:
+    def __init__(self, engine):
+        self.config = AppConfig
+        self._engine = engine
+
+    def get_engine(self):
+        return self._engine
@@ -0,0 +1,78 @@
+import polars as pl
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from models.pydantic_models import InputModel
+from services import explain, join_planner
+from services.database_sink import database_connection
+from services.explain import explain_request
+from services.join_planner import _estimate_source_rows
+from utils.fileNameAppender import file_append
+from utils.path_util import INPUT_DIR
+
+SAMPLE_ROWS = 100
+
+
+@pytest.fixture(autouse=True)
+def small_samples(monkeypatch):
+    monkeypatch.setattr(explain, "JOIN_PLANNER_SAMPLE_ROWS", SAMPLE_ROWS)
+    monkeypatch.setattr(join_planner, "JOIN_PLANNER_SAMPLE_ROWS", SAMPLE_ROWS)
+
+
+def _explain(primary: dict, secondary: list = (), filters: list = ()) -> dict:
+    return explain_request(file_append(InputModel(**{
+        "files_and_join_info": {"primary_file": primary, "secondary_files": list(secondary)},
+        "filter": list(filters),
+        "execution_mode": "lazy",
+    })))
+
+
+def test_filtered_inputs_are_sampled_from_the_head_only():
+    # The only rows the filter keeps are far past the sample
+    pl.DataFrame({"k": range(10 * SAMPLE_ROWS), "v": range(10 * SAMPLE_ROWS)}).write_csv(INPUT_DIR / "tail.csv")
+    pl.DataFrame({"k": range(10 * SAMPLE_ROWS)}).write_csv(INPUT_DIR / "keys.csv")
+    plan = _explain(
+        {"Filename": "tail.csv", "Join_columns": ["k"]},
+        [{"Filename": "keys.csv", "Join_columns": ["k"], "join_type": "inner"}],
+        [{"fileName": "tail.csv", "conditions": {"Expressions": [f"v >= {9 * SAMPLE_ROWS}"]}}],
+    )
+    assert plan["inputs"]["tail.csv"]["selectivity"] == 0
+    assert plan["sampled_output_rows"] == 0
+    # Extrapolated from the file size, close to the real count
+    assert plan["inputs"]["tail.csv"]["rows"] == pytest.approx(10 * SAMPLE_ROWS, rel=0.1)
+
+
+@pytest.mark.parametrize("extension, write", [("parquet", pl.DataFrame.write_parquet), ("ipc", pl.DataFrame.write_ipc)])
+def test_columnar_inputs_are_counted_from_their_footer(extension, write, monkeypatch):
+    write(pl.DataFrame({"k": range(1234)}), INPUT_DIR / f"counted.{extension}")
+    raw = pl.scan_parquet(INPUT_DIR / "counted.parquet") if extension == "parquet" else pl.scan_ipc(INPUT_DIR / "counted.ipc")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the rows were read to count them")
+    monkeypatch.setattr(pl.LazyFrame, "collect", fail)
+    assert _estimate_source_rows(f"counted.{extension}", raw) == 1234
+
+
+def test_database_inputs_are_sampled_and_counted_by_the_database():
+    with database_connection().get_engine().begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS explained"))
+        connection.execute(text("CREATE TABLE explained (k INTEGER, v INTEGER)"))
+        connection.execute(
+            text("INSERT INTO explained VALUES (:k, :v)"), [{"k": i, "v": i % 10} for i in range(5 * SAMPLE_ROWS)]
+        )
+    plan = _explain(
+        {"Filename": "explained.db", "database": {"table": "explained"}},
+        filters=[{"fileName": "explained.db", "conditions": {"Expressions": ["v < 5"]}}],
+    )
+    # The pushed-down filter is part of the count, and only a sample was fetched
+    assert plan["inputs"]["explained.db"]["rows"] == 5 * SAMPLE_ROWS // 2
+    assert plan["sampled_output_rows"] == SAMPLE_ROWS
+    assert plan["estimated_output_rows"] == 5 * SAMPLE_ROWS // 2
+
+
+def test_large_inputs_without_a_lazy_reader_are_refused(monkeypatch):
+    monkeypatch.setattr(explain, "EXPLAIN_MAX_FULL_READ_BYTES", 10)
+    with pytest.raises(HTTPException) as error:
+        _explain({"Filename": "data2.json"}, filters=[{"fileName": "data2.json", "conditions": {"Expressions": ["id > 0"]}}])
+    assert error.value.status_code == 413
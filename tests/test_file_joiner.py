@@ -0,0 +1,70 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from models.pydantic_models import InputModel, JoinFile, OutputSpec
+from services import output_writer
+from services.file_joiner import join_pair
+from services.pipeline import run_pipeline
+from utils.fileNameAppender import file_append
+
+LEFT = pl.LazyFrame({"k": [1, 2, 2, None, 5], "j": ["a", "b", "b", "c", "e"], "y": [0, 1, 2, 3, 4]})
+RIGHT = pl.LazyFrame({"y": [7, 8, 9], "k2": [2, 3, None], "j2": ["b", "c", "c"], "k": [9, 9, 9]})
+
+
+@pytest.fixture
+def no_collect_fallback(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the plan was collected instead of streamed into the sink")
+    monkeypatch.setattr(output_writer, "_write_collected", fail)
+
+
+def _uncoalesced(join_type: str, left_on, right_on) -> pl.DataFrame:
+    if join_type == "right":
+        joined = RIGHT.join(LEFT, how="left", left_on=right_on, right_on=left_on, coalesce=False)
+        left_columns = [col for col in LEFT.columns if col in joined.columns]
+        return joined.select(left_columns + [col for col in joined.columns if col not in left_columns]).collect()
+    return LEFT.join(RIGHT, how=join_type, left_on=left_on, right_on=right_on, coalesce=False).collect()
+
+
+@pytest.mark.parametrize("join_type", ["inner", "left", "right"])
+@pytest.mark.parametrize("keys", [(["k"], ["k2"]), (["k", "j"], ["k2", "j2"])])
+def test_join_keeps_both_keys_like_an_uncoalesced_join(join_type, keys):
+    left_on, right_on = keys
+    joined = join_pair(LEFT, RIGHT, left_on, JoinFile(Filename="r.csv", Join_columns=right_on, join_type=join_type))
+    assert_frame_equal(joined.collect(), _uncoalesced(join_type, left_on, right_on), check_row_order=False)
+
+
+@pytest.mark.parametrize("join_type", ["inner", "left", "right"])
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_join_plan_streams_into_the_sink(join_type, coalesce, tmp_path, no_collect_fallback):
+    joined = join_pair(
+        LEFT, RIGHT, ["k"], JoinFile(Filename="r.csv", Join_columns=["k2"], join_type=join_type, coalesce=coalesce)
+    )
+    output_writer.write_frame(joined, OutputSpec(), tmp_path / "out.csv")
+    assert pl.read_csv(tmp_path / "out.csv").height == joined.collect().height
+
+
+def test_full_join_falls_back_to_collect_with_a_warning(tmp_path, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(output_writer.logger, "warning", lambda message, *args, **fields: warnings.append(fields))
+    joined = join_pair(LEFT, RIGHT, ["k"], JoinFile(Filename="r.csv", Join_columns=["k2"], join_type="full outer"))
+    output_writer.write_frame(joined, OutputSpec(), tmp_path / "out.csv")
+    assert pl.read_csv(tmp_path / "out.csv").height == joined.collect().height
+    assert warnings == [{"stage": "write", "fallback": "collect"}]
+
+
+@pytest.mark.parametrize("join_type", ["inner", "left"])
+def test_lazy_joined_request_is_streamed(join_type, no_collect_fallback):
+    request = InputModel(**{
+        "files_and_join_info": {
+            "primary_file": {"Filename": "data1.csv", "Join_columns": ["id"]},
+            "secondary_files": [{"Filename": "data2.csv", "Join_columns": ["roll"], "join_type": join_type}],
+        },
+        "filter": [],
+        "execution_mode": "lazy",
+        "use_cache": False,
+    })
+    output = pl.read_csv(run_pipeline(file_append(request)))
+    assert {"data1__id", "data2__roll"} <= set(output.columns)
+    assert output.height > 0
@@ -0,0 +1,22 @@
+import os
+
+import polars as pl
+
+from utils import file_reader
+from utils.file_reader import scanDataframe
+from utils.path_util import INPUT_DIR
+
+
+def test_inferred_schemas_are_bounded_and_replaced_when_the_file_changes(monkeypatch):
+    monkeypatch.setattr(file_reader, "INFERRED_SCHEMA_CACHE_SIZE", 2)
+    monkeypatch.setattr(file_reader, "_inferred_schemas", type(file_reader._inferred_schemas)())
+    for name in ("s1.csv", "s2.csv", "s3.csv"):
+        pl.DataFrame({"k": [1, 2]}).write_csv(INPUT_DIR / name)
+        scanDataframe(name, direct=True).collect()
+    assert [key[0] for key in file_reader._inferred_schemas] == [str(INPUT_DIR / "s2.csv"), str(INPUT_DIR / "s3.csv")]
+
+    # A rewritten file replaces its own entry instead of adding one
+    pl.DataFrame({"k": ["a", "b"]}).write_csv(INPUT_DIR / "s3.csv")
+    os.utime(INPUT_DIR / "s3.csv", ns=(0, 1))
+    assert scanDataframe("s3.csv", direct=True).collect()["s3__k"].dtype == pl.String
+    assert len(file_reader._inferred_schemas) == 2
@@ -0,0 +1,73 @@
+from datetime import date
+
+import polars as pl
+import pytest
+
+from utils.filter_expression import compile_filter, filter_columns, parse_filter, render_node
+
+DF = pl.DataFrame({
+    "id": [1, 2, 3, 4, 5],
+    "city": ["Paris", "New York", None, "O'Hare", "Rome"],
+    "price": [10.0, 25.5, 30.0, None, 5.0],
+    "cost": [5.0, 30.0, 10.0, 1.0, 5.0],
+    "day": [date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 1), date(2024, 3, 1), None],
+    "active": [True, False, True, False, True],
+})
+
+
+def _ids(text: str, params: dict = None) -> list:
+    return DF.filter(compile_filter(text, dict(DF.schema), params))["id"].to_list()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("id > 2", [3, 4, 5]),
+    ("id = 2", [2]),
+    ("id <> 2", [1, 3, 4, 5]),
+    ("city == New York", [2]),
+    ("city == 'O''Hare'", [4]),
+    ("price > [cost]", [1, 3]),
+    ("day >= 2024-01-15", [2, 3, 4]),
+    ("day BETWEEN 2024-01-01 AND 2024-01-31", [1, 2]),
+    ("id NOT BETWEEN 2 AND 4", [1, 5]),
+    ("id IN (1, 3, 9)", [1, 3]),
+    ("city NOT IN (Paris, Rome)", [2, 4]),
+    ("city IS NULL", [3]),
+    ("price IS NOT NULL", [1, 2, 3, 5]),
+    ("city LIKE 'New%'", [2]),
+    ("city NOT LIKE '%o%'", [1, 4]),
+    ("active == TRUE", [1, 3, 5]),
+    # AND binds tighter than OR, NOT tighter than both
+    ("id = 1 OR id = 2 AND active == TRUE", [1]),
+    ("(id = 1 OR id = 2) AND active == FALSE", [2]),
+    ("NOT id > 2 AND active == TRUE", [1]),
+    ("id in (1, 2) and not (city == Paris)", [2]),
+])
+def test_expressions_filter_like_their_polars_equivalent(text, expected):
+    assert _ids(text) == expected
+
+
+def test_parameters_are_bound_at_compile_time():
+    assert _ids("id IN :ids AND price > :min", {"ids": [1, 2, 3], "min": 20}) == [2, 3]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "id >",
+    "id > 2 AND",
+    "(id > 2",
+    "id > 2)",
+    "city LIKE 5",
+    "id 2",
+    "id > 'a",
+    "id ! 2",
+])
+def test_malformed_expressions_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
+
+
+def test_rendered_trees_parse_back_to_the_same_tree():
+    text = "city == New York AND (price > [cost] OR id NOT IN (1, 2)) AND day IS NOT NULL"
+    tree = parse_filter(text)
+    assert parse_filter(render_node(tree)) == tree
+    assert sorted(filter_columns(text)) == ["city", "cost", "day", "id", "price"]
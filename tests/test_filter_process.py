@@ -0,0 +1,46 @@
+import os
+
+import polars as pl
+import pytest
+
+from models.pydantic_models import ConvertCondition, InputModel
+from services import filter_process
+from services.filter_process import convertDatetimeColumn
+from services.pipeline import run_pipeline
+from utils.fileNameAppender import file_append
+from utils.filter_expression import parse_filter
+from utils.path_util import INPUT_DIR
+
+
+def test_inferred_date_formats_are_bounded_and_replaced_when_the_file_changes(monkeypatch):
+    monkeypatch.setattr(filter_process, "DATE_FORMAT_CACHE_SIZE", 2)
+    monkeypatch.setattr(filter_process, "_inferred_formats", type(filter_process._inferred_formats)())
+    convert = ConvertCondition(column_name="d", format="yyyy-mm-dd")
+    for name in ("f1.csv", "f2.csv", "f3.csv"):
+        df = pl.DataFrame({"d": ["20/02/2020", "21/02/2020"]})
+        df.write_csv(INPUT_DIR / name)
+        convertDatetimeColumn(df, convert, source_path=INPUT_DIR / name)
+    assert list(filter_process._inferred_formats) == [(str(INPUT_DIR / name), "d") for name in ("f2.csv", "f3.csv")]
+
+    # A rewritten file replaces its own entry instead of adding one
+    df = pl.DataFrame({"d": ["2020/02/20", "2020/02/21"]})
+    df.write_csv(INPUT_DIR / "f3.csv")
+    os.utime(INPUT_DIR / "f3.csv", ns=(0, 1))
+    assert convertDatetimeColumn(df, convert, source_path=INPUT_DIR / "f3.csv")["d"].to_list() == ["2020-02-20", "2020-02-21"]
+    assert len(filter_process._inferred_formats) == 2
+
+
+def test_bare_column_names_may_contain_spaces():
+    assert parse_filter("first name == New York") == ("cmp", "==", ("col", "first name"), ("lit", "New York", "str"))
+    assert parse_filter("first name IS NOT NULL") == ("isnull", ("col", "first name"), True)
+    # Names holding a keyword still need brackets
+    with pytest.raises(ValueError):
+        parse_filter("date in == x")
+
+    pl.DataFrame({"first name": ["Ann", "Bob"], "age": [30, 40]}).write_csv(INPUT_DIR / "people.csv")
+    output = run_pipeline(file_append(InputModel(**{
+        "files_and_join_info": {"primary_file": {"Filename": "people.csv"}},
+        "filter": [{"fileName": "people.csv", "conditions": {"Expressions": ["first name == Bob", "age > 10"], "operator": "And"}}],
+        "use_cache": False,
+    })))
+    assert pl.read_csv(output)["people__first name"].to_list() == ["Bob"]
@@ -0,0 +1,61 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from models.pydantic_models import InputModel
+from services import join_planner
+from services.join_planner import plan_join_order
+from services.pipeline import run_pipeline
+from utils.fileNameAppender import file_append
+from utils.file_reader import createDataframe
+from utils.path_util import INPUT_DIR
+
+INPUTS = {
+    "jp_main.csv": pl.DataFrame({"k": range(100), "a": range(100)}),
+    "jp_left.csv": pl.DataFrame({"k": range(0, 100, 2), "l": range(50)}),
+    "jp_big.csv": pl.DataFrame({"k": list(range(100)) * 2, "b": range(200)}),
+    "jp_small.csv": pl.DataFrame({"k": range(5), "s": range(5)}),
+    "jp_outer.csv": pl.DataFrame({"k": range(50, 150), "o": range(100)}),
+    "jp_tail.csv": pl.DataFrame({"k": range(3), "t": range(3)}),
+}
+
+
+def _request(execution_mode: str) -> InputModel:
+    for name, df in INPUTS.items():
+        df.write_csv(INPUT_DIR / name)
+    return file_append(InputModel(**{
+        "files_and_join_info": {
+            "primary_file": {"Filename": "jp_main.csv", "Join_columns": ["k"]},
+            "secondary_files": [
+                {"Filename": "jp_left.csv", "Join_columns": ["k"], "join_type": "left"},
+                {"Filename": "jp_big.csv", "Join_columns": ["k"], "join_type": "inner"},
+                {"Filename": "jp_small.csv", "Join_columns": ["k"], "join_type": "inner"},
+                {"Filename": "jp_outer.csv", "Join_columns": ["k"], "join_type": "full outer"},
+                {"Filename": "jp_tail.csv", "Join_columns": ["k"], "join_type": "inner"},
+            ],
+        },
+        "filter": [{"fileName": "jp_big.csv", "conditions": {"Expressions": ["b < 150"]}}],
+        "execution_mode": execution_mode,
+        "use_cache": False,
+    }))
+
+
+def test_selective_inner_joins_go_first_up_to_the_first_outer_join():
+    request = _request("eager")
+    df_map = {name: createDataframe(name) for name in INPUTS}
+    order, estimates = plan_join_order(df_map, request.files_and_join_info)
+    assert [f.file_name for f in order] == ["jp_small.csv", "jp_big.csv", "jp_left.csv", "jp_outer.csv", "jp_tail.csv"]
+    assert estimates["jp_small.csv"]["estimated_keys"] == 5
+    assert set(estimates) == {"jp_small.csv", "jp_big.csv"}
+
+
+@pytest.mark.parametrize("execution_mode", ["eager", "lazy"])
+def test_reordered_join_returns_the_request_order_result(execution_mode, monkeypatch):
+    request = _request(execution_mode)
+    reordered = pl.read_csv(run_pipeline(request))
+    monkeypatch.setattr(join_planner, "JOIN_REORDER_ENABLED", False)
+    in_order = pl.read_csv(run_pipeline(request))
+
+    assert reordered.height > 0
+    # Same columns in the same order, same rows
+    assert_frame_equal(reordered, in_order, check_row_order=False)
@@ -0,0 +1,68 @@
+import polars as pl
+import pytest
+
+from models.pydantic_models import InputModel
+from services import pipeline
+from services.pipeline import run_pipeline
+from utils.dataframe_cache import dataframe_cache
+from utils.fileNameAppender import file_append
+from utils.file_reader import createDataframe
+
+
+def _request(execution_mode: str, output_format: str = "csv") -> InputModel:
+    return file_append(InputModel(**{
+        "files_and_join_info": {
+            "primary_file": {"Filename": "data1.csv", "Join_columns": ["id"]},
+            "secondary_files": [{"Filename": "data2.csv", "Join_columns": ["roll"], "join_type": "left"}],
+        },
+        "filter": [{"fileName": "data1.csv", "conditions": {"Expressions": ["id > 1"]}}],
+        "execution_mode": execution_mode,
+        "output": {"format": output_format},
+        "use_cache": False,
+    }))
+
+
+def _stage_rows() -> dict:
+    return {key[0]: value for key, value in pipeline.STAGE_ROWS._values.items()}
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "ipc"])
+def test_lazy_runs_count_join_and_write_rows(output_format):
+    before = _stage_rows()
+    output = run_pipeline(_request("lazy", output_format))
+    rows = getattr(pl, f"read_{output_format}")(output).height
+    after = _stage_rows()
+
+    assert rows > 0
+    assert after["join"] - before.get("join", 0) == rows
+    assert after["write"] - before.get("write", 0) == rows
+    # A lazy plan's read and filter rows are not known without running it twice
+    assert after.get("read", 0) == before.get("read", 0)
+    assert after.get("filter", 0) == before.get("filter", 0)
+
+
+def test_eager_runs_count_every_stage():
+    before = _stage_rows()
+    output = run_pipeline(_request("eager"))
+    after = _stage_rows()
+
+    assert after["read"] - before.get("read", 0) == pl.read_csv(pipeline.getFullInputPath("data1.csv")).height + \
+        pl.read_csv(pipeline.getFullInputPath("data2.csv")).height
+    assert after["filter"] - before.get("filter", 0) > 0
+    assert after["write"] - before.get("write", 0) == pl.read_csv(output).height
+
+
+def test_projected_read_looks_the_cache_up_once():
+    dataframe_cache.clear()
+    misses = dataframe_cache.misses
+    hits = dataframe_cache.hits
+    first = createDataframe("data2.csv", columns=["data2__roll"])
+    assert dataframe_cache.misses - misses == 1
+    assert createDataframe("data2.csv", columns=["data2__roll"]).equals(first)
+    assert dataframe_cache.hits - hits == 1
+
+    # A full copy in memory serves projections of it
+    createDataframe("data2.csv")
+    hits = dataframe_cache.hits
+    assert createDataframe("data2.csv", columns=["data2__value1"]).columns == ["data2__value1"]
+    assert dataframe_cache.hits - hits == 1
@@ -0,0 +1,74 @@
+import polars as pl
+import pytest
+from fastapi.testclient import TestClient
+
+from app import app
+from models.pydantic_models import InputModel
+from services.pipeline_registry import PipelineRegistry
+from utils import filter_expression
+from utils.filter_expression import _compile_cached, _parse_cached, compile_filter
+from utils.path_util import INPUT_DIR
+
+REQUEST = {
+    "files_and_join_info": {"primary_file": {"Filename": "data1.csv"}},
+    "filter": [{
+        "fileName": "data1.csv",
+        "conditions": {"Expressions": ["value1 >= 20 AND id IN :ids", "id > :min_id"], "operator": "Or"},
+    }],
+    "use_cache": False,
+}
+
+
+def test_runs_bind_the_registered_trees_without_parsing_again(monkeypatch):
+    registry = PipelineRegistry()
+    pipeline = registry.register(InputModel(**REQUEST))
+    assert pipeline.parameters == ["ids", "min_id"]
+    assert len(pipeline.filters) == 2
+
+    _parse_cached.cache_clear()
+    _compile_cached.cache_clear()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("a registered filter was parsed again")
+    monkeypatch.setattr(filter_expression, "_Parser", fail)
+    schema = {"data1__id": pl.Int64, "data1__value1": pl.Int64}
+    for text in pipeline.filters:
+        compile_filter(text, schema, registry.bind(pipeline, {"ids": [1, 2], "min_id": 3}))
+
+    registry.delete(pipeline.id)
+    assert not set(pipeline.filters) & set(filter_expression._pinned_trees)
+
+
+def test_compiled_filters_are_cached_without_their_parameter_values():
+    _compile_cached.cache_clear()
+    df = pl.DataFrame({"id": [1, 2, 3, 4], "value1": [10, 20, 30, 40]})
+    for ids, expected in [([1], [1, 3, 4]), ([1, 2], [1, 2, 3, 4]), ([4], [3, 4])]:
+        expr = compile_filter("value1 >= 30 OR id IN :ids", dict(df.schema), {"ids": ids})
+        assert df.filter(expr)["id"].to_list() == expected
+    assert _compile_cached.cache_info().currsize == 1
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"ids": [[1, 2]], "min_id": 1}, "Parameter :ids"),
+    ({"ids": [1], "min_id": {"a": 1}}, "Parameter :min_id"),
+    ({"ids": [1], "min_id": [1, 2]}, "only be used after IN"),
+    ({"ids": [1]}, "Missing parameters"),
+])
+def test_runs_with_invalid_parameter_values_are_refused(params, message):
+    client = TestClient(app)
+    pipeline_id = client.post("/pipelines", json=REQUEST).json()["pipeline_id"]
+    response = client.post(f"/pipelines/{pipeline_id}/run", json={"params": params})
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+
+
+def test_registered_run_filters_with_its_parameters():
+    client = TestClient(app)
+    pipeline_id = client.post("/pipelines", json=REQUEST).json()["pipeline_id"]
+    response = client.post(f"/pipelines/{pipeline_id}/run", json={"params": {"ids": [1], "min_id": 2}})
+    assert response.status_code == 200
+    output = pl.read_csv(response.json()["message"])
+    assert sorted(output["data1__id"].to_list()) == sorted(
+        pl.read_csv(INPUT_DIR / "data1.csv")
+        .filter((pl.col("value1") >= 20) & pl.col("id").is_in([1]) | (pl.col("id") > 2))["id"].to_list()
+    )
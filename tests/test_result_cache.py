@@ -0,0 +1,70 @@
+import os
+import time
+import uuid
+from pathlib import Path
+
+from services.result_cache import CACHE_ENTRY_FILENAME, ResultCache
+
+
+def _run_output(output_dir: Path, size: int, age: float = 0) -> Path:
+    run_dir = output_dir / uuid.uuid4().hex
+    run_dir.mkdir(parents=True)
+    path = run_dir / "out.csv"
+    path.write_bytes(b"x" * size)
+    if age:
+        stamp = time.time() - age
+        for p in (path, run_dir):
+            os.utime(p, (stamp, stamp))
+    return path
+
+
+def test_cache_is_rebuilt_from_disk_after_a_restart(tmp_path):
+    cache = ResultCache(max_bytes=1000, output_dir=tmp_path)
+    first, second = _run_output(tmp_path, 300), _run_output(tmp_path, 300)
+    cache.put("first", first)
+    cache.put("second", second)
+    # Used most recently, so it should outlive "second" after the restart
+    os.utime(first.parent / CACHE_ENTRY_FILENAME, (time.time() + 10, time.time() + 10))
+
+    restarted = ResultCache(max_bytes=1000, output_dir=tmp_path)
+    assert restarted.stats()["entries"] == 2
+    assert restarted.stats()["bytes"] == 600
+    assert restarted.get("first") == first
+
+    restarted.put("third", _run_output(tmp_path, 300))
+    restarted.put("fourth", _run_output(tmp_path, 300))
+    assert not second.exists()
+    assert first.exists()
+
+
+def test_restart_with_a_smaller_budget_evicts(tmp_path):
+    cache = ResultCache(max_bytes=1000, output_dir=tmp_path)
+    for key in ("a", "b", "c"):
+        cache.put(key, _run_output(tmp_path, 300))
+    restarted = ResultCache(max_bytes=400, output_dir=tmp_path)
+    assert restarted.stats()["entries"] == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_uncached_run_outputs_expire(tmp_path):
+    cache = ResultCache(max_bytes=1000, output_dir=tmp_path, ttl_seconds=3600)
+    cached = _run_output(tmp_path, 10, age=7200)
+    cache.put("cached", cached)
+    too_large = _run_output(tmp_path, 5000, age=7200)
+    cache.put("too_large", too_large)
+    uncached_old = _run_output(tmp_path, 10, age=7200)
+    uncached_new = _run_output(tmp_path, 10)
+    (tmp_path / "not_a_run").mkdir()
+
+    cache.sweep(force=True)
+    assert cached.exists()
+    assert not too_large.exists()
+    assert not uncached_old.exists()
+    assert uncached_new.exists()
+    assert (tmp_path / "not_a_run").exists()
+
+
+def test_old_outputs_are_swept_on_start(tmp_path):
+    old = _run_output(tmp_path, 10, age=7200)
+    ResultCache(max_bytes=0, output_dir=tmp_path, ttl_seconds=3600)
+    assert not old.exists()
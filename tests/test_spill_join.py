@@ -0,0 +1,105 @@
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+from polars.testing import assert_frame_equal
+
+from models.pydantic_models import InputModel, OutputSpec
+from services import output_writer, spill_join
+from services.output_writer import write_output
+from services.pipeline import run_pipeline
+from utils.fileNameAppender import file_append
+from utils.path_util import INPUT_DIR
+
+LEFT = pl.DataFrame({"k": [i % 37 for i in range(500)] + [None], "v": list(range(501))})
+RIGHT = pl.DataFrame({"k": list(range(40)), "w": [f"w{i}" for i in range(40)]})
+
+
+@pytest.fixture
+def parquet_opens(monkeypatch):
+    # Counts how often each Parquet file is opened for reading
+    opens = {}
+    original = pq.ParquetFile
+
+    def counting(path, *args, **kwargs):
+        opens[str(path)] = opens.get(str(path), 0) + 1
+        return original(path, *args, **kwargs)
+    monkeypatch.setattr(pq, "ParquetFile", counting)
+    monkeypatch.setattr(output_writer, "PARTITION_CHUNK_ROWS", 64)
+    return opens
+
+
+def _request(**extra) -> InputModel:
+    LEFT.write_csv(INPUT_DIR / "spill_left.csv")
+    RIGHT.write_csv(INPUT_DIR / "spill_right.csv")
+    return file_append(InputModel(**{
+        "files_and_join_info": {
+            "primary_file": {"Filename": "spill_left.csv", "Join_columns": ["k"]},
+            "secondary_files": [{"Filename": "spill_right.csv", "Join_columns": ["k"], "join_type": "left"}],
+        },
+        "filter": [],
+        "execution_mode": "lazy",
+        "use_cache": False,
+        **extra,
+    }))
+
+
+def test_partition_inputs_reads_each_spill_once(tmp_path, parquet_opens):
+    request = _request()
+    df_map = {
+        "spill_left.csv": LEFT.lazy().select(pl.all().name.prefix("spill_left__")),
+        "spill_right.csv": RIGHT.lazy().select(pl.all().name.prefix("spill_right__")),
+    }
+    paths = spill_join.partition_inputs(df_map, request.files_and_join_info, 8, tmp_path)
+
+    # One chunked pass over each tagged file, whatever the number of partitions
+    assert parquet_opens == {str(tmp_path / "spill_left.parquet"): 1, str(tmp_path / "spill_right.parquet"): 1}
+    for file_name, frame in df_map.items():
+        assert len(paths[file_name]) == 8
+        parts = pl.concat([pl.read_parquet(path) for path in paths[file_name]])
+        assert_frame_equal(parts, frame.collect(), check_row_order=False)
+    # Equal keys land in the same partition on both sides
+    for partition in range(8):
+        left_keys = set(pl.read_parquet(paths["spill_left.csv"][partition])["spill_left__k"].drop_nulls())
+        right_keys = set(pl.read_parquet(paths["spill_right.csv"][partition])["spill_right__k"])
+        assert left_keys <= right_keys
+
+
+def test_spilled_request_matches_the_in_memory_join(monkeypatch):
+    expected = pl.read_csv(run_pipeline(_request()))
+    monkeypatch.setattr(spill_join, "SPILL_JOIN_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(spill_join, "SPILL_JOIN_PARTITION_BYTES", 512)
+    request = _request()
+    assert spill_join.spill_partition_count(request) > 2
+    assert_frame_equal(pl.read_csv(run_pipeline(request)), expected, check_row_order=False)
+
+
+def test_unstreamable_spill_is_collected_with_a_warning(monkeypatch):
+    expected = pl.read_csv(run_pipeline(_request()))
+    monkeypatch.setattr(spill_join, "SPILL_JOIN_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(spill_join, "SPILL_JOIN_PARTITION_BYTES", 512)
+    warnings = []
+    monkeypatch.setattr(spill_join.logger, "warning", lambda message, *args, **fields: warnings.append(fields))
+
+    def unstreamable(*args, **kwargs):
+        raise pl.exceptions.InvalidOperationError("sink is not supported for this plan")
+    monkeypatch.setattr(pl.LazyFrame, "sink_parquet", unstreamable)
+
+    assert_frame_equal(pl.read_csv(run_pipeline(_request())), expected, check_row_order=False)
+    # (ingest sidecars, which cannot be sunk either, warn without fields)
+    assert [fields for fields in warnings if fields] == [{"stage": "join", "fallback": "collect"}] * 2
+
+
+def test_partitioned_output_is_split_in_one_pass(tmp_path, parquet_opens):
+    frame = pl.DataFrame({"p": [i % 5 for i in range(300)] + [None], "q": ["a", "b", "c"] * 100 + ["a"], "v": range(301)})
+    output = OutputSpec(format="csv", partition_by=["p", "q"])
+    output_dir = write_output(frame.lazy(), output, tmp_path / "out.csv")
+
+    assert list(parquet_opens.values()) == [1]
+    written = pl.read_csv(output_dir / "p=null" / "q=a" / "part-0.csv")
+    assert written["v"].to_list() == [300]
+    total = 0
+    for (p, q), part in frame.partition_by(["p", "q"], as_dict=True, include_key=False).items():
+        path = output_dir / f"p={'null' if p is None else p}" / f"q={q}" / "part-0.csv"
+        assert_frame_equal(pl.read_csv(path), part)
+        total += part.height
+    assert total == frame.height
@@ -1,20 +1,23 @@
 import polars as pl
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple, Union
+from utils.filter_expression import compile_node, literal_value
+from utils.sql_parser import parse_case_statement
 
 def add_column_on_given_condition(
-    dataframe: pl.DataFrame,
+    dataframe: Union[pl.DataFrame, pl.LazyFrame],
     new_column_name: str, # Added new_column_name as it's a dynamic output
     condition_column: str,
     operator: str,
     condition_value: Any,
     then_value: Any,
     else_value: Any
-) -> pl.DataFrame:
+) -> Union[pl.DataFrame, pl.LazyFrame]:
     """
     Adds a new column to the DataFrame based on a dynamic condition.
+    A LazyFrame is accepted as well; the column is then only added to its plan.
 
     Args:
-        dataframe (pl.DataFrame): The input Polars DataFrame.
+        dataframe (pl.DataFrame | pl.LazyFrame): The input Polars DataFrame or LazyFrame.
         new_column_name (str): The name for the new column to be added.
         condition_column (str): The name of the column to apply the condition on.
         operator (str): The boolean operator as a string (e.g., '>', '<', '==', '>=', '<=', '!=').
@@ -23,7 +26,7 @@ def add_column_on_given_condition(
         else_value (Any): The value to put in the new column if the condition is False.
 
     Returns:
-        pl.DataFrame: The DataFrame with the new conditional column.
+        pl.DataFrame | pl.LazyFrame: The same kind of frame with the new conditional column.
 
     Raises:
         ValueError: If the condition_column does not exist in the DataFrame
@@ -69,5 +72,70 @@ def add_column_on_given_condition(
     )
 
     return df_with_new_column
+
+
+def _equality_mapping(branches: list, schema: Dict[str, pl.DataType]) -> Optional[Tuple[str, dict]]:
+    """
+    (column, {value: then_value}) when every WHEN only tests one column for equality
+    (== or IN), which turns the whole CASE into a single lookup; otherwise None.
+    """
+    column = None
+    mapping = {}
+    for condition, then_value in branches:
+        if condition[0] == "cmp" and condition[1] == "==" and condition[2][0] == "col" and condition[3][0] == "lit":
+            subject, keys = condition[2], [condition[3]]
+        elif condition[0] == "in" and not condition[3] and condition[1][0] == "col" \
+                and all(value[0] == "lit" for value in condition[2]):
+            subject, keys = condition[1], condition[2]
+        else:
+            return None
+        if column is not None and subject[1] != column:
+            return None
+        column = subject[1]
+        for key in keys:
+            if key[2] == "null":
+                return None
+            # The first branch matching a value wins, as in the WHEN chain
+            mapping.setdefault(literal_value(key, schema.get(column)), literal_value(then_value, None))
+    return column, mapping
+
+
+def case_expression(sql_statement: str, schema: Dict[str, pl.DataType]) -> pl.Expr:
+    """
+    Compiles a (multi-branch) CASE statement into one Polars expression.
+    Equality-only statements become a vectorized replace() lookup; anything else
+    becomes a when/then chain with the conditions compiled like filter expressions.
+    """
+    parsed = parse_case_statement(sql_statement)
+    branches = parsed["branches"]
+    else_value = pl.lit(literal_value(parsed["else_value"], None))
+
+    lookup = _equality_mapping(branches, schema) if len(branches) > 1 else None
+    if lookup is not None:
+        column, mapping = lookup
+        if column not in schema:
+            raise ValueError(f"Column '{column}' not found")
+        return pl.col(column).replace(mapping, default=else_value)
+
+    condition, then_value = branches[0]
+    expression = pl.when(compile_node(condition, schema)).then(pl.lit(literal_value(then_value, None)))
+    for condition, then_value in branches[1:]:
+        expression = expression.when(compile_node(condition, schema)).then(pl.lit(literal_value(then_value, None)))
+    return expression.otherwise(else_value)
+
+
+def add_case_columns(
+    dataframe: Union[pl.DataFrame, pl.LazyFrame],
+    new_column_names: List[str],
+    sql_statements: List[str],
+) -> Union[pl.DataFrame, pl.LazyFrame]:
+    """
+    Adds one column per CASE statement, all in a single with_columns pass.
+    """
+    schema = dataframe.schema
+    return dataframe.with_columns([
+        case_expression(sql_statement, schema).alias(new_column_name)
+        for new_column_name, sql_statement in zip(new_column_names, sql_statements)
+    ])
 # Apply the function to our sample DataFrame
 # df_transformed = add_column_on_given_condition(df)
@@ -21,5 +21,42 @@ known_formats = [
     "%d-%m-%Y",
     "%y/%m/%d",
     "%d-%b-%Y",
-    "%Y.%m.%d"
-]
\ No newline at end of file
+    "%Y.%m.%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+]
+
+# Compression codecs accepted by the streaming output sinks, per output format
+output_compressions = {
+    'csv': [],
+    'parquet': ['uncompressed', 'snappy', 'gzip', 'lzo', 'brotli', 'lz4', 'zstd'],
+    'ipc': ['uncompressed', 'lz4', 'zstd'],
+    'database': [],
+}
+
+# File extension written for each output format
+output_extensions = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'ipc': '.arrow',
+}
+
+# dtype names accepted in read options, mapped to the Polars data type they select
+dtype_names = {
+    'int8': 'Int8',
+    'int16': 'Int16',
+    'int32': 'Int32',
+    'int64': 'Int64',
+    'uint8': 'UInt8',
+    'uint16': 'UInt16',
+    'uint32': 'UInt32',
+    'uint64': 'UInt64',
+    'float32': 'Float32',
+    'float64': 'Float64',
+    'bool': 'Boolean',
+    'str': 'Utf8',
+    'categorical': 'Categorical',
+    'date': 'Date',
+    'datetime': 'Datetime',
+}
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import polars as pl
+from dotenv import load_dotenv
+
+from utils.metrics import metrics
+
+load_dotenv()
+# Memory budget for parsed input DataFrames, measured with DataFrame.estimated_size()
+DATAFRAME_CACHE_MAX_BYTES = int(os.getenv('DATAFRAME_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups by outcome", ["cache", "result"])
+
+
+def _file_key(path) -> tuple:
+    stat = os.stat(path)
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+class DataFrameCache:
+    """
+    Process-wide LRU cache of parsed, column-prefixed input DataFrames.
+    Entries are keyed by (path, size, mtime) so a rewritten file is re-read, plus a
+    variant string identifying the read options the frame was parsed with.
+    Pinned files (all their variants) are never evicted, but they still count against the budget.
+    """
+    def __init__(self, max_bytes: int = DATAFRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (path, variant) -> (file key, DataFrame, estimated bytes)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._pinned = set()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, variant: str = "") -> Optional[pl.DataFrame]:
+        return self.lookup(path, [variant])[1]
+
+    def lookup(self, path, variants: List[str]) -> Tuple[Optional[str], Optional[pl.DataFrame]]:
+        """
+        The first of `variants` held for the file and its DataFrame, (None, None) when
+        none is. Counts as one hit or miss whatever the number of variants tried.
+        """
+        key = _file_key(path)
+        with self._lock:
+            for variant in variants:
+                entry_key = (key[0], variant)
+                entry = self._entries.get(entry_key)
+                if entry is not None and entry[0] != key:
+                    self._drop(entry_key)
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache="dataframe", result="hit")
+                    return variant, entry[1]
+            self.misses += 1
+            CACHE_LOOKUPS.inc(cache="dataframe", result="miss")
+            return None, None
+
+    def put(self, path, df: pl.DataFrame, variant: str = ""):
+        key = _file_key(path)
+        entry_key = (key[0], variant)
+        size = df.estimated_size()
+        with self._lock:
+            if entry_key in self._entries:
+                self._drop(entry_key)
+            if size > self.max_bytes and key[0] not in self._pinned:
+                return
+            self._entries[entry_key] = (key, df, size)
+            self._total_bytes += size
+            self._evict()
+
+    def pin(self, path):
+        with self._lock:
+            self._pinned.add(str(path))
+
+    def unpin(self, path):
+        with self._lock:
+            self._pinned.discard(str(path))
+            self._evict()
+
+    def is_pinned(self, path) -> bool:
+        return str(path) in self._pinned
+
+    def clear(self):
+        """
+        Drops every unpinned entry.
+        """
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] not in self._pinned]:
+                self._drop(entry_key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "pinned": sorted(self._pinned),
+                "cached": [
+                    {"path": path, "variant": variant, "bytes": size, "pinned": path in self._pinned}
+                    for (path, variant), (_, _, size) in self._entries.items()
+                ],
+            }
+
+    def _evict(self):
+        # Least recently used first, skipping pinned files
+        for entry_key in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if entry_key[0] not in self._pinned:
+                self._drop(entry_key)
+                self.evictions += 1
+
+    def _drop(self, entry_key: tuple):
+        _, _, size = self._entries.pop(entry_key)
+        self._total_bytes -= size
+
+
+dataframe_cache = DataFrameCache()
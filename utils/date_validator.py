@@ -1,5 +1,5 @@
 import re
-# from utils.constants import replacements
+from utils.constants import replacements as default_replacements
 def extract_date_tokens(date_format_str, replacements):
     # Create a regex pattern to match all known replacement keys
     keys = sorted(replacements.keys(), key=len, reverse=True)
@@ -26,4 +26,15 @@ def extract_date_tokens(date_format_str, replacements):
     if invalid_tokens:
         raise ValueError(f"Invalid token(s): {invalid_tokens}. Allowed tokens: {list(replacements.keys())}")
 
-    # return result
\ No newline at end of file
+    # return result
+
+def convert_to_python_strftime(custom_format: str, replacements=default_replacements) -> str:
+    """
+    Convert user-provided format like 'yy/mm/dd' to Python strftime format.
+    """
+
+    python_format = custom_format.lower()
+    for key, val in replacements.items():
+        python_format = python_format.replace(key, val)
+
+    return python_format
@@ -1,6 +1,7 @@
 from models.pydantic_models import InputModel
 from utils.logger import logger
-from utils.sql_parser import parse_sql_case_statement
+from utils.sql_parser import rename_case_columns
+from utils.filter_expression import rename_filter_columns
 
 def generateColumnName(file_name: str, connector: str, col_name: str) -> str:
     return file_name + connector + col_name
@@ -16,14 +17,18 @@ def file_append(request: InputModel) -> InputModel:
         primary_file.join_columns[filter_detail] = generateColumnName(
             primary_file_name, connector, primary_file.join_columns[filter_detail]
         )
+    if primary_file.select_columns:
+        primary_file.select_columns = [
+            generateColumnName(primary_file_name, connector, col) for col in primary_file.select_columns
+        ]
     request.files_and_join_info.primary_file = primary_file
     if primary_file.derived_columns:
         derived_cols = primary_file.derived_columns
         for filter_detail in range(len(derived_cols)):
-            result = parse_sql_case_statement(
-                derived_cols[filter_detail].sql_statement
-            )  # check here for string then value this might remove the quetes => ''
-            statement = f"CASE WHEN [{generateColumnName(primary_file_name,connector,result['col_name'])}] {result['operator']} {result['comparison_value']} THEN '{result['then_value']}' ELSE '{result['else_value']}' END FROM {result['table_name']}"
+            statement = rename_case_columns(
+                derived_cols[filter_detail].sql_statement,
+                lambda col: generateColumnName(primary_file_name, connector, col),
+            )
             derived_cols[filter_detail].sql_statement = statement
             # logger.easyPrint(statement)
         primary_file.derived_columns = derived_cols
@@ -38,17 +43,22 @@ def file_append(request: InputModel) -> InputModel:
                 secondary_files[filter_detail].join_columns[j] = generateColumnName(
                     secondary_filename, connector, secondary_files[filter_detail].join_columns[j]
                 )
+            if secondary_files[filter_detail].select_columns:
+                secondary_files[filter_detail].select_columns = [
+                    generateColumnName(secondary_filename, connector, col)
+                    for col in secondary_files[filter_detail].select_columns
+                ]
             if secondary_files[filter_detail].derived_columns:
                 derived_cols = secondary_files[filter_detail].derived_columns
                 for j in range(len(derived_cols)):
-                    result = parse_sql_case_statement(
-                        derived_cols[j].sql_statement
-                    )  # check here for string then value this might remove the quetes => ''
-                    statement = f"CASE WHEN [{generateColumnName(secondary_filename,connector,result['col_name'])}] {result['operator']} {result['comparison_value']} THEN '{result['then_value']}' ELSE '{result['else_value']}' END FROM {result['table_name']}"
+                    statement = rename_case_columns(
+                        derived_cols[j].sql_statement,
+                        lambda col: generateColumnName(secondary_filename, connector, col),
+                    )
                     derived_cols[j].sql_statement = statement
                     # logger.easyPrint(statement)
                 secondary_files[filter_detail].derived_columns = derived_cols
-                logger.easyPrint(secondary_files[filter_detail].derived_columns)
+                logger.debug("Derived columns of %s: %s", secondary_filename, secondary_files[filter_detail].derived_columns)
 
     request.files_and_join_info.secondary_files = secondary_files
 
@@ -62,6 +72,8 @@ def file_append(request: InputModel) -> InputModel:
                 )
             expression = filter_detail.conditions.expressions
             for j in range(len(expression)):
-                expression[j] = generateColumnName(filename, connector, expression[j])
+                expression[j] = rename_filter_columns(
+                    expression[j], lambda col: generateColumnName(filename, connector, col)
+                )
         request.filter = filter_conditions
     return request
@@ -0,0 +1,23 @@
+import hashlib
+import os
+
+# Bytes hashed from each end of a file; enough to catch rewrites that keep size and mtime
+FINGERPRINT_SAMPLE_BYTES = int(os.getenv('FINGERPRINT_SAMPLE_BYTES', 64 * 1024))
+
+def fileFingerprint(path) -> dict:
+    """
+    Cheap identity of a file's current contents: size, mtime and a digest of
+    its first and last FINGERPRINT_SAMPLE_BYTES, so multi-GB inputs are never hashed in full.
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        digest.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > 2 * FINGERPRINT_SAMPLE_BYTES:
+            file.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": digest.hexdigest(),
+    }
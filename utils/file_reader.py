@@ -1,37 +1,246 @@
-import polars as pl 
+import polars as pl
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from models.pydantic_models import ReadOptions
 from utils.path_util import getFullInputPath
 from utils.logger import logger
+from utils.constants import dtype_names
+from utils.date_validator import convert_to_python_strftime
+from utils.dataframe_cache import dataframe_cache
+from utils.ingest_cache import (
+    INGEST_SIDECAR_ENABLED,
+    INGEST_SIDECAR_FORMAT,
+    SIDECAR_SOURCE_EXTENSIONS,
+    sidecarPath,
+    writeSidecar,
+    readSidecar,
+    scanSidecar,
+)
 
 FILENAME_CONNECTOR = os.getenv('FILENAME_CONNECTOR')
+# Inferred CSV/TSV schemas kept; remembering more drops the least recently used one
+INFERRED_SCHEMA_CACHE_SIZE = int(os.getenv('INFERRED_SCHEMA_CACHE_SIZE', 1024))
 
-def createDataframe(filename: str) -> pl.DataFrame:
-    """
-    1. Construct full path from INPUT_DIR + filename.
-    2. Read into a Polars DataFrame (CSV, JSON, Excel, Parquet, TSV, IPC).
-    3. Prefix all column names with '<filename>__' to ensure uniqueness.
-    """
+# CSV/TSV schemas inferred once per (path, read options) and reused while the file keeps its
+# size and mtime: (path, options) -> ((size, mtime), schema). A rewritten file replaces its entry.
+_inferred_schemas: "OrderedDict[tuple, tuple]" = OrderedDict()
+_inferred_schemas_lock = threading.Lock()
+
+def _prefixColumns(frame, filename: str):
+    # Prefix columns: e.g., "age" → "file.csv__age"
+    prefix = f"{filename.split('.')[0]}{FILENAME_CONNECTOR}"
+    return frame.rename({col: f"{prefix}{col}" for col in frame.columns})
+
+def _rawColumns(filename: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+    # Prefixed names as used by the request -> names as they appear in the file
+    if columns is None:
+        return None
+    prefix = f"{filename.split('.')[0]}{FILENAME_CONNECTOR}"
+    return [col[len(prefix):] if col.startswith(prefix) else col for col in columns]
+
+def _resolveInputPath(filename: str):
     full_file_path = getFullInputPath(filename)
-    ext = os.path.splitext(full_file_path)[-1].lower() 
+    ext = os.path.splitext(full_file_path)[-1].lower()
 
     if not os.path.exists(full_file_path):
         raise FileNotFoundError(f"File not found: {full_file_path}")
+    return full_file_path, ext
+
+def _optionsKey(read_options: Optional[ReadOptions]) -> str:
+    if read_options is None:
+        return ""
+    return hashlib.sha256(read_options.model_dump_json(exclude_none=True).encode()).hexdigest()[:12]
+
+def _polarsDtype(name: str):
+    return getattr(pl, dtype_names[name.lower()])
+
+def _schemaKey(full_file_path, read_options: Optional[ReadOptions]) -> Tuple[tuple, tuple]:
+    # The entry's key and the version of the file it must match
+    stat = os.stat(full_file_path)
+    return (str(full_file_path), _optionsKey(read_options)), (stat.st_size, stat.st_mtime_ns)
+
+def _cachedSchema(full_file_path, read_options: Optional[ReadOptions]) -> Optional[dict]:
+    key, version = _schemaKey(full_file_path, read_options)
+    with _inferred_schemas_lock:
+        entry = _inferred_schemas.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        _inferred_schemas.move_to_end(key)
+        return entry[1]
 
-    if ext == ".csv":
-        df = pl.read_csv(full_file_path)
+def _csvReaderArgs(full_file_path, ext: str, read_options: Optional[ReadOptions]) -> dict:
+    """
+    Keyword arguments for read_csv/scan_csv. A previously inferred schema is passed
+    in full so inference does not run again; otherwise the request's overrides are used.
+    """
+    args = {"separator": "\t"} if ext == ".tsv" else {}
+    if read_options is not None and read_options.null_values:
+        args["null_values"] = read_options.null_values
+
+    cached_schema = _cachedSchema(full_file_path, read_options)
+    if cached_schema is not None:
+        args["schema"] = cached_schema
+        return args
+
+    if read_options is not None:
+        overrides = {col: _polarsDtype(dtype) for col, dtype in (read_options.dtypes or {}).items()}
+        # Date columns are read as text and parsed natively right after the read
+        overrides.update({col: pl.Utf8 for col in (read_options.date_formats or {})})
+        if overrides:
+            args["schema_overrides"] = overrides
+        if read_options.infer_schema_length is not None:
+            args["infer_schema_length"] = read_options.infer_schema_length
+    return args
+
+def _rememberSchema(frame, full_file_path, ext: str, read_options: Optional[ReadOptions]):
+    if ext not in [".csv", ".tsv"] or _cachedSchema(full_file_path, read_options) is not None:
+        return
+    key, version = _schemaKey(full_file_path, read_options)
+    schema = dict(frame.schema)
+    with _inferred_schemas_lock:
+        _inferred_schemas[key] = (version, schema)
+        _inferred_schemas.move_to_end(key)
+        while len(_inferred_schemas) > INFERRED_SCHEMA_CACHE_SIZE:
+            _inferred_schemas.popitem(last=False)
+
+def _applyReadOptions(frame, read_options: Optional[ReadOptions]):
+    """
+    Casts the requested dtypes (a no-op for CSV, which already read them) and parses date columns.
+    Formats containing a time token become Datetime, the rest Date.
+    """
+    if read_options is None:
+        return frame
+
+    # Columns left out by a projection are skipped
+    present = set(frame.columns)
+    date_formats = {col: fmt for col, fmt in (read_options.date_formats or {}).items() if col in present}
+    exprs = [
+        pl.col(col).cast(_polarsDtype(dtype))
+        for col, dtype in (read_options.dtypes or {}).items()
+        if col not in date_formats and col in present
+    ]
+    for col, date_format in date_formats.items():
+        python_format = convert_to_python_strftime(date_format)
+        has_time = any(token in python_format for token in ["%H", "%M", "%S", "%p"])
+        exprs.append(
+            pl.col(col).str.strptime(pl.Datetime if has_time else pl.Date, python_format)
+        )
+    return frame.with_columns(exprs) if exprs else frame
+
+def _readSource(full_file_path, ext: str, read_options: Optional[ReadOptions] = None,
+                raw_columns: Optional[List[str]] = None) -> pl.DataFrame:
+    if ext in [".csv", ".tsv"]:
+        df = pl.read_csv(full_file_path, columns=raw_columns, **_csvReaderArgs(full_file_path, ext, read_options))
+        if raw_columns is None:
+            _rememberSchema(df, full_file_path, ext, read_options)
     elif ext == ".json":
         df = pl.read_json(full_file_path)
     elif ext in [".xls", ".xlsx"]:
         df = pl.read_excel(full_file_path)
     elif ext == ".parquet":
-        df = pl.read_parquet(full_file_path)
-    elif ext == ".tsv":
-        df = pl.read_csv(full_file_path, separator="\t")
+        df = pl.read_parquet(full_file_path, columns=raw_columns)
     elif ext in [".ipc", ".feather"]:
-        df = pl.read_ipc(full_file_path)
+        df = pl.read_ipc(full_file_path, columns=raw_columns)
     else:
         raise ValueError(f"Unsupported file type: {ext}")
+    if raw_columns is not None and ext in [".json", ".xls", ".xlsx"]:
+        df = df.select(raw_columns)
+    return df
 
-    # Prefix columns: e.g., "age" → "file.csv__age"
-    prefixed = df.rename({col: f"{filename.split('.')[0]}{FILENAME_CONNECTOR}{col}" for col in df.columns})
-    return prefixed
\ No newline at end of file
+def _scanSource(full_file_path, ext: str, read_options: Optional[ReadOptions] = None) -> pl.LazyFrame:
+    if ext in [".csv", ".tsv"]:
+        lf = pl.scan_csv(full_file_path, **_csvReaderArgs(full_file_path, ext, read_options))
+        _rememberSchema(lf, full_file_path, ext, read_options)
+    elif ext == ".json":
+        lf = pl.read_json(full_file_path).lazy()
+    elif ext in [".xls", ".xlsx"]:
+        lf = pl.read_excel(full_file_path).lazy()
+    elif ext == ".parquet":
+        lf = pl.scan_parquet(full_file_path)
+    elif ext in [".ipc", ".feather"]:
+        lf = pl.scan_ipc(full_file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return lf
+
+def _loadViaSidecar(full_file_path, ext: str, lazy: bool, read_options: Optional[ReadOptions],
+                    raw_columns: Optional[List[str]] = None):
+    """
+    Text formats are parsed once into a typed columnar sidecar (see utils.ingest_cache);
+    later reads open the sidecar instead of re-parsing the source.
+    The sidecar always holds every column; eager projections only map the ones asked for.
+    """
+    sidecar = sidecarPath(full_file_path, _optionsKey(read_options))
+    if sidecar.exists():
+        return scanSidecar(sidecar) if lazy else readSidecar(sidecar, raw_columns)
+
+    if lazy:
+        # CSV/TSV are converted by streaming the scan into the sidecar
+        if writeSidecar(_scanSource(full_file_path, ext, read_options), sidecar):
+            return scanSidecar(sidecar)
+        return _scanSource(full_file_path, ext, read_options)
+
+    df = _readSource(full_file_path, ext, read_options)
+    writeSidecar(df, sidecar)
+    return df.select(raw_columns) if raw_columns is not None else df
+
+def createDataframe(filename: str, read_options: Optional[ReadOptions] = None,
+                    columns: Optional[List[str]] = None) -> pl.DataFrame:
+    """
+    1. Construct full path from INPUT_DIR + filename.
+    2. Read into a Polars DataFrame (CSV, JSON, Excel, Parquet, TSV, IPC),
+       applying the optional dtype overrides, null values and date formats.
+       With `columns` (prefixed names) only those columns are parsed.
+    3. Prefix all column names with '<filename>__' to ensure uniqueness.
+    The prefixed result is kept in the process-wide dataframe_cache, so an
+    unchanged file is only parsed once per set of read options and columns.
+    """
+    full_file_path, ext = _resolveInputPath(filename)
+    variants = [_optionsKey(read_options)]
+    if columns is not None:
+        # A full copy already in memory serves any projection of it
+        variants.append(variants[0] + "|" + ",".join(sorted(columns)))
+    variant, cached = dataframe_cache.lookup(full_file_path, variants)
+    if cached is not None:
+        return cached if variant == variants[-1] else cached.select(columns)
+
+    raw_columns = _rawColumns(filename, columns)
+    if INGEST_SIDECAR_ENABLED and ext in SIDECAR_SOURCE_EXTENSIONS:
+        df = _loadViaSidecar(full_file_path, ext, False, read_options, raw_columns)
+    else:
+        df = _readSource(full_file_path, ext, read_options, raw_columns)
+
+    prefixed = _prefixColumns(_applyReadOptions(df, read_options), filename)
+    dataframe_cache.put(full_file_path, prefixed, variants[-1])
+    return prefixed
+
+def scanDataframe(filename: str, read_options: Optional[ReadOptions] = None,
+                  columns: Optional[List[str]] = None, streamable: bool = False,
+                  direct: bool = False) -> pl.LazyFrame:
+    """
+    Lazy counterpart of createDataframe.
+    CSV, TSV, Parquet and IPC are opened with the scan_* readers so filters and
+    column selections added later are pushed down into the scan itself.
+    JSON and Excel have no lazy reader in Polars and are read eagerly, then wrapped.
+    A file already held in the dataframe_cache is served from memory instead.
+    With `streamable`, IPC sidecars are bypassed because Polars cannot stream an IPC scan yet.
+    With `direct`, the source itself is scanned: no cache lookup and no sidecar is built,
+    for callers that only sample the first rows.
+    """
+    full_file_path, ext = _resolveInputPath(filename)
+    cached = None if direct else dataframe_cache.get(full_file_path, _optionsKey(read_options))
+    if cached is not None:
+        lf = cached.lazy()
+    else:
+        use_sidecar = INGEST_SIDECAR_ENABLED and not direct and not (streamable and INGEST_SIDECAR_FORMAT == "ipc")
+        if use_sidecar and ext in SIDECAR_SOURCE_EXTENSIONS:
+            lf = _loadViaSidecar(full_file_path, ext, True, read_options)
+        else:
+            lf = _scanSource(full_file_path, ext, read_options)
+        lf = _prefixColumns(_applyReadOptions(lf, read_options), filename)
+
+    # Projection pushdown turns this select into a column subset at scan time
+    return lf.select(columns) if columns is not None else lf
@@ -0,0 +1,566 @@
+"""
+Filter expression language:
+
+    expr      := or
+    or        := and (OR and)*
+    and       := not (AND not)*
+    not       := NOT not | '(' expr ')' | predicate
+    predicate := operand ( cmp_op operand
+                         | [NOT] IN '(' operand (',' operand)* ')'
+                         | [NOT] BETWEEN operand AND operand
+                         | IS [NOT] NULL
+                         | [NOT] LIKE 'pattern' )
+    cmp_op    := == | = | != | <> | > | >= | < | <=
+
+Bare words on the left of a predicate are a column; on the right they are a string, as in
+'status == active' or 'first name == New York'. Consecutive words run to the next keyword,
+operator or parenthesis and are joined with single spaces. Wrap a name in [ ] to use it as a
+column anywhere, or when it contains a keyword or repeated spaces: 'price > [cost]'.
+Literals are 'quoted strings', numbers, unquoted dates (2024-01-31, 2024-01-31 10:00:00),
+TRUE/FALSE and NULL, and are typed against the schema of the column they are compared with.
+:name is a parameter bound when the filter is compiled; after IN it may stand for a whole list.
+
+Parsed trees are tuples:
+    ("col", name)                       ("lit", text, kind)  kind: str|num|date|bool|null
+    ("param", name)
+    ("cmp", op, left, right)            ("in", operand, [values], negated)
+    ("between", operand, low, high, negated)
+    ("isnull", operand, negated)        ("like", operand, pattern, negated)
+    ("and", [nodes])  ("or", [nodes])  ("not", node)
+"""
+
+import os
+import re
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import polars as pl
+from dotenv import load_dotenv
+
+load_dotenv()
+# Distinct filter texts (and text + schema pairs) kept parsed/compiled per process
+FILTER_CACHE_SIZE = int(os.getenv('FILTER_CACHE_SIZE', 1024))
+
+
+KEYWORDS = {"AND", "OR", "NOT", "IN", "BETWEEN", "IS", "NULL", "LIKE", "TRUE", "FALSE"}
+COMPARISON_OPERATORS = {"==": "==", "=": "==", "!=": "!=", "<>": "!=", ">": ">", ">=": ">=", "<": "<", "<=": "<="}
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<space>\s+)
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<column>\[[^\]]+\])
+  | (?P<date>\d{4}-\d{2}-\d{2}(?:[T\ ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?![\w/:.-]))
+  | (?P<number>-?\d+(?:\.\d+)?(?![\w/:.-]))
+  | (?P<op>==|!=|<>|>=|<=|=|>|<)
+  | (?P<punct>[(),])
+  | (?P<param>:[A-Za-z_]\w*)
+  | (?P<word>[^\s(),'"=<>!\[\]]+)
+    """,
+    re.VERBOSE,
+)
+
+
+def tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise ValueError(f"Unexpected character {text[position]!r} at position {position} in '{text}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "space":
+            continue
+        if kind == "word" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str, tokens: Optional[List[Tuple[str, str]]] = None):
+        self.text = text
+        self.tokens = tokenize(text) if tokens is None else tokens
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Filter expression is empty")
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.position][1]}' in '{self.text}'")
+        return node
+
+    def _peek(self, offset: int = 0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token_kind, token_value = self._peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, value: Optional[str] = None):
+        if not self._accept(kind, value):
+            found = self._peek()[1]
+            raise ValueError(f"Expected {value or kind} but found {found or 'end of expression'} in '{self.text}'")
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._accept("keyword", "OR"):
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self):
+        nodes = [self._not()]
+        while self._accept("keyword", "AND"):
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _not(self):
+        if self._accept("keyword", "NOT"):
+            return ("not", self._not())
+        if self._accept("punct", "("):
+            node = self._or()
+            self._expect("punct", ")")
+            return node
+        return self._predicate()
+
+    def _predicate(self):
+        subject = self._operand(column_side=True)
+        kind, value = self._peek()
+
+        if kind == "op":
+            self.position += 1
+            return ("cmp", COMPARISON_OPERATORS[value], subject, self._operand(column_side=False))
+
+        if self._accept("keyword", "IS"):
+            negated = self._accept("keyword", "NOT")
+            self._expect("keyword", "NULL")
+            return ("isnull", subject, negated)
+
+        negated = self._accept("keyword", "NOT")
+        if self._accept("keyword", "IN"):
+            if self._peek()[0] == "param":
+                return ("in", subject, [self._operand(column_side=False)], negated)
+            self._expect("punct", "(")
+            values = [self._operand(column_side=False)]
+            while self._accept("punct", ","):
+                values.append(self._operand(column_side=False))
+            self._expect("punct", ")")
+            return ("in", subject, values, negated)
+        if self._accept("keyword", "BETWEEN"):
+            low = self._operand(column_side=False)
+            self._expect("keyword", "AND")
+            high = self._operand(column_side=False)
+            return ("between", subject, low, high, negated)
+        if self._accept("keyword", "LIKE"):
+            pattern = self._operand(column_side=False)
+            if pattern[0] != "lit" or pattern[2] != "str":
+                raise ValueError(f"LIKE needs a quoted pattern in '{self.text}'")
+            return ("like", subject, pattern[1], negated)
+
+        raise ValueError(f"Expected a comparison after '{self.text}' operand, found {value or 'end of expression'}")
+
+    def _operand(self, column_side: bool):
+        kind, value = self._peek()
+        self.position += 1
+        if kind == "column":
+            return ("col", value[1:-1])
+        if kind == "param":
+            return ("param", value[1:])
+        if kind == "string":
+            quote = value[0]
+            return ("lit", value[1:-1].replace(quote * 2, quote), "str")
+        if kind == "number":
+            return ("lit", value, "num")
+        if kind == "date":
+            return ("lit", value, "date")
+        if kind == "keyword" and value in ("TRUE", "FALSE"):
+            return ("lit", value.lower(), "bool")
+        if kind == "keyword" and value == "NULL":
+            return ("lit", None, "null")
+        if kind == "word":
+            # Unquoted names and text run to the next keyword or operator: 'first name == New York'
+            words = [value]
+            while self._peek()[0] == "word":
+                words.append(self._peek()[1])
+                self.position += 1
+            return ("col", " ".join(words)) if column_side else ("lit", " ".join(words), "str")
+        self.position -= 1
+        raise ValueError(f"Expected a column or value but found {value or 'end of expression'} in '{self.text}'")
+
+
+# Trees of pinned filters (see pin_filter) and the number of pins on each, by text
+_pinned_trees: Dict[str, Tuple[tuple, int]] = {}
+_pinned_lock = threading.Lock()
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _parse_cached(text: str) -> tuple:
+    return _Parser(text.strip()).parse()
+
+
+def parse_filter(text: str) -> tuple:
+    """
+    Parses a filter expression into its tree (see the grammar above).
+    """
+    pinned = _pinned_trees.get(text)
+    return pinned[0] if pinned is not None else _parse_cached(text)
+
+
+def pin_filter(text: str) -> tuple:
+    """
+    Parses a filter and keeps its tree until every pin is released with unpin_filter,
+    whatever the parse cache evicts meanwhile. Returns the tree.
+    """
+    tree = parse_filter(text)
+    with _pinned_lock:
+        _, pins = _pinned_trees.get(text, (tree, 0))
+        _pinned_trees[text] = (tree, pins + 1)
+    return tree
+
+
+def unpin_filter(text: str):
+    with _pinned_lock:
+        tree, pins = _pinned_trees.pop(text, (None, 0))
+        if pins > 1:
+            _pinned_trees[text] = (tree, pins - 1)
+
+
+def parse_tokens(tokens: List[Tuple[str, str]], text: str) -> tuple:
+    """
+    Parses an already tokenized condition, e.g. the WHEN part of a CASE statement.
+    `text` is only used in error messages.
+    """
+    return _Parser(text, tokens).parse()
+
+
+def filter_params(text: str) -> set:
+    """
+    Names of the :parameters a filter expression needs at compile time.
+    """
+    return node_params(parse_filter(text))
+
+
+def node_params(node: tuple) -> set:
+    params = set()
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node[0] == "param":
+            params.add(node[1])
+        pending.extend(_children(node))
+    return params
+
+
+def _param_literal(name: str, value) -> tuple:
+    if value is None:
+        return ("lit", None, "null")
+    if isinstance(value, bool):
+        return ("lit", str(value).lower(), "bool")
+    if isinstance(value, (int, float)):
+        return ("lit", str(value), "num")
+    if isinstance(value, str):
+        return ("lit", value, "str")
+    raise ValueError(f"Parameter :{name} must be a string, number, boolean or null (or a list of them after IN)")
+
+
+def bind_params(node: tuple, params: Dict[str, object]) -> tuple:
+    """
+    Replaces every :parameter with its value; a list value bound after IN becomes the whole list.
+    """
+    tag = node[0]
+    if tag == "param":
+        if node[1] not in params:
+            raise ValueError(f"No value given for parameter :{node[1]}")
+        value = params[node[1]]
+        if isinstance(value, (list, tuple)):
+            raise ValueError(f"Parameter :{node[1]} is a list and can only be used after IN")
+        return _param_literal(node[1], value)
+    if tag == "lit" or tag == "col":
+        return node
+    if tag == "in":
+        values = []
+        for value in node[2]:
+            if value[0] == "param" and isinstance(params.get(value[1]), (list, tuple)):
+                values += [_param_literal(value[1], item) for item in params[value[1]]]
+            else:
+                values.append(bind_params(value, params))
+        if not values:
+            raise ValueError("IN needs at least one value")
+        return ("in", bind_params(node[1], params), values, node[3])
+    if tag in ("and", "or"):
+        return (tag, [bind_params(child, params) for child in node[1]])
+    if tag == "not":
+        return ("not", bind_params(node[1], params))
+    if tag == "cmp":
+        return ("cmp", node[1], bind_params(node[2], params), bind_params(node[3], params))
+    if tag == "between":
+        return ("between",) + tuple(bind_params(child, params) for child in node[1:4]) + (node[4],)
+    return (tag, bind_params(node[1], params)) + node[2:]
+
+
+def _children(node: tuple) -> list:
+    tag = node[0]
+    if tag in ("and", "or"):
+        return node[1]
+    if tag == "not":
+        return [node[1]]
+    if tag == "cmp":
+        return [node[2], node[3]]
+    if tag == "in":
+        return [node[1]] + node[2]
+    if tag == "between":
+        return [node[1], node[2], node[3]]
+    if tag in ("isnull", "like"):
+        return [node[1]]
+    return []
+
+
+def filter_columns(text: str) -> List[str]:
+    """
+    Columns referenced anywhere in a filter expression, in order of first appearance.
+    """
+    return node_columns(parse_filter(text))
+
+
+def node_columns(node: tuple) -> List[str]:
+    columns = {}
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node[0] == "col":
+            columns[node[1]] = None
+        # Reversed, so children are visited left to right
+        pending.extend(reversed(_children(node)))
+    return list(columns)
+
+
+def render_node(node: tuple) -> str:
+    tag = node[0]
+    if tag == "col":
+        return f"[{node[1]}]"
+    if tag == "param":
+        return f":{node[1]}"
+    if tag == "lit":
+        if node[2] == "str":
+            return "'" + node[1].replace("'", "''") + "'"
+        if node[2] == "null":
+            return "NULL"
+        return node[1].upper() if node[2] == "bool" else node[1]
+    if tag in ("and", "or"):
+        return "(" + f" {tag.upper()} ".join(render_node(child) for child in node[1]) + ")"
+    if tag == "not":
+        return f"NOT {render_node(node[1])}"
+    if tag == "cmp":
+        return f"{render_node(node[2])} {node[1]} {render_node(node[3])}"
+    negation = "NOT " if node[-1] else ""
+    if tag == "in":
+        return f"{render_node(node[1])} {negation}IN ({', '.join(render_node(value) for value in node[2])})"
+    if tag == "between":
+        return f"{render_node(node[1])} {negation}BETWEEN {render_node(node[2])} AND {render_node(node[3])}"
+    if tag == "isnull":
+        return f"{render_node(node[1])} IS {negation}NULL"
+    return f"{render_node(node[1])} {negation}LIKE {render_node(('lit', node[2], 'str'))}"
+
+
+def rename_node_columns(node: tuple, rename) -> tuple:
+    if node[0] == "col":
+        return ("col", rename(node[1]))
+    if node[0] in ("lit", "param"):
+        return node
+    if node[0] in ("and", "or"):
+        return (node[0], [rename_node_columns(child, rename) for child in node[1]])
+    if node[0] == "not":
+        return ("not", rename_node_columns(node[1], rename))
+    if node[0] == "cmp":
+        return ("cmp", node[1], rename_node_columns(node[2], rename), rename_node_columns(node[3], rename))
+    if node[0] == "in":
+        return ("in", rename_node_columns(node[1], rename), [rename_node_columns(v, rename) for v in node[2]], node[3])
+    if node[0] == "between":
+        return ("between",) + tuple(rename_node_columns(child, rename) for child in node[1:4]) + (node[4],)
+    return (node[0], rename_node_columns(node[1], rename)) + node[2:]
+
+
+def rename_filter_columns(text: str, rename) -> str:
+    """
+    Rewrites a filter expression with every column name passed through `rename`.
+    Columns come back bracketed, so the result parses to the same tree with new names.
+    """
+    return render_node(rename_node_columns(parse_filter(text), rename))
+
+
+def literal_value(node: tuple, dtype):
+    """
+    Python value of a literal, typed after the column it is compared with (when known).
+    """
+    text, kind = node[1], node[2]
+    if kind == "null":
+        return None
+    if dtype is not None:
+        try:
+            return _typed_value(text, dtype)
+        except ValueError:
+            raise ValueError(f"Cannot compare a {dtype} column with {text!r}")
+
+    if kind == "num":
+        return float(text) if "." in text else int(text)
+    if kind == "bool":
+        return text == "true"
+    if kind == "date":
+        return datetime.fromisoformat(text)
+    return text
+
+
+def _typed_value(text: str, dtype):
+    if dtype == pl.Utf8 or dtype == pl.Categorical:
+        return text
+    if dtype == pl.Boolean:
+        if text.lower() not in ("true", "false"):
+            raise ValueError(text)
+        return text.lower() == "true"
+    if dtype.is_integer():
+        return int(float(text)) if float(text).is_integer() else float(text)
+    if dtype.is_numeric():
+        return float(text)
+    if dtype == pl.Date:
+        return date.fromisoformat(text[:10])
+    if dtype == pl.Datetime:
+        return datetime.fromisoformat(text)
+    return text
+
+
+def compile_node(node: tuple, schema: Dict[str, pl.DataType]) -> pl.Expr:
+    tag = node[0]
+    if tag == "and":
+        combined = compile_node(node[1][0], schema)
+        for child in node[1][1:]:
+            combined &= compile_node(child, schema)
+        return combined
+    if tag == "or":
+        combined = compile_node(node[1][0], schema)
+        for child in node[1][1:]:
+            combined |= compile_node(child, schema)
+        return combined
+    if tag == "not":
+        return ~compile_node(node[1], schema)
+
+    def operand(child: tuple, other: Optional[tuple] = None) -> pl.Expr:
+        if child[0] == "param":
+            raise ValueError(f"No value given for parameter :{child[1]}")
+        if child[0] == "col":
+            if schema and child[1] not in schema:
+                raise ValueError(f"Column '{child[1]}' not found")
+            return pl.col(child[1])
+        dtype = schema.get(other[1]) if other is not None and other[0] == "col" and schema else None
+        return pl.lit(literal_value(child, dtype))
+
+    subject = node[1] if tag != "cmp" else node[2]
+    if tag == "cmp":
+        left = operand(node[2], node[3])
+        right = operand(node[3], node[2])
+        op = node[1]
+        if op == "==":
+            return left == right
+        if op == "!=":
+            return left != right
+        if op == ">":
+            return left > right
+        if op == ">=":
+            return left >= right
+        if op == "<":
+            return left < right
+        return left <= right
+
+    column = operand(subject)
+    if tag == "isnull":
+        return column.is_not_null() if node[2] else column.is_null()
+
+    if tag == "in":
+        dtype = schema.get(subject[1]) if subject[0] == "col" and schema else None
+        if all(value[0] == "lit" for value in node[2]):
+            expr = column.is_in([literal_value(value, dtype) for value in node[2]])
+        else:
+            expr = pl.any_horizontal([column == operand(value, subject) for value in node[2]])
+    elif tag == "between":
+        expr = column.is_between(operand(node[2], subject), operand(node[3], subject), closed="both")
+    else:
+        expr = _like(column, node[2])
+    return ~expr if node[-1] else expr
+
+
+def _like(column: pl.Expr, pattern: str) -> pl.Expr:
+    """
+    SQL LIKE: % matches any run of characters, _ a single one. Prefix, suffix and
+    substring patterns use the plain string kernels instead of a regex.
+    """
+    body = pattern.strip("%")
+    if "_" not in body and "%" not in body:
+        starts, ends = pattern.startswith("%"), pattern.endswith("%")
+        if starts and ends:
+            return column.str.contains(body, literal=True)
+        if ends:
+            return column.str.starts_with(body)
+        if starts:
+            return column.str.ends_with(body)
+        return column == body
+    regex = "".join(
+        ".*" if char == "%" else "." if char == "_" else re.escape(char) for char in pattern
+    )
+    return column.str.contains(f"^{regex}$")
+
+
+def _compile_template(node: tuple, schema: Dict[str, pl.DataType]) -> Callable[[Dict[str, object]], pl.Expr]:
+    """
+    Compiles everything in a tree that does not depend on a :parameter once, and returns
+    a function building the whole expression from the parameter values.
+    """
+    if not node_params(node):
+        expr = compile_node(node, schema)
+        return lambda params: expr
+    tag = node[0]
+    if tag in ("and", "or"):
+        children = [_compile_template(child, schema) for child in node[1]]
+
+        def combine(params: Dict[str, object]) -> pl.Expr:
+            combined = children[0](params)
+            for child in children[1:]:
+                combined = combined & child(params) if tag == "and" else combined | child(params)
+            return combined
+        return combine
+    if tag == "not":
+        child = _compile_template(node[1], schema)
+        return lambda params: ~child(params)
+    return lambda params: compile_node(bind_params(node, params), schema)
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_cached(text: str, schema_items: tuple) -> Callable[[Dict[str, object]], pl.Expr]:
+    return _compile_template(parse_filter(text), dict(schema_items))
+
+
+def compile_filter(text: str, schema: Optional[Dict[str, pl.DataType]] = None,
+                   params: Optional[Dict[str, object]] = None) -> pl.Expr:
+    """
+    Compiles a filter expression into one Polars expression.
+    With a schema, literals take the type of the column they are compared with and unknown
+    columns are rejected; without one they keep the type they were written in.
+    `params` supplies the values of :parameters.
+    Compiled expressions are cached by text and the dtypes of the columns they use; the
+    parts of a filter that use parameters are bound to their values on every call.
+    """
+    if schema is None:
+        return _compile_cached(text, ())(params or {})
+    columns = filter_columns(text)
+    missing = [col for col in columns if col not in schema]
+    if missing:
+        raise ValueError(f"Columns not found: {sorted(missing)}")
+    schema_items = tuple(sorted((col, schema[col]) for col in columns))
+    return _compile_cached(text, schema_items)(params or {})
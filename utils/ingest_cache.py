@@ -0,0 +1,91 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional, Union
+
+import polars as pl
+from dotenv import load_dotenv
+
+from utils.file_fingerprint import fileFingerprint
+from utils.logger import logger
+from utils.path_util import INPUT_DIR
+
+load_dotenv()
+INGEST_SIDECAR_ENABLED = os.getenv('INGEST_SIDECAR_ENABLED', 'true').lower() == 'true'
+INGEST_CACHE_DIR = Path(os.getenv('INGEST_CACHE_DIR', INPUT_DIR / '.ingest_cache'))
+# "parquet" sidecars keep lazy plans streamable on Polars 0.20; "ipc" sidecars are memory-mapped
+# but only serve eager reads, since lazy plans end in a streaming sink that cannot scan IPC
+INGEST_SIDECAR_FORMAT = os.getenv('INGEST_SIDECAR_FORMAT', 'parquet').lower()
+
+# Text formats that are worth converting once instead of re-parsing on every request
+SIDECAR_SOURCE_EXTENSIONS = ['.csv', '.tsv', '.json', '.xls', '.xlsx']
+
+
+def sidecarPath(full_file_path, variant: str = "") -> Path:
+    """
+    Location of the typed columnar copy of a source file.
+    The name embeds the source fingerprint, so a changed source simply has no sidecar yet,
+    and the read-options variant, since dtype overrides change what gets parsed.
+    """
+    fingerprint = fileFingerprint(full_file_path)
+    version = hashlib.sha256(
+        f"{fingerprint['size']}:{fingerprint['mtime_ns']}:{fingerprint['digest']}".encode()
+    ).hexdigest()[:16]
+    if variant:
+        version = f"{version}-{variant}"
+    extension = ".parquet" if INGEST_SIDECAR_FORMAT == "parquet" else ".arrow"
+    return INGEST_CACHE_DIR / f"{Path(full_file_path).name}.{version}{extension}"
+
+
+def _removeStaleSidecars(sidecar: Path):
+    # Sidecars of an older version of the same source; other variants of this version stay
+    source_name = sidecar.name.split(".")[:-2]
+    source_version = sidecar.name.split(".")[-2].split("-")[0]
+    for candidate in INGEST_CACHE_DIR.glob(f"{'.'.join(source_name)}.*"):
+        parts = candidate.name.split(".")
+        if parts[:-2] == source_name and parts[-2].split("-")[0] != source_version:
+            candidate.unlink(missing_ok=True)
+
+
+def writeSidecar(source: Union[pl.DataFrame, pl.LazyFrame], sidecar: Path) -> bool:
+    """
+    Writes the sidecar atomically (temp file + rename) so concurrent readers never see
+    a partial file. A LazyFrame source is streamed, so conversion needs bounded memory.
+    Returns False when the sidecar could not be written; callers then read the source directly.
+    """
+    INGEST_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = sidecar.with_name(f"{sidecar.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        if INGEST_SIDECAR_FORMAT == "parquet":
+            if isinstance(source, pl.LazyFrame):
+                source.sink_parquet(temp_path, compression="lz4")
+            else:
+                source.write_parquet(temp_path, compression="lz4")
+        else:
+            # Uncompressed, otherwise the file cannot be memory-mapped
+            if isinstance(source, pl.LazyFrame):
+                source.sink_ipc(temp_path, compression=None)
+            else:
+                source.write_ipc(temp_path, compression=None)
+        os.replace(temp_path, sidecar)
+    except Exception as e:
+        temp_path.unlink(missing_ok=True)
+        logger.warning(f"Could not write ingest sidecar {sidecar}: {e}")
+        return False
+
+    _removeStaleSidecars(sidecar)
+    logger.info(f"Wrote ingest sidecar {sidecar}")
+    return True
+
+
+def readSidecar(sidecar: Path, columns: Optional[List[str]] = None) -> pl.DataFrame:
+    if sidecar.suffix == ".parquet":
+        return pl.read_parquet(sidecar, columns=columns)
+    return pl.read_ipc(sidecar, columns=columns, memory_map=True)
+
+
+def scanSidecar(sidecar: Path) -> pl.LazyFrame:
+    if sidecar.suffix == ".parquet":
+        return pl.scan_parquet(sidecar)
+    return pl.scan_ipc(sidecar, memory_map=True)
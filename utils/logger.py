@@ -1,10 +1,31 @@
 # import logging
 
-# logging.basicConfig(level=logging.INFO) 
+# logging.basicConfig(level=logging.INFO)
 # logger = logging.getLogger("file_processor")
 
-import sys
+import atexit
+import contextvars
 import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+# Messages below this level are dropped before any formatting happens
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# "text" (coloured lines) or "json" (one object per line)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# Writes happen on a background thread; "false" writes on the calling thread instead
+LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'
+# Messages waiting for the writer thread; further messages are dropped (and counted) instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+# Id of the API request (or job) being handled, attached to every message logged on its behalf
+request_id_var = contextvars.ContextVar("request_id", default=None)
 
 class TerminalLogger:
     LEVELS = {
@@ -14,23 +35,110 @@ class TerminalLogger:
         "ERROR": "\033[91m",    # Red
         "ENDC": "\033[0m"       # Reset
     }
+    LEVEL_NUMBERS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
 
-    def __init__(self, name="Logger"):
+    def __init__(self, name="Logger", level=LOG_LEVEL, log_format=LOG_FORMAT, asynchronous=LOG_ASYNC):
         self.name = name
+        self.level = self.LEVEL_NUMBERS.get(level.upper(), 20)
+        self.log_format = log_format
+        self.asynchronous = asynchronous
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+    def isEnabledFor(self, level) -> bool:
+        return self.LEVEL_NUMBERS[level] >= self.level
+
+    def _log(self, level, message, args, fields):
+        # Only the raw pieces are captured here; formatting happens on the writer thread
+        record = (level, time.time(), message, args, fields, request_id_var.get())
+        if not self.asynchronous:
+            self._write(record)
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        # (re)started lazily, so a forked worker process gets its own thread
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._worker = threading.Thread(target=self._drain, name=f"{self.name}-log-writer", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def _drain(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self._write(record)
+                if self.dropped:
+                    dropped, self.dropped = self.dropped, 0
+                    self._write(("WARNING", time.time(), "%d log messages dropped, the log queue was full", (dropped,), {}, None))
+            finally:
+                self._queue.task_done()
+
+    def format(self, record) -> str:
+        level, created, message, args, fields, request_id = record
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = f"{message} {args}"
+        timestamp = datetime.datetime.fromtimestamp(created)
+        if self.log_format == "json":
+            payload = {
+                "timestamp": timestamp.isoformat(timespec="milliseconds"),
+                "level": level,
+                "logger": self.name,
+                "message": str(message),
+            }
+            if request_id is not None:
+                payload["request_id"] = request_id
+            payload.update(fields)
+            return json.dumps(payload, default=str)
 
-    def _log(self, level, message):
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         color = self.LEVELS.get(level, "")
         endc = self.LEVELS["ENDC"]
-        formatted = f"{color}[{timestamp}] [{self.name}] [{level}] {message}{endc}"
-        print(formatted, file=sys.stdout if level != "ERROR" else sys.stderr)
+        context = f" [{request_id}]" if request_id is not None else ""
+        # Structured fields only go to JSON output; text messages already read as sentences
+        return f"{color}[{timestamp:%Y-%m-%d %H:%M:%S}] [{self.name}] [{level}]{context} {message}{endc}"
+
+    def _write(self, record):
+        stream = sys.stdout if record[0] != "ERROR" else sys.stderr
+        try:
+            stream.write(self.format(record) + "\n")
+            stream.flush()
+        except Exception:
+            # A broken log line must never take the writer thread down
+            pass
+
+    def flush(self):
+        """
+        Blocks until every queued message has been written.
+        """
+        if self.asynchronous and self._worker is not None and self._worker.is_alive():
+            self._queue.join()
 
-    def debug(self, message): self._log("DEBUG", message)
-    def info(self, message): self._log("INFO", message)
-    def warning(self, message): self._log("WARNING", message)
-    def error(self, message): self._log("ERROR", message)
+    # Messages may use %-style args, formatted only if the level is enabled;
+    # keyword arguments become structured fields (e.g. stage="read", seconds=1.2)
+    def debug(self, message, *args, **fields):
+        if self.level <= 10: self._log("DEBUG", message, args, fields)
+    def info(self, message, *args, **fields):
+        if self.level <= 20: self._log("INFO", message, args, fields)
+    def warning(self, message, *args, **fields):
+        if self.level <= 30: self._log("WARNING", message, args, fields)
+    def error(self, message, *args, **fields):
+        if self.level <= 40: self._log("ERROR", message, args, fields)
 
-    def easyPrint(self, message): self.info(f"\n\n\n\n{message}\n\n\n\n")
+    def easyPrint(self, message, *args): self.debug(message, *args)
 
 
-logger = TerminalLogger("MyApp")
\ No newline at end of file
+logger = TerminalLogger("MyApp")
+atexit.register(logger.flush)
@@ -26,6 +26,20 @@ OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 def getFullInputPath(FileName):
     return INPUT_DIR / FileName
 
-def getFullOutputPath():
-    return OUTPUT_DIR / OUTPUT_FILENAME
+def pathSize(path) -> int:
+    # Size of a file, or of every file below a directory
+    path = Path(path)
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+def getFullOutputPath(extension=None, run_id=None):
+    # Each execution gets its own OUTPUT_DIR/<run_id>/ so concurrent requests never collide
+    output_path = OUTPUT_DIR / OUTPUT_FILENAME
+    if run_id:
+        output_path = OUTPUT_DIR / run_id / OUTPUT_FILENAME
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    if extension:
+        output_path = output_path.with_suffix(extension)
+    return output_path
 
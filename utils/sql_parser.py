@@ -1,5 +1,15 @@
 import re
+from functools import lru_cache
+from typing import List
 from utils.logger import logger
+from utils.filter_expression import (
+    FILTER_CACHE_SIZE,
+    node_columns,
+    parse_tokens,
+    render_node,
+    rename_node_columns,
+    tokenize,
+)
 
 def _clean_captured_value(value_str: str):
     """
@@ -83,3 +93,151 @@ def get_things_from_sql_drive_statement(stmt:str):
         print(f"   - Table Name       : {result['table_name']}")
     else:
         print(f"❌ **Parsing Failed.**")
+
+
+def _is_word(token, word: str) -> bool:
+    return token[0] == "word" and token[1].upper() == word
+
+
+def _case_value(token, sql_statement: str) -> tuple:
+    kind, value = token
+    if kind == "string":
+        return ("lit", value[1:-1].replace(value[0] * 2, value[0]), "str")
+    if kind in ("number", "date"):
+        return ("lit", value, "num" if kind == "number" else "date")
+    if kind == "keyword" and value in ("TRUE", "FALSE"):
+        return ("lit", value.lower(), "bool")
+    if kind == "keyword" and value == "NULL":
+        return ("lit", None, "null")
+    raise ValueError(f"Expected a THEN/ELSE value but found {value!r} in '{sql_statement}'")
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def parse_case_statement(sql_statement: str) -> dict:
+    """
+    Parses a CASE statement with any number of WHEN branches:
+
+        CASE WHEN <condition> THEN <value> [WHEN <condition> THEN <value> ...]
+             [ELSE <value>] END [FROM <table>]
+
+    Conditions use the filter expression grammar (utils.filter_expression), so they
+    may combine predicates with AND/OR/NOT, IN, BETWEEN, LIKE, ...
+    Values are quoted strings, numbers, TRUE/FALSE or NULL.
+
+    Returns:
+        dict: branches (list of (condition tree, value literal)), else_value (literal),
+              table_name (None when there is no FROM). Cached; do not modify.
+    """
+    tokens = tokenize(sql_statement)
+    position = 0
+
+    def expect(word: str):
+        nonlocal position
+        if position >= len(tokens) or not _is_word(tokens[position], word):
+            found = tokens[position][1] if position < len(tokens) else "end of statement"
+            raise ValueError(f"Expected {word} but found {found!r} in '{sql_statement}'")
+        position += 1
+
+    expect("CASE")
+    branches = []
+    while position < len(tokens) and _is_word(tokens[position], "WHEN"):
+        position += 1
+        condition_start = position
+        while position < len(tokens) and not _is_word(tokens[position], "THEN"):
+            position += 1
+        condition = parse_tokens(tokens[condition_start:position], sql_statement)
+        expect("THEN")
+        if position >= len(tokens):
+            raise ValueError(f"Missing THEN value in '{sql_statement}'")
+        branches.append((condition, _case_value(tokens[position], sql_statement)))
+        position += 1
+    if not branches:
+        raise ValueError(f"CASE needs at least one WHEN branch in '{sql_statement}'")
+
+    else_value = ("lit", None, "null")
+    if position < len(tokens) and _is_word(tokens[position], "ELSE"):
+        position += 1
+        if position >= len(tokens):
+            raise ValueError(f"Missing ELSE value in '{sql_statement}'")
+        else_value = _case_value(tokens[position], sql_statement)
+        position += 1
+    expect("END")
+
+    table_name = None
+    if position < len(tokens) and _is_word(tokens[position], "FROM"):
+        position += 1
+        if position >= len(tokens) or tokens[position][0] != "word":
+            raise ValueError(f"Missing table name after FROM in '{sql_statement}'")
+        table_name = tokens[position][1]
+        position += 1
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position][1]!r} in '{sql_statement}'")
+
+    return {"branches": branches, "else_value": else_value, "table_name": table_name}
+
+
+def case_statement_columns(sql_statement: str) -> List[str]:
+    """
+    Columns read by the WHEN conditions of a CASE statement, in order of first appearance.
+    """
+    columns = {}
+    for condition, _ in parse_case_statement(sql_statement)["branches"]:
+        columns.update(dict.fromkeys(node_columns(condition)))
+    return list(columns)
+
+
+def rename_case_columns(sql_statement: str, rename) -> str:
+    """
+    Rewrites a CASE statement with every column name passed through `rename`.
+    """
+    parsed = parse_case_statement(sql_statement)
+    parts = ["CASE"]
+    for condition, value in parsed["branches"]:
+        parts += ["WHEN", render_node(rename_node_columns(condition, rename)), "THEN", render_node(value)]
+    parts += ["ELSE", render_node(parsed["else_value"]), "END"]
+    if parsed["table_name"]:
+        parts += ["FROM", parsed["table_name"]]
+    return " ".join(parts)
+
+
+# Statements and clauses that change data, schema, session or server state. Reads of
+# database inputs also run on a read-only connection; this rejects them before that.
+QUERY_FORBIDDEN_KEYWORDS = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "REPLACE", "UPSERT", "CREATE", "DROP", "ALTER", "TRUNCATE",
+    "RENAME", "GRANT", "REVOKE", "CALL", "EXEC", "EXECUTE", "DO", "HANDLER", "LOAD", "COPY", "INTO",
+    "LOCK", "UNLOCK", "SET", "PRAGMA", "ATTACH", "DETACH", "VACUUM", "ANALYZE", "OUTFILE", "DUMPFILE",
+    "SHUTDOWN", "KILL", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "PREPARE", "DEALLOCATE", "NOWAIT",
+}
+
+# String literals, quoted identifiers and comments, whose contents are not SQL. Where
+# dialects disagree the text is treated as SQL, which can only reject more: '#' starts a
+# comment in MySQL only, '--' needs a following space there, and /*! ... */ is executed
+_QUERY_SKIPPED = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`(?:[^`]|``)*`|--[ \t][^\n]*|--$|/\*(?!!).*?\*/",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+def check_select_query(query: str) -> str:
+    """
+    Checks that `query` is one read-only SELECT statement (optionally WITH ... SELECT)
+    and returns it without the trailing semicolon.
+    The check is lexical: literals, quoted identifiers and comments are skipped, then the
+    query must start with SELECT or WITH, hold no further statement and use none of
+    QUERY_FORBIDDEN_KEYWORDS (a name followed by '(' is a function call, e.g. REPLACE(...)).
+    """
+    if "\\" in query:
+        # Whether a backslash escapes a quote depends on the dialect and its settings
+        raise ValueError("query must not contain backslashes")
+    code = _QUERY_SKIPPED.sub(" ", query.strip().rstrip(";"))
+    if re.search(r"'|\"|`|/\*", code):
+        raise ValueError("query has an unterminated string, identifier or comment")
+    if ";" in code:
+        raise ValueError("query must be a single SELECT statement")
+    words = [(m.group().upper(), code[m.end():].lstrip()[:1]) for m in re.finditer(r"[A-Za-z_][A-Za-z0-9_$]*", code)]
+    if not words or words[0][0] not in ("SELECT", "WITH"):
+        raise ValueError("query must be a SELECT statement")
+    forbidden = sorted({word for word, following in words if word in QUERY_FORBIDDEN_KEYWORDS and following != "("})
+    if forbidden:
+        raise ValueError(f"query must only read data, found {', '.join(forbidden)}")
+    return query.strip().rstrip(";")